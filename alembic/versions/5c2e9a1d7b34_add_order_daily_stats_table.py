@@ -0,0 +1,39 @@
+"""Add order_daily_stats table
+
+Revision ID: 5c2e9a1d7b34
+Revises: 471a82df3ffb
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9a1d7b34'
+down_revision: Union[str, Sequence[str], None] = '471a82df3ffb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('distinct_users', sa.Integer(), nullable=False),
+    sa.Column('hll', sa.LargeBinary(), nullable=False),
+    sa.Column('user_ids', sa.LargeBinary(), nullable=False),
+    sa.Column('user_order_counts', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_daily_stats')
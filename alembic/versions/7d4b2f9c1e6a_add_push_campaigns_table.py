@@ -0,0 +1,54 @@
+"""Add push_campaigns table
+
+Revision ID: 7d4b2f9c1e6a
+Revises: 5c2e9a1d7b34
+Create Date: 2026-10-19 14:03:27.512930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4b2f9c1e6a'
+down_revision: Union[str, Sequence[str], None] = '5c2e9a1d7b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('push_campaigns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('body', sa.String(length=500), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('priority', sa.String(length=16), nullable=False),
+    sa.Column('ttl', sa.Integer(), nullable=True),
+    sa.Column('targeting', sa.JSON(), nullable=False),
+    sa.Column('targeting_method', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('pruned', sa.Integer(), nullable=False),
+    sa.Column('last_device_id', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_push_campaigns_status'), 'push_campaigns', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_push_campaigns_status'), table_name='push_campaigns')
+    op.drop_table('push_campaigns')
@@ -0,0 +1,32 @@
+"""Add device locale and topic subscription columns
+
+Revision ID: 9e1f3a6c8b52
+Revises: 7d4b2f9c1e6a
+Create Date: 2026-10-19 15:41:08.204716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e1f3a6c8b52'
+down_revision: Union[str, Sequence[str], None] = '7d4b2f9c1e6a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('devices', sa.Column('locale', sa.String(length=8), nullable=True))
+    op.add_column('devices', sa.Column('topics', sa.JSON(), nullable=True))
+    op.add_column('devices', sa.Column('topics_synced_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('devices', 'topics_synced_at')
+    op.drop_column('devices', 'topics')
+    op.drop_column('devices', 'locale')
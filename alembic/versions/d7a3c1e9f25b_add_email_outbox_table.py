@@ -0,0 +1,53 @@
+"""Add email_outbox table
+
+Revision ID: d7a3c1e9f25b
+Revises: b42d8e5f1a97
+Create Date: 2026-10-19 19:04:12.381552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3c1e9f25b'
+down_revision: Union[str, Sequence[str], None] = 'b42d8e5f1a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+    sa.Column('template', sa.String(length=64), nullable=True),
+    sa.Column('to_email', sa.String(length=255), nullable=False),
+    sa.Column('subject', sa.String(length=512), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('batch_key', sa.String(length=64), nullable=True),
+    sa.Column('message_id', sa.String(length=255), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_email_outbox_due', 'email_outbox', ['status', 'next_attempt_at'], unique=False)
+    op.create_index(op.f('ix_email_outbox_batch_key'), 'email_outbox', ['batch_key'], unique=False)
+    op.create_index(op.f('ix_email_outbox_message_id'), 'email_outbox', ['message_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_email_outbox_message_id'), table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_batch_key'), table_name='email_outbox')
+    op.drop_index('ix_email_outbox_due', table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,67 @@
+"""Add email_daily_stats table and email_events indexes
+
+Revision ID: e5b8f2a4c913
+Revises: d7a3c1e9f25b
+Create Date: 2026-10-19 20:41:37.905216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8f2a4c913'
+down_revision: Union[str, Sequence[str], None] = 'd7a3c1e9f25b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # email_events takes webhook inserts all the time: build the indexes without blocking
+    # them, first, so the table and its backfill below can share one transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_email_events_email_id_type', 'email_events', ['email_id', 'type'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_email_events_created_at', 'email_events', ['created_at'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+    # the new ingestor is already running (containers start before migrations) and adds
+    # each insert to the rollup once the table exists: hold webhook inserts until commit,
+    # so every event is counted exactly once, by the backfill or by the ingestor. Until
+    # then its inserts fail and stay buffered for a retry.
+    op.create_table('email_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('template', sa.String(length=64), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('events', sa.Integer(), nullable=False),
+    sa.Column('unique_emails', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'template', 'event_type')
+    )
+    op.execute("LOCK TABLE email_events IN SHARE MODE")
+    # roll up the events stored so far; the webhook ingestor maintains the rollup from here on
+    op.execute("""
+        INSERT INTO email_daily_stats (day, template, event_type, events, unique_emails, updated_at)
+        SELECT
+            date(e.created_at),
+            left(coalesce(e.meta -> 'tags' ->> 'category', 'unknown'), 64),
+            e.type,
+            count(*),
+            count(*) FILTER (
+                WHERE e.email_id IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM email_events p
+                    WHERE p.email_id = e.email_id AND p.type = e.type AND p.id < e.id
+                )
+            ),
+            now() AT TIME ZONE 'utc'
+        FROM email_events e
+        WHERE e.type IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_events_created_at', table_name='email_events')
+    op.drop_index('ix_email_events_email_id_type', table_name='email_events')
+    op.drop_table('email_daily_stats')
@@ -0,0 +1,33 @@
+"""Add rate_limit_buckets table
+
+Revision ID: f3c9a7d2b814
+Revises: e5b8f2a4c913
+Create Date: 2026-10-19 22:18:46.507133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9a7d2b814'
+down_revision: Union[str, Sequence[str], None] = 'e5b8f2a4c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rate_limit_buckets',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rate_limit_buckets')
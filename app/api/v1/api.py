@@ -22,6 +22,7 @@ from app.api.v1.routers import admin_business_hours as admin_business_hours_rout
 from app.api.v1.routers import admin_integrations as admin_integrations_router
 from app.api.v1.routers import admin_localizations as admin_localizations_router
 from app.api.v1.routers import admin_users as admin_users_router
+from app.api.v1.routers import admin_profiling as admin_profiling_router
 from app.api.v1.routers import webhooks_resend as webhooks_resend_router
 
 # role-based routes
@@ -58,6 +59,7 @@ router.include_router(admin_business_hours_router.router)
 router.include_router(admin_integrations_router.router)
 router.include_router(admin_localizations_router.router)
 router.include_router(admin_users_router.router)
+router.include_router(admin_profiling_router.router)
 
 # role-based routes
 router.include_router(manager_router.router)
@@ -1,23 +1,39 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, and_, or_, distinct
+from sqlalchemy import func, case, and_, or_, distinct, select, true
 
-from app.core.security import require_manager, require_admin
-from app.db.session import get_db
+from app.core.security import require_manager, require_admin, Principal
+from app.db.session import get_db, get_read_db
 from app import models
+from app.services.analytics.order_snapshot import order_snapshot, GROUP_KEYS
+from app.services.analytics.sketches import daily_user_sketches, HLL_STANDARD_ERROR
+from app.services.email.engagement import email_event_retention, engagement_report, rebuild_rollup
+from app.services.cache import analytics_cache, cached_result
 
 router = APIRouter(prefix="/admin/analytics", tags=["admin"])
 
 
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    """parse an ISO timestamp query param, ignoring invalid values."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except Exception:
+        return None
+
+
 @router.get("/summary")
+@cached_result("admin.summary", params=("from_", "to", "exact"))
 def summary(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    exact: bool = Query(False, description="Count active users exactly instead of from daily sketches"),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     # parse date filters (gracefully ignore invalid)
     dt_from = None
@@ -33,38 +49,58 @@ def summary(
         except Exception:
             dt_to = None
 
-    orders_q = db.query(models.Order)
-    if dt_from:
-        orders_q = orders_q.filter(models.Order.created_at >= dt_from)
-    if dt_to:
-        orders_q = orders_q.filter(models.Order.created_at <= dt_to)
-
-    total_orders = orders_q.count()
-    total_revenue = orders_q.with_entities(func.coalesce(func.sum(models.Order.total), 0)).scalar() or 0
-    total_revenue = float(total_revenue)
-
-    avg_order_value = round(total_revenue / total_orders, 2) if total_orders else 0.0
-
-    # users
-    total_users = db.query(models.User).filter(models.User.role == "user").count()
+    # range condition for the selected period (no range = all orders)
+    created = models.Order.created_at
+    in_range = and_(
+        true(),
+        *([created >= dt_from] if dt_from else []),
+        *([created <= dt_to] if dt_to else []),
+    )
 
     # active users: distinct users with orders in selected range; if no range, last 30 days
-    active_q = db.query(models.Order.user_id).filter(models.Order.user_id.isnot(None))
     if dt_from or dt_to:
-        if dt_from:
-            active_q = active_q.filter(models.Order.created_at >= dt_from)
-        if dt_to:
-            active_q = active_q.filter(models.Order.created_at <= dt_to)
+        active_from, active_to = dt_from, dt_to
     else:
-        active_q = active_q.filter(models.Order.created_at >= datetime.utcnow() - timedelta(days=30))
-    active_users = active_q.distinct().count()
+        active_from, active_to = datetime.utcnow() - timedelta(days=30), None
+    in_active_window = and_(
+        true(),
+        *([created >= active_from] if active_from else []),
+        *([created <= active_to] if active_to else []),
+    )
 
     # today stats (UTC)
     start_today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     end_today = start_today + timedelta(days=1)
-    today_q = db.query(models.Order).filter(models.Order.created_at >= start_today, models.Order.created_at < end_today)
-    orders_today = today_q.count()
-    revenue_today = float(today_q.with_entities(func.coalesce(func.sum(models.Order.total), 0)).scalar() or 0)
+    in_today = and_(created >= start_today, created < end_today)
+
+    # one round-trip: FILTER aggregates over orders plus a scalar subquery for users
+    total_users_sq = (
+        select(func.count(models.User.id))
+        .where(models.User.role == "user")
+        .scalar_subquery()
+    )
+    columns = [
+        func.count(models.Order.id).filter(in_range).label("total_orders"),
+        func.coalesce(func.sum(models.Order.total).filter(in_range), 0).label("total_revenue"),
+        func.count(models.Order.id).filter(in_today).label("orders_today"),
+        func.coalesce(func.sum(models.Order.total).filter(in_today), 0).label("revenue_today"),
+        total_users_sq.label("total_users"),
+    ]
+    if exact:
+        columns.append(func.count(distinct(models.Order.user_id)).filter(in_active_window).label("active_users"))
+    row = db.execute(select(*columns)).one()
+
+    total_orders = row.total_orders or 0
+    total_revenue = float(row.total_revenue or 0)
+    avg_order_value = round(total_revenue / total_orders, 2) if total_orders else 0.0
+    total_users = row.total_users or 0
+    if exact:
+        active_users = row.active_users or 0
+    else:
+        # merged per-day HyperLogLog sketches, ~0.8% standard error
+        active_users = daily_user_sketches.range(db, active_from, active_to).distinct_users()
+    orders_today = row.orders_today or 0
+    revenue_today = float(row.revenue_today or 0)
 
     return {
         "total_orders": int(total_orders),
@@ -74,18 +110,21 @@ def summary(
         "avg_order_value": avg_order_value,
         "orders_today": int(orders_today),
         "revenue_today": round(revenue_today, 2),
+        "active_users_exact": exact,
+        "active_users_error": 0.0 if exact else round(HLL_STANDARD_ERROR, 4),
     }
 
 
 @router.get("/orders-by-period")
+@cached_result("admin.orders_by_period", params=("period", "from_", "to"))
 def orders_by_period(
     period: str = Query("day", description="Period: day, week, month"),
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
-    """orders aggregated by period. Returns a list for compatibility with SQLite in tests."""
+    """orders aggregated by period (day, week, month), served from the order snapshot."""
 
     # parse dates (gracefully ignore invalid)
     dt_from = None
@@ -101,60 +140,32 @@ def orders_by_period(
         except Exception:
             dt_to = None
 
-    # fetch minimal fields to aggregate in Python (cross-DB)
-    q = db.query(models.Order.created_at, models.Order.total)
-    if dt_from:
-        q = q.filter(models.Order.created_at >= dt_from)
-    if dt_to:
-        q = q.filter(models.Order.created_at <= dt_to)
-
-    rows = q.all()
-
-    # grouping helpers
-    from collections import defaultdict
-    buckets = defaultdict(lambda: {"orders_count": 0, "total_revenue": 0.0})
-
-    def period_key(dt: datetime) -> str:
-        if period == "week":
-            iso_year, iso_week, _ = dt.isocalendar()
-            return f"{iso_year}-W{iso_week:02d}"
-        elif period == "month":
-            return f"{dt.year:04d}-{dt.month:02d}"
-        else:
-            # default to day
-            return dt.date().isoformat()
-
-    for created_at, total in rows:
-        if not created_at:
-            continue
-        key = period_key(created_at)
-        buckets[key]["orders_count"] += 1
-        buckets[key]["total_revenue"] += float(total or 0)
-
-    # build sorted list by period key (lexicographic works for our formatted keys)
-    data = []
-    for key in sorted(buckets.keys()):
-        orders_count = buckets[key]["orders_count"]
-        total_revenue = buckets[key]["total_revenue"]
-        avg = round(total_revenue / orders_count, 2) if orders_count else 0
-        data.append({
-            "period": key,
-            "orders_count": int(orders_count),
-            "revenue": round(total_revenue, 2),
-            "avg_order_value": avg,
-        })
-
-    return data
+    # aggregate over the in-memory columnar snapshot instead of fetching rows
+    view = order_snapshot.ensure_fresh(db).view()
+    period_key = period if period in {"week", "month"} else "day"
+    groups = view.group_by([period_key], view.mask(dt_from, dt_to))
+
+    # labels are sorted (lexicographic works for our formatted keys)
+    return [
+        {
+            "period": g[period_key],
+            "orders_count": g["orders_count"],
+            "revenue": g["revenue"],
+            "avg_order_value": g["avg_order_value"],
+        }
+        for g in groups
+    ]
 
 
 @router.get("/order-sources")
+@cached_result("admin.order_sources", params=("from_", "to"))
 def order_sources(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
-    """order sources grouped by fulfillment type (delivery/pickup/etc.). Returns a list for tests."""
+    """order sources grouped by fulfillment type (delivery/pickup/etc.), served from the order snapshot."""
 
     # parse dates
     dt_from = None
@@ -170,35 +181,20 @@ def order_sources(
         except Exception:
             dt_to = None
 
-    # query minimal fields and aggregate in Python (SQLite friendly)
-    q = db.query(models.Order.pickup_or_delivery, models.Order.total, models.Order.created_at)
-    if dt_from:
-        q = q.filter(models.Order.created_at >= dt_from)
-    if dt_to:
-        q = q.filter(models.Order.created_at <= dt_to)
-
-    rows = q.all()
-
-    from collections import defaultdict
-    buckets = defaultdict(lambda: {"count": 0, "total": 0.0})
-
-    for pickup_or_delivery, total, _created_at in rows:
-        key = pickup_or_delivery or "unknown"
-        buckets[key]["count"] += 1
-        buckets[key]["total"] += float(total or 0)
-
-    total_orders = sum(v["count"] for v in buckets.values())
+    # group the columnar snapshot by fulfillment type (missing values map to "unknown")
+    view = order_snapshot.ensure_fresh(db).view()
+    groups = view.group_by(["fulfillment"], view.mask(dt_from, dt_to))
+    total_orders = sum(g["orders_count"] for g in groups)
 
     # build list with percentages
     result_list = []
-    for key in sorted(buckets.keys()):
-        count = buckets[key]["count"]
-        total = buckets[key]["total"]
+    for g in sorted(groups, key=lambda x: x["fulfillment"]):
+        count = g["orders_count"]
         percentage = round((count / total_orders) * 100, 2) if total_orders else 0.0
         result_list.append({
-            "pickup_or_delivery": key,
+            "pickup_or_delivery": g["fulfillment"],
             "count": int(count),
-            "total": round(total, 2),
+            "total": g["revenue"],
             "percentage": percentage,
         })
 
@@ -206,11 +202,12 @@ def order_sources(
 
 
 @router.get("/utm-sources")
+@cached_result("admin.utm_sources", params=("from_", "to"))
 def utm_sources(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """uTM source analytics - orders and revenue grouped by traffic sources."""
 
@@ -299,11 +296,13 @@ def utm_sources(
 
 
 @router.get("/repeat-customers")
+@cached_result("admin.repeat_customers", params=("from_", "to", "exact"))
 def repeat_customers(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    exact: bool = Query(False, description="Scan orders instead of merging daily rollups"),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """repeat customers analytics with customer segmentation. SQLite-friendly aggregation."""
 
@@ -321,15 +320,29 @@ def repeat_customers(
         except Exception:
             dt_to = None
 
-    # base query
-    q = db.query(models.Order.user_id, models.Order.created_at)
-    if dt_from:
-        q = q.filter(models.Order.created_at >= dt_from)
-    if dt_to:
-        q = q.filter(models.Order.created_at <= dt_to)
-
-    rows = q.all()
-    total_orders = len(rows)
+    if exact:
+        # base query
+        q = db.query(models.Order.user_id, models.Order.created_at)
+        if dt_from:
+            q = q.filter(models.Order.created_at >= dt_from)
+        if dt_to:
+            q = q.filter(models.Order.created_at <= dt_to)
+
+        rows = q.all()
+        total_orders = len(rows)
+
+        # aggregate per registered user (ignore guests without user_id for segmentation)
+        from collections import defaultdict
+        counts_by_user = defaultdict(int)
+        for user_id, _created_at in rows:
+            if user_id is not None:
+                counts_by_user[user_id] += 1
+        user_counts = list(counts_by_user.values())
+    else:
+        # per-user order counts merged from daily rollups plus live partial days
+        sketch = daily_user_sketches.range(db, dt_from, dt_to)
+        total_orders = sketch.orders_count
+        user_counts = sketch.user_counts.tolist()
 
     if total_orders == 0:
         return {
@@ -345,19 +358,12 @@ def repeat_customers(
             "avg_orders_per_customer": 0.0,
         }
 
-    # aggregate per registered user (ignore guests without user_id for segmentation)
-    from collections import defaultdict
-    counts_by_user = defaultdict(int)
-    for user_id, _created_at in rows:
-        if user_id is not None:
-            counts_by_user[user_id] += 1
-
-    total_customers = len(counts_by_user)
-    repeat_customers_cnt = sum(1 for c in counts_by_user.values() if c >= 2)
+    total_customers = len(user_counts)
+    repeat_customers_cnt = sum(1 for c in user_counts if c >= 2)
     new_customers = max(0, total_customers - repeat_customers_cnt)
 
     # orders breakdown
-    repeat_orders = sum(max(0, c - 1) for c in counts_by_user.values())
+    repeat_orders = sum(max(0, c - 1) for c in user_counts)
     first_time_orders = total_orders - repeat_orders
 
     repeat_percentage = round((repeat_orders / total_orders) * 100, 2) if total_orders else 0.0
@@ -380,6 +386,7 @@ def repeat_customers(
 
 
 @router.get("/dish-popularity")
+@cached_result("admin.dish_popularity", params=("from_", "to", "user_id", "type_", "sort_by", "order", "limit"))
 def dish_popularity(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
@@ -388,8 +395,8 @@ def dish_popularity(
     sort_by: str = Query("qty", description="qty|revenue|avg_price|name"),
     order: str = Query("desc", description="asc|desc"),
     limit: int = Query(50, ge=1, le=1000),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """Dish popularity aggregated from OrderItem + Order with filters and sorting.
     Returns list of items with qty, revenue and avg_price. SQLite-friendly (aggregates in Python).
@@ -472,6 +479,7 @@ def dish_popularity(
 
 
 @router.get("/marketing-metrics")
+@cached_result("admin.marketing_metrics", params=("from_", "to", "spend_android", "spend_ios", "spend_web", "installs_android", "installs_ios", "installs_web"))
 def marketing_metrics(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
@@ -481,8 +489,8 @@ def marketing_metrics(
     installs_android: int = Query(0, ge=0),
     installs_ios: int = Query(0, ge=0),
     installs_web: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """Financial analytics (CPI, ROI, CPA) combining DB stats and provided marketing inputs.
     - Uses DB to compute orders_count and revenue in the given period.
@@ -512,8 +520,11 @@ def marketing_metrics(
     if dt_to:
         oq = oq.filter(models.Order.created_at <= dt_to)
 
-    orders_count = oq.count()
-    revenue_total = float(oq.with_entities(func.coalesce(func.sum(models.Order.total), 0)).scalar() or 0.0)
+    orders_count, revenue_total = oq.with_entities(
+        func.count(models.Order.id),
+        func.coalesce(func.sum(models.Order.total), 0),
+    ).one()
+    revenue_total = float(revenue_total or 0.0)
 
     # helper safe divisions
     def safe_div(num: float, den: float) -> float:
@@ -562,3 +573,136 @@ def marketing_metrics(
             "Future: integrate GA4 streams (android/ios/web) to replace proxies.",
         ],
     }
+
+
+@router.get("/slice")
+def slice_orders(
+    group_by: str = Query("hour", description="Comma-separated keys: hour, weekday, day, week, month, fulfillment, payment, status, utm_source"),
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = Query(None),
+    fulfillment: Optional[str] = Query(None, description="delivery|pickup"),
+    payment: Optional[str] = Query(None, description="cod|online"),
+    status: Optional[str] = Query(None),
+    utm_source: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
+):
+    """Ad-hoc dashboard slicing over the in-memory order snapshot.
+    Groups by any combination of time buckets and categorical columns without querying orders in Postgres.
+    """
+    keys = [k.strip() for k in group_by.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by keys: {', '.join(unknown)}. Allowed: {', '.join(sorted(GROUP_KEYS))}")
+    if len(keys) > 3:
+        raise HTTPException(status_code=400, detail="At most 3 group_by keys are supported")
+
+    dt_from = _parse_dt(from_)
+    dt_to = _parse_dt(to)
+
+    view = order_snapshot.ensure_fresh(db).view()
+    mask = view.mask(dt_from, dt_to, fulfillment=fulfillment, payment=payment, status=status, utm_source=utm_source)
+
+    return {
+        "group_by": keys,
+        "groups": view.group_by(keys, mask),
+        "summary": view.totals(mask),
+        "snapshot": {"rows": len(view)},
+    }
+
+
+@router.get("/email-engagement")
+def email_engagement(
+    from_: Optional[str] = Query(None, alias="from", description="First day (default: 7 days ago)"),
+    to: Optional[str] = Query(None, description="Last day (default: today)"),
+    template: Optional[str] = Query(None, description="e.g. order_created"),
+    by_day: bool = Query(False, description="Also break the counts down per day"),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
+):
+    """Sent/delivered/opened/clicked/bounced counts and rates per email template.
+    Answered from the daily email_daily_stats rollup, never from raw email_events.
+    """
+    dt_to = _parse_dt(to) or datetime.utcnow()
+    dt_from = _parse_dt(from_) or dt_to - timedelta(days=6)
+    if dt_from.date() > dt_to.date():
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return engagement_report(db, dt_from.date(), dt_to.date(), template=template, by_day=by_day)
+
+
+@router.post("/email-engagement/rebuild")
+def email_engagement_rebuild(
+    from_: str = Query(..., alias="from"),
+    to: str = Query(...),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """re-roll email engagement for [from, to] days from raw events still within retention."""
+    dt_from = _parse_dt(from_)
+    dt_to = _parse_dt(to)
+    if not dt_from or not dt_to or dt_from > dt_to:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    try:
+        rows = rebuild_rollup(db, dt_from.date(), dt_to.date())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"rows": rows}
+
+
+@router.get("/email-engagement/retention")
+def email_engagement_retention(_: Principal = Depends(require_admin)):
+    """raw email event pruning on this worker."""
+    return email_event_retention.stats()
+
+
+@router.get("/snapshot")
+def snapshot_status(_: Principal = Depends(require_admin)):
+    """size and freshness of the in-memory order snapshot."""
+    return order_snapshot.stats()
+
+
+@router.post("/snapshot/refresh")
+def snapshot_refresh(
+    full: bool = Query(False, description="Rebuild from scratch instead of incremental refresh"),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """force a snapshot refresh (e.g. after bulk order edits or deletes)."""
+    touched = order_snapshot.refresh(db, full=full)
+    return {"touched": touched, **order_snapshot.stats()}
+
+
+@router.post("/sketches/rebuild")
+def sketches_rebuild(
+    from_: str = Query(..., alias="from"),
+    to: str = Query(...),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """re-roll daily sketches for [from, to] days (e.g. after backfills or order deletes)."""
+    dt_from = _parse_dt(from_)
+    dt_to = _parse_dt(to)
+    if not dt_from or not dt_to or dt_from > dt_to:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    deleted = (
+        db.query(models.OrderDailyStats)
+        .filter(models.OrderDailyStats.day >= dt_from.date(), models.OrderDailyStats.day <= dt_to.date())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    daily_user_sketches.forget(dt_from.date(), dt_to.date())
+    analytics_cache.invalidate()
+    return {"deleted_days": deleted}
+
+
+@router.get("/cache")
+def cache_stats(_: Principal = Depends(require_admin)):
+    """hit/miss counters of the analytics result cache (this worker only)."""
+    return analytics_cache.stats()
+
+
+@router.post("/cache/invalidate")
+def cache_invalidate(_: Principal = Depends(require_admin)):
+    """drop all cached analytics results on this worker."""
+    analytics_cache.invalidate()
+    return analytics_cache.stats()
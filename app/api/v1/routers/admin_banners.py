@@ -4,7 +4,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.core.security import require_manager
+from app.core.security import require_manager, Principal
 from app.db.session import get_db
 from app import models
 from app.schemas.admin import BannerCreate, BannerUpdate, BannerOut
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/admin/banners", tags=["admin"])
 def list_banners(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """list all banners with optional filtering"""
     query = db.query(models.Banner)
@@ -39,7 +39,7 @@ def list_banners(
 def list_all_banners(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """list all banners including expired ones (admin view)"""
     query = db.query(models.Banner)
@@ -55,7 +55,7 @@ def list_all_banners(
 def get_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """get a specific banner"""
     banner = db.get(models.Banner, banner_id)
@@ -68,7 +68,7 @@ def get_banner(
 def create_banner(
     payload: BannerCreate,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(require_manager),
+    admin: Principal = Depends(require_manager),
 ):
     """create a new banner"""
     banner_data = payload.dict()
@@ -86,7 +86,7 @@ def update_banner(
     banner_id: int,
     payload: BannerUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """update a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -108,7 +108,7 @@ def update_banner(
 def delete_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """delete a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -124,7 +124,7 @@ def delete_banner(
 def activate_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """activate a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -141,7 +141,7 @@ def activate_banner(
 def deactivate_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """deactivate a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -158,7 +158,7 @@ def deactivate_banner(
 def reorder_banners(
     banner_order: List[int],
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """reorder banners by updating their sort_order"""
     if not banner_order:
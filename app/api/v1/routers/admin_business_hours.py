@@ -5,9 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
-from app.core.security import require_admin
+from app.core.security import require_admin, Principal
 from app.db.session import get_db
-from app import models
 from app.services.business.hours import business_hours_service, validate_business_hours
 
 router = APIRouter(prefix="/admin/business-hours", tags=["admin"])
@@ -42,7 +41,7 @@ class WeeklyHoursUpdate(BaseModel):
 @router.get("/status", response_model=BusinessHoursStatus)
 def get_business_status(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """get current business hours status."""
     validation_result = validate_business_hours()
@@ -59,7 +58,7 @@ def get_business_status(
 @router.get("/weekly", response_model=Dict[str, Any])
 def get_weekly_hours(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """get weekly business hours config."""
     weekly_hours = business_hours_service.get_weekly_hours()
@@ -84,7 +83,7 @@ def update_day_hours(
     day_name: str,
     payload: BusinessHoursUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """update business hours for a specific day."""
     day_mapping = {
@@ -149,7 +148,7 @@ def update_day_hours(
 def update_weekly_hours(
     payload: WeeklyHoursUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """update business hours for the entire week."""
     days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
@@ -205,7 +204,7 @@ def update_weekly_hours(
 @router.post("/emergency-close")
 def emergency_close(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """emergency close - mark all days as closed."""
     for weekday in range(7):
@@ -224,7 +223,7 @@ def emergency_close(
 @router.post("/emergency-open")
 def emergency_open(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """emergency open - mark all days as open with default hours."""
     for weekday in range(7):
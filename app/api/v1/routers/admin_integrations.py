@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Optional
-from app.core.security import require_admin
+from fastapi import APIRouter, Body, Depends, Query
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.integrations import integrations
+from app.core.security import require_admin, Principal
+from app.db.session import get_db
 from app import models
 
 router = APIRouter(prefix="/admin/integrations", tags=["admin"])
 
 
 @router.get("/status")
-def get_integrations_status(_: models.User = Depends(require_admin)):
+def get_integrations_status(_: Principal = Depends(require_admin)):
     """get status of all integrations for admin monitoring."""
     from app.services.email.email_sender import health_check as email_health
     from app.services.push.fcm_admin import health_check as push_health
@@ -50,12 +54,88 @@ def get_integrations_status(_: models.User = Depends(require_admin)):
             "total": total_count,
             "all_ready": configured_count == total_count
         },
-        "services": status
+        "services": status,
+        "sdks": integrations.stats(),
     }
 
 
+@router.get("/database/replicas")
+def database_replicas(_: Principal = Depends(require_admin)):
+    """return read replica health, lag and read routing counters for this worker."""
+    from app.db.session import read_router
+    return read_router.stats()
+
+
+@router.get("/database/slow-queries")
+def database_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    min_ms: float = Query(0, ge=0),
+    _: Principal = Depends(require_admin),
+):
+    """return recent slow statements on this worker, newest first, with their EXPLAIN plans."""
+    from app.db.slow_queries import slow_query_log
+    return {"stats": slow_query_log.stats(), "entries": slow_query_log.list(limit=limit, min_ms=min_ms)}
+
+
+@router.delete("/database/slow-queries")
+def clear_database_slow_queries(_: Principal = Depends(require_admin)):
+    """empty this worker's slow query buffer (and the EXPLAIN cooldowns)."""
+    from app.db.slow_queries import slow_query_log
+    slow_query_log.clear()
+    return {"status": "cleared"}
+
+
+@router.get("/email/queue")
+def email_queue_status(db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """return email outbox counts by status and this worker's batch sender counters."""
+    from app.services.email.queue import email_queue
+    counts = dict(db.query(models.EmailOutbox.status, func.count()).group_by(models.EmailOutbox.status).all())
+    return {"counts": counts, "worker": email_queue.stats()}
+
+
+@router.get("/email/dead-letters")
+def email_dead_letters(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """return emails that were rejected or ran out of attempts, newest first."""
+    rows = (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.status == "dead")
+        .order_by(models.EmailOutbox.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "template": row.template,
+                "to": row.to_email,
+                "subject": row.subject,
+                "attempts": row.attempts,
+                "error": row.error,
+                "created_at": row.created_at,
+            }
+            for row in rows
+        ]
+    }
+
+
+@router.post("/email/dead-letters/requeue")
+def requeue_email_dead_letters(
+    ids: Optional[List[int]] = Body(None, embed=True, description="dead letters to send again; all when omitted"),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """queue dead-lettered emails again with fresh attempts."""
+    from app.services.email.queue import requeue_dead
+    return {"requeued": requeue_dead(db, ids)}
+
+
 @router.get("/ga4/health")
-def ga4_health(_: models.User = Depends(require_admin)):
+def ga4_health(_: Principal = Depends(require_admin)):
     """return health status for GA4 streams (android, ios, web)."""
     from app.services.analytics.ga4_streams import health_check_all
     return health_check_all()
@@ -66,7 +146,7 @@ def ga4_test_event(
     platform: Optional[str] = Query("all", description="android|ios|web|all"),
     event_name: str = Query("test_event"),
     client_id: Optional[str] = Query(None),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """send a GA4 test event to a specific platform stream or all streams."""
     from datetime import datetime
@@ -90,7 +170,7 @@ def ga4_test_event(
 
 
 @router.get("/ga4-data/health")
-def ga4_data_health(_: models.User = Depends(require_admin)):
+def ga4_data_health(_: Principal = Depends(require_admin)):
     """Check GA4 Data API health and configuration."""
     from app.services.analytics.ga4_data import health_check
     return health_check()
@@ -100,7 +180,7 @@ def ga4_data_health(_: models.User = Depends(require_admin)):
 def ga4_data_sessions(
     start_date: str = Query("30daysAgo", description="Start date (e.g., '30daysAgo', '2023-01-01')"),
     end_date: str = Query("yesterday", description="End date (e.g., 'yesterday', '2023-01-31')"),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Get sessions and users data from GA4."""
     from app.services.analytics.ga4_data import get_sessions_and_users
@@ -112,7 +192,7 @@ def ga4_data_traffic_sources(
     start_date: str = Query("30daysAgo", description="Start date (e.g., '30daysAgo', '2023-01-01')"),
     end_date: str = Query("yesterday", description="End date (e.g., 'yesterday', '2023-01-31')"),
     limit: int = Query(10, description="Maximum number of sources to return"),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Get traffic sources data from GA4."""
     from app.services.analytics.ga4_data import get_traffic_sources
@@ -124,7 +204,7 @@ def ga4_data_events(
     start_date: str = Query("30daysAgo", description="Start date (e.g., '30daysAgo', '2023-01-01')"),
     end_date: str = Query("yesterday", description="End date (e.g., 'yesterday', '2023-01-31')"),
     limit: int = Query(20, description="Maximum number of events to return"),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Get events data from GA4."""
     from app.services.analytics.ga4_data import get_events_data
@@ -135,7 +215,7 @@ def ga4_data_events(
 def ga4_data_devices(
     start_date: str = Query("30daysAgo", description="Start date (e.g., '30daysAgo', '2023-01-01')"),
     end_date: str = Query("yesterday", description="End date (e.g., 'yesterday', '2023-01-31')"),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Get device and platform analytics from GA4."""
     from app.services.analytics.ga4_data import get_device_analytics
@@ -3,8 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from app.core.security import require_admin
-from app.db.session import get_db
+from app.core.security import require_admin, Principal
+from app.db.session import get_db, get_read_db
 from app import models
 from app.services.locale.locale_helper import populate_translation_field
 from app.services.locale.translation_service import get_translation_service
@@ -59,9 +59,9 @@ class TranslationResponse(BaseModel):
 
 # category translation endpoints
 @router.get("/categories", summary="Get all category translations")
-async def get_category_translations(
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+def get_category_translations(
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
 ) -> List[TranslationExport]:
     """get all category translations for management."""
     categories = db.query(models.Category).all()
@@ -78,11 +78,11 @@ async def get_category_translations(
 
 
 @router.put("/categories/{category_id}/translations", summary="Update category translations")
-async def update_category_translations(
+def update_category_translations(
     category_id: int,
     payload: TranslationUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> Dict[str, str]:
     """update translations for a specific category."""
     category = db.query(models.Category).filter(models.Category.id == category_id).first()
@@ -107,10 +107,10 @@ async def update_category_translations(
 
 # menu item translation endpoints
 @router.get("/menu-items", summary="Get all menu item translations")
-async def get_menu_item_translations(
+def get_menu_item_translations(
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
 ) -> List[Dict]:
     """get all menu item translations for management."""
     query = db.query(models.MenuItem)
@@ -133,12 +133,12 @@ async def get_menu_item_translations(
 
 
 @router.put("/menu-items/{item_id}/translations", summary="Update menu item translations")
-async def update_menu_item_translations(
+def update_menu_item_translations(
     item_id: int,
     name_translations: Optional[Dict[str, str]] = None,
     description_translations: Optional[Dict[str, str]] = None,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> Dict[str, str]:
     """update translations for a specific menu item."""
     menu_item = db.query(models.MenuItem).filter(models.MenuItem.id == item_id).first()
@@ -177,10 +177,10 @@ async def update_menu_item_translations(
 
 # modification type translation endpoints
 @router.get("/modification-types", summary="Get all modification type translations")
-async def get_modification_type_translations(
+def get_modification_type_translations(
     category: Optional[str] = Query(None, description="Filter by category: sauce or removal"),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
 ) -> List[TranslationExport]:
     """get all modification type translations for management."""
     query = db.query(models.ModificationType)
@@ -201,11 +201,11 @@ async def get_modification_type_translations(
 
 
 @router.put("/modification-types/{type_id}/translations", summary="Update modification type translations")
-async def update_modification_type_translations(
+def update_modification_type_translations(
     type_id: int,
     payload: TranslationUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> Dict[str, str]:
     """update translations for a specific modification type."""
     mod_type = db.query(models.ModificationType).filter(models.ModificationType.id == type_id).first()
@@ -230,9 +230,9 @@ async def update_modification_type_translations(
 
 # translation service endpoint
 @router.post("/translate", summary="Translate text using AI service")
-async def translate_text(
+def translate_text(
     payload: TranslationRequest,
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> TranslationResponse:
     """translate text using AI translation service (Gemini)."""
     # validate language codes
@@ -304,10 +304,10 @@ async def translate_text(
 
 # bulk operations
 @router.post("/bulk-update", summary="Bulk update translations")
-async def bulk_update_translations(
+def bulk_update_translations(
     payload: BulkTranslationUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> Dict[str, int]:
     """bulk update translations for multiple entities."""
     updated_count = 0
@@ -345,11 +345,11 @@ async def bulk_update_translations(
 
 # export/Import operations
 @router.get("/export", summary="Export all translations")
-async def export_all_translations(
+def export_all_translations(
     entity_type: Optional[str] = Query(None, description="Filter by entity type: category, menu_item, modification_type"),
     language: Optional[str] = Query(None, description="Filter by language code"),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
 ) -> List[TranslationExport]:
     """export all translations for backup or editing."""
     results = []
@@ -414,9 +414,9 @@ async def export_all_translations(
 
 # statistics and overview
 @router.get("/stats", summary="Get localization statistics")
-async def get_localization_stats(
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+def get_localization_stats(
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin)
 ) -> LocalizationStats:
     """get statistics about translations coverage."""
     
@@ -460,10 +460,10 @@ async def get_localization_stats(
 
 # utility endpoints
 @router.post("/populate-defaults", summary="Populate default English translations")
-async def populate_default_translations(
+def populate_default_translations(
     entity_type: str = Query(..., description="Entity type: category, menu_item, modification_type"),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ) -> Dict[str, int]:
     """populate default English translations from existing text fields."""
     updated_count = 0
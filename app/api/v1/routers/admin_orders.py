@@ -1,15 +1,20 @@
+import csv
+import io
+import json
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import require_admin
-from app.db.session import get_db
+from app.core.security import require_admin, Principal
+from app.db.session import get_db, get_read_db, read_session
 from app import models
 from app.schemas.orders import OrderOut, OrderUpdate
 from app.schemas.admin import StatusUpdateRequest
-from app.services.push.fcm_admin import send_to_token
+from app.services.push.order_notifications import STATUS_TEXT, notify_order_status
 from app.services.email.order_emails import send_order_status, send_order_delivered
 
 router = APIRouter(prefix="/admin/orders", tags=["admin"])
@@ -20,8 +25,8 @@ def list_orders(
     status: Optional[str] = Query(None),
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_admin),
 ):
     q = db.query(models.Order)
     if status:
@@ -46,8 +51,147 @@ def list_orders(
     return orders
 
 
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_ORDER_COLUMNS = [
+    "order_id", "number", "created_at", "status", "pickup_or_delivery", "payment_method", "paid",
+    "user_id", "phone", "address_text", "subtotal", "discount", "total", "promocode_code",
+    "utm_source", "utm_medium", "utm_campaign",
+]
+EXPORT_ITEM_COLUMNS = ["item_id", "item_name", "qty", "price_at_moment", "modifications"]
+
+
+def _export_order_dict(order: models.Order) -> dict:
+    return {
+        "order_id": order.id,
+        "number": order.number,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "status": order.status,
+        "pickup_or_delivery": order.pickup_or_delivery,
+        "payment_method": order.payment_method,
+        "paid": bool(order.paid),
+        "user_id": order.user_id,
+        "phone": order.phone,
+        "address_text": order.address_text,
+        "subtotal": float(order.subtotal or 0),
+        "discount": float(order.discount or 0),
+        "total": float(order.total or 0),
+        "promocode_code": order.promocode_code,
+        "utm_source": order.utm_source,
+        "utm_medium": order.utm_medium,
+        "utm_campaign": order.utm_campaign,
+        "items": [
+            {
+                "item_id": item.item_id,
+                "name": item.name_snapshot,
+                "qty": item.qty,
+                "price_at_moment": float(item.price_at_moment or 0),
+                "modifications": [
+                    {
+                        "modification_type_id": mod.modification_type_id,
+                        "name": mod.modification_type.name if mod.modification_type else None,
+                        "action": mod.action,
+                    }
+                    for mod in item.modifications
+                ],
+            }
+            for item in order.items
+        ],
+    }
+
+
+def _export_csv_rows(order: dict) -> Iterator[list]:
+    """flatten an exported order into one CSV row per item (or one row if it has no items)."""
+    head = [order[c] for c in EXPORT_ORDER_COLUMNS]
+    if not order["items"]:
+        yield head + [None] * len(EXPORT_ITEM_COLUMNS)
+        return
+    for item in order["items"]:
+        mods = ";".join(f"{m['action']}:{m['name'] or m['modification_type_id']}" for m in item["modifications"])
+        yield head + [item["item_id"], item["name"], item["qty"], item["price_at_moment"], mods]
+
+
+def _stream_orders(fmt: str, status: Optional[str], dt_from: Optional[datetime], dt_to: Optional[datetime]) -> Iterator[str]:
+    """yield export chunks from a server-side cursor, one batch of orders at a time.
+
+    Owns its own session because the request-scoped one is closed before streaming finishes.
+    """
+    stmt = (
+        select(models.Order)
+        .options(
+            selectinload(models.Order.items)
+            .selectinload(models.OrderItem.modifications)
+            .selectinload(models.OrderItemModification.modification_type)
+        )
+        .order_by(models.Order.id.asc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if status:
+        stmt = stmt.where(models.Order.status == status)
+    if dt_from:
+        stmt = stmt.where(models.Order.created_at >= dt_from)
+    if dt_to:
+        stmt = stmt.where(models.Order.created_at <= dt_to)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == "csv":
+        writer.writerow(EXPORT_ORDER_COLUMNS + EXPORT_ITEM_COLUMNS)
+        yield buf.getvalue()
+
+    db = read_session()
+    try:
+        result = db.execute(stmt)
+        for partition in result.scalars().partitions():
+            buf.seek(0)
+            buf.truncate()
+            for order in partition:
+                data = _export_order_dict(order)
+                if fmt == "csv":
+                    writer.writerows(_export_csv_rows(data))
+                else:
+                    buf.write(json.dumps(data, ensure_ascii=False))
+                    buf.write("\n")
+            # the identity map only holds weak references, so each batch is released once
+            # we stop referencing it and memory stays flat over the whole export
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_orders(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = Query(None),
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = Query(None),
+    _: Principal = Depends(require_admin),
+):
+    """stream orders with items and modifications as CSV or NDJSON (constant memory)."""
+    dt_from = dt_to = None
+    try:
+        if from_:
+            dt_from = datetime.fromisoformat(from_)
+        if to:
+            dt_to = datetime.fromisoformat(to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, expected ISO 8601")
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"orders-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        _stream_orders(fmt, status, dt_from, dt_to),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            # keep reverse proxies from buffering the whole export before forwarding it
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get("/{order_id}", response_model=OrderOut)
-def get_order_admin(order_id: int, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+def get_order_admin(order_id: int, db: Session = Depends(get_read_db), _: Principal = Depends(require_admin)):
     order = db.get(models.Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -59,7 +203,7 @@ ALLOWED_STATUSES = {"NEW", "COOKING", "ON_WAY", "DELIVERED", "CANCELLED"}
 
 
 @router.put("/{order_id}/status", response_model=OrderOut)
-def update_order_status(order_id: int, payload: StatusUpdateRequest, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+def update_order_status(order_id: int, payload: StatusUpdateRequest, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
     if payload.status not in ALLOWED_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
     order = db.get(models.Order, order_id)
@@ -75,30 +219,10 @@ def update_order_status(order_id: int, payload: StatusUpdateRequest, db: Session
     
     # send notifications to customer about status change
     if old_status != payload.status and order.user:
-        status_messages = {
-            "NEW": "принят",
-            "COOKING": "готовится",
-            "ON_WAY": "в пути",
-            "DELIVERED": "доставлен",
-            "CANCELLED": "отменен"
-        }
+        status_text = STATUS_TEXT.get(payload.status, payload.status)
         
-        status_text = status_messages.get(payload.status, payload.status)
-        title = "Статус заказа изменен"
-        body = f"Заказ #{order.number} {status_text}"
-        
-        # send push notifications to all user's devices
-        for device in order.user.devices:
-            try:
-                send_to_token(device.fcm_token, title=title, body=body, data={
-                    "order_id": str(order.id),
-                    "order_number": order.number,
-                    "status": payload.status,
-                    "type": "order_status_update"
-                })
-            except Exception as e:
-                # log error but don't fail the request
-                print(f"Failed to send push notification to device {device.id}: {e}")
+        # push to all user's devices: coalesced per order and sent off the request path
+        notify_order_status(order, payload.status)
         
         # send email notifications (best-effort)
         if order.user.email:
@@ -117,7 +241,7 @@ def update_order_status(order_id: int, payload: StatusUpdateRequest, db: Session
 
 
 @router.put("/{order_id}", response_model=OrderOut)
-def update_order(order_id: int, payload: OrderUpdate, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+def update_order(order_id: int, payload: OrderUpdate, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
     """full order update (Admin only)"""
     order = db.get(models.Order, order_id)
     if not order:
@@ -157,30 +281,10 @@ def update_order(order_id: int, payload: OrderUpdate, db: Session = Depends(get_
     
     # send notifications if status was changed
     if payload.status is not None and old_status != payload.status and order.user:
-        status_messages = {
-            "NEW": "принят",
-            "COOKING": "готовится",
-            "ON_WAY": "в пути",
-            "DELIVERED": "доставлен",
-            "CANCELLED": "отменен"
-        }
-        
-        status_text = status_messages.get(payload.status, payload.status)
-        title = "Статус заказа изменен"
-        body = f"Заказ #{order.number} {status_text}"
+        status_text = STATUS_TEXT.get(payload.status, payload.status)
         
-        # send push notifications to all user's devices
-        for device in order.user.devices:
-            try:
-                send_to_token(device.fcm_token, title=title, body=body, data={
-                    "order_id": str(order.id),
-                    "order_number": order.number,
-                    "status": payload.status,
-                    "type": "order_status_update"
-                })
-            except Exception as e:
-                # log error but don't fail the request
-                print(f"Failed to send push notification to device {device.id}: {e}")
+        # push to all user's devices: coalesced per order and sent off the request path
+        notify_order_status(order, payload.status)
         
         # send email notifications (best-effort)
         if order.user.email:
@@ -199,7 +303,7 @@ def update_order(order_id: int, payload: OrderUpdate, db: Session = Depends(get_
 
 
 @router.delete("/{order_id}")
-def delete_order(order_id: int, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+def delete_order(order_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
     """delete an order (Admin only)"""
     order = db.get(models.Order, order_id)
     if not order:
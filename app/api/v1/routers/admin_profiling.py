@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiling import issue_profile_token, profile_store, to_collapsed, to_speedscope
+from app.core.security import require_admin, Principal
+
+router = APIRouter(prefix="/admin/profiling", tags=["admin"])
+
+
+@router.post("/token")
+def create_profile_token(
+    ttl_seconds: int = Query(600, ge=30, le=3600),
+    admin: Principal = Depends(require_admin),
+):
+    """short-lived, single-use token; send it as X-Profile-Token to profile one request."""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=503, detail="Request profiling is disabled")
+    return {
+        "token": issue_profile_token(admin.id, ttl_seconds),
+        "header": "X-Profile-Token",
+        "expires_in": ttl_seconds,
+    }
+
+
+@router.get("/profiles")
+def list_profiles(_: Principal = Depends(require_admin)):
+    """recent profiles, newest first (without the stack data)."""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed|raw)$"),
+    _: Principal = Depends(require_admin),
+):
+    """download a profile as speedscope JSON, collapsed stacks (flamegraph.pl) or raw JSON."""
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    filename = f"profile-{profile_id}"
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(profile),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.folded"'},
+        )
+    if format == "speedscope":
+        return JSONResponse(
+            to_speedscope(profile),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+        )
+    return profile
@@ -1,17 +1,24 @@
-from typing import List
+from typing import List, Optional
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
 
-from app.core.security import require_admin
+from app.core.config import settings
+from app.core.jobs import cancel_job, requeue_job
+from app.core.security import require_admin, Principal
 from app.db.session import get_db
 from app import models
-from app.schemas.admin import AdminPushRequest, AdminPushResponse, AdminSmsRequest, AdminSmsResponse, PushResult
+from app.schemas.admin import (
+    AdminPushRequest, AdminPushResponse, AdminSmsRequest, AdminSmsResponse, PushCampaignOut, PushResult,
+    SmsBroadcastOut, SmsRecipientOut,
+)
+from app.services.push.campaigns import build_target_query, campaign_runner, count_targets, create_campaign
+from app.services.push.device_tokens import prune_dead_tokens
 from app.services.push.fcm_admin import send_to_token, send_batch, send_to_topic
-from app.services.sms.twilio_sender import send_sms
+from app.services.push.topics import sync_pending_devices, topic_for_targeting
+from app.services.sms.broadcasts import broadcast_runner, create_broadcast
 
 logger = logging.getLogger(__name__)
 
@@ -20,71 +27,37 @@ router = APIRouter(prefix="/admin/push", tags=["admin"])
 
 def _get_targeted_tokens(db: Session, targeting) -> tuple[List[str], str]:
     """get FCM tokens based on targeting criteria."""
-    query = db.query(models.Device).filter(models.Device.fcm_token.is_not(None))
-    targeting_method = f"audience:{targeting.audience}"
-    
-    # base query - all devices with FCM tokens
-    if targeting.audience == "all":
-        pass  # No additional filtering
-    
-    elif targeting.audience == "platform":
-        if not targeting.platform:
-            raise HTTPException(status_code=400, detail="Platform required for platform targeting")
-        query = query.filter(models.Device.platform == targeting.platform)
-        targeting_method += f",platform:{targeting.platform}"
-    
-    elif targeting.audience == "verified_users":
-        # join with users table to filter verified users
-        query = query.join(models.User).filter(
-            or_(
-                models.User.is_email_verified == True,
-                models.User.is_phone_verified == True
-            )
-        )
-        targeting_method += ",verified_only"
-    
-    elif targeting.audience == "role":
-        if not targeting.user_role:
-            raise HTTPException(status_code=400, detail="User role required for role targeting")
-        query = query.join(models.User).filter(models.User.role == targeting.user_role)
-        targeting_method += f",role:{targeting.user_role}"
-    
-    elif targeting.audience == "topic":
+    if targeting.audience == "topic":
         # for topic messaging, we don't need individual tokens
         return [], f"topic:{targeting.topic}"
-    
-    else:
-        raise HTTPException(status_code=400, detail=f"Unsupported audience: {targeting.audience}")
-    
-    # apply additional filters
-    if targeting.verified_only and targeting.audience not in ["verified_users"]:
-        if models.User not in [mapper.class_ for mapper in query.column_descriptions]:
-            query = query.join(models.User)
-        query = query.filter(
-            or_(
-                models.User.is_email_verified == True,
-                models.User.is_phone_verified == True
-            )
-        )
-        targeting_method += ",verified_only"
-    
-    if targeting.platform and targeting.audience != "platform":
-        query = query.filter(models.Device.platform == targeting.platform)
-        targeting_method += f",platform:{targeting.platform}"
+    query, targeting_method = _target_query(db, targeting)
     
     # apply limit if specified
     if targeting.max_devices:
         query = query.limit(targeting.max_devices)
-        targeting_method += f",limit:{targeting.max_devices}"
     
-    devices = query.all()
-    tokens = [device.fcm_token for device in devices if device.fcm_token]
+    # only the token column: campaigns can target hundreds of thousands of devices
+    tokens = [token for (token,) in query.with_entities(models.Device.fcm_token) if token]
     
     return tokens, targeting_method
 
 
+def _target_query(db: Session, targeting):
+    try:
+        return build_target_query(db, targeting)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _count_targets(db: Session, targeting) -> int:
+    try:
+        return count_targets(db, targeting)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/send", response_model=AdminPushResponse)
-def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+def send_push(req: AdminPushRequest, db: Session = Depends(get_db), principal: Principal = Depends(require_admin)):
     """
     Send push notifications with advanced targeting capabilities.
     
@@ -94,6 +67,11 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
     - verified_users: Target only verified users
     - role: Target users with specific role
     - topic: Send to topic subscribers
+    
+    all/platform/role audiences without further filters go to their FCM topic (see
+    app/services/push/topics.py) once every matching device is subscribed.
+    Token audiences larger than PUSH_INLINE_MAX_DEVICES are queued as a push campaign
+    job (status "queued", job_id set); follow it at GET /admin/push/jobs/{job_id}.
     """
     timestamp = datetime.utcnow().isoformat()
     
@@ -118,15 +96,16 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
                     topic=req.targeting.topic
                 )
             else:
-                tokens, targeting_method = _get_targeted_tokens(db, req.targeting)
+                _, targeting_method = _target_query(db, req.targeting)
                 return AdminPushResponse(
                     status="skipped",
                     sent=0,
                     failed=0,
-                    total=len(tokens),
+                    total=_count_targets(db, req.targeting),
                     targeting_method=targeting_method,
                     timestamp=timestamp,
-                    reason="dry_run"
+                    reason="dry_run",
+                    topic=topic_for_targeting(db, req.targeting),
                 )
         
         # handle topic messaging
@@ -134,39 +113,27 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
             if not req.targeting.topic:
                 raise HTTPException(status_code=400, detail="Topic required for topic messaging")
             
-            logger.info(f"Sending topic push notification to '{req.targeting.topic}'")
-            result = send_to_topic(
-                topic=req.targeting.topic,
-                title=req.title,
-                body=req.body,
-                data=req.data,
-                priority=req.priority,
-                ttl=req.ttl
+            return _send_topic(req, req.targeting.topic, f"topic:{req.targeting.topic}", timestamp)
+        
+        # audiences that map to an FCM topic (all, platform, role) are a single send
+        topic = topic_for_targeting(db, req.targeting)
+        if topic:
+            _, targeting_method = _target_query(db, req.targeting)
+            return _send_topic(req, topic, f"{targeting_method},via_topic:{topic}", timestamp)
+        
+        # large audiences go to the background runner instead of holding the request open
+        total = _count_targets(db, req.targeting)
+        if total > settings.PUSH_INLINE_MAX_DEVICES:
+            campaign = _create_campaign(db, req, principal)
+            return AdminPushResponse(
+                status="queued",
+                sent=0,
+                failed=0,
+                total=campaign.total,
+                targeting_method=campaign.targeting_method,
+                timestamp=timestamp,
+                job_id=campaign.id,
             )
-            
-            if result["status"] == "sent":
-                return AdminPushResponse(
-                    status="completed",
-                    sent=1,  # Topic messages are counted as 1 successful send
-                    failed=0,
-                    total=1,
-                    targeting_method=f"topic:{req.targeting.topic}",
-                    timestamp=timestamp,
-                    message_id=result["id"],
-                    topic=req.targeting.topic
-                )
-            else:
-                return AdminPushResponse(
-                    status="error",
-                    sent=0,
-                    failed=1,
-                    total=1,
-                    targeting_method=f"topic:{req.targeting.topic}",
-                    timestamp=timestamp,
-                    topic=req.targeting.topic,
-                    reason=result.get("reason", "unknown_error"),
-                    errors=[result.get("error", "Unknown error")]
-                )
         
         # handle token-based messaging
         tokens, targeting_method = _get_targeted_tokens(db, req.targeting)
@@ -202,6 +169,7 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
             else:
                 sent, failed = 0, 1
                 results = [PushResult(token=tokens[0][:20] + "...", success=False, error=result.get("error", "Unknown error"))]
+            dead_tokens = tokens if result.get("reason") in ("token_unregistered", "sender_id_mismatch") else []
             
         else:
             result = send_batch(
@@ -220,6 +188,10 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
             results = []
             for ft in result.get("failed_tokens", []):
                 results.append(PushResult(token=(ft.get("token") or '')[:20] + "...", success=False, error=ft.get("error")))
+            dead_tokens = result.get("dead_tokens", [])
+        
+        # drop devices FCM will never deliver to again, so the next campaign skips them
+        pruned = prune_dead_tokens(db, dead_tokens) if dead_tokens else 0
         
         # collect error reasons
         errors = []
@@ -236,7 +208,8 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
             targeting_method=targeting_method,
             timestamp=timestamp,
             errors=list(set(errors)) if errors else None,
-            results=results if len(results) <= 100 else results[:100]  # Limit results for large batches
+            results=results if len(results) <= 100 else results[:100],  # Limit results for large batches
+            pruned=pruned,
         )
     
     except HTTPException:
@@ -255,26 +228,195 @@ def send_push(req: AdminPushRequest, db: Session = Depends(get_db), _: models.Us
         )
 
 
-@router.post("/send-sms", response_model=AdminSmsResponse)
-def send_sms_broadcast(req: AdminSmsRequest, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
-    """send SMS message to all users with verified phone numbers."""
-    # currently only audience="all" is supported
-    # get all users with verified phone numbers
-    users_with_phones = db.query(models.User).filter(
-        models.User.phone.is_not(None),
-        models.User.is_phone_verified.is_(True)
-    ).all()
-    
-    phone_numbers: List[str] = [user.phone for user in users_with_phones if user.phone]
-    sent = 0
+def _send_topic(req: AdminPushRequest, topic: str, targeting_method: str, timestamp: str) -> AdminPushResponse:
+    logger.info(f"Sending topic push notification to '{topic}'")
+    result = send_to_topic(
+        topic=topic,
+        title=req.title,
+        body=req.body,
+        data=req.data,
+        priority=req.priority,
+        ttl=req.ttl
+    )
     
-    for phone in phone_numbers:
-        try:
-            result = send_sms(phone, req.message)
-            if isinstance(result, dict) and result.get("status") == "sent":
-                sent += 1
-        except Exception:
-            # ignore individual failures in MVP
-            pass
-    
-    return AdminSmsResponse(sent=sent)
+    if result["status"] == "sent":
+        return AdminPushResponse(
+            status="completed",
+            sent=1,  # Topic messages are counted as 1 successful send
+            failed=0,
+            total=1,
+            targeting_method=targeting_method,
+            timestamp=timestamp,
+            message_id=result["id"],
+            topic=topic
+        )
+    return AdminPushResponse(
+        status="error",
+        sent=0,
+        failed=1,
+        total=1,
+        targeting_method=targeting_method,
+        timestamp=timestamp,
+        topic=topic,
+        reason=result.get("reason", "unknown_error"),
+        errors=[result.get("error", "Unknown error")]
+    )
+
+
+def _create_campaign(db: Session, req: AdminPushRequest, principal: Principal) -> models.PushCampaign:
+    try:
+        return create_campaign(
+            db,
+            title=req.title,
+            body=req.body,
+            targeting=req.targeting,
+            data=req.data,
+            priority=req.priority,
+            ttl=req.ttl,
+            created_by=principal.id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _get_job(db: Session, model, job_id: int, lock: bool = True):
+    job = db.get(model, job_id, with_for_update=lock)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs", response_model=PushCampaignOut, status_code=202)
+def create_push_job(req: AdminPushRequest, db: Session = Depends(get_db), principal: Principal = Depends(require_admin)):
+    """queue a push campaign for the background runner (token audiences only)."""
+    if req.priority not in ["normal", "high"]:
+        raise HTTPException(status_code=400, detail="Priority must be 'normal' or 'high'")
+    if req.targeting.audience == "topic":
+        raise HTTPException(status_code=400, detail="Topic messages are sent by FCM in one call, use /send")
+    return PushCampaignOut.from_campaign(_create_campaign(db, req, principal))
+
+
+@router.get("/jobs", response_model=List[PushCampaignOut])
+def list_push_jobs(
+    status: Optional[str] = Query(None, description="queued|running|completed|failed|cancelled"),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """list recent push campaigns, newest first."""
+    query = db.query(models.PushCampaign)
+    if status:
+        query = query.filter(models.PushCampaign.status == status)
+    campaigns = query.order_by(models.PushCampaign.id.desc()).limit(limit).all()
+    return [PushCampaignOut.from_campaign(c) for c in campaigns]
+
+
+@router.get("/jobs/{job_id}", response_model=PushCampaignOut)
+def get_push_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """push campaign progress: sent, failed and remaining devices."""
+    return PushCampaignOut.from_campaign(_get_job(db, models.PushCampaign, job_id, lock=False))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=PushCampaignOut)
+def cancel_push_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """stop a queued or running campaign (a running one stops after its current chunk)."""
+    campaign = _get_job(db, models.PushCampaign, job_id)
+    try:
+        cancel_job(db, campaign)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PushCampaignOut.from_campaign(campaign)
+
+
+@router.post("/jobs/{job_id}/resume", response_model=PushCampaignOut)
+def resume_push_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """queue a failed or cancelled campaign again; it continues after the last checkpointed device."""
+    campaign = _get_job(db, models.PushCampaign, job_id)
+    try:
+        requeue_job(db, campaign, campaign_runner)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PushCampaignOut.from_campaign(campaign)
+
+
+@router.post("/topics/sync")
+def sync_push_topics(background: BackgroundTasks, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """subscribe every device still waiting for a topic sync (backfill), in the background."""
+    pending = db.query(models.Device).filter(
+        models.Device.topics_synced_at.is_(None), models.Device.fcm_token.is_not(None)
+    ).count()
+    if pending:
+        background.add_task(sync_pending_devices)
+    return {"status": "started" if pending else "up_to_date", "pending": pending}
+
+
+@router.post("/send-sms", response_model=AdminSmsResponse, status_code=202)
+def send_sms_broadcast(req: AdminSmsRequest, db: Session = Depends(get_db), principal: Principal = Depends(require_admin)):
+    """queue an SMS to all users with verified phone numbers; the background runner sends it."""
+    try:
+        broadcast = create_broadcast(db, message=req.message, audience=req.audience, created_by=principal.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AdminSmsResponse(sent=0, status="queued", job_id=broadcast.id, total=broadcast.total)
+
+
+@router.get("/sms-jobs", response_model=List[SmsBroadcastOut])
+def list_sms_jobs(
+    status: Optional[str] = Query(None, description="queued|running|completed|failed|cancelled"),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """list recent SMS broadcasts, newest first."""
+    query = db.query(models.SmsBroadcast)
+    if status:
+        query = query.filter(models.SmsBroadcast.status == status)
+    broadcasts = query.order_by(models.SmsBroadcast.id.desc()).limit(limit).all()
+    return [SmsBroadcastOut.from_broadcast(b) for b in broadcasts]
+
+
+@router.get("/sms-jobs/{job_id}", response_model=SmsBroadcastOut)
+def get_sms_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """SMS broadcast progress: sent, failed and remaining recipients."""
+    return SmsBroadcastOut.from_broadcast(_get_job(db, models.SmsBroadcast, job_id, lock=False))
+
+
+@router.get("/sms-jobs/{job_id}/recipients", response_model=List[SmsRecipientOut])
+def list_sms_job_recipients(
+    job_id: int,
+    status: Optional[str] = Query(None, description="sent|failed"),
+    after_id: int = Query(0, ge=0, description="return recipients after this id (keyset pagination)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    _: Principal = Depends(require_admin),
+):
+    """per-recipient outcome of a broadcast, in send order."""
+    query = db.query(models.SmsBroadcastRecipient).filter(
+        models.SmsBroadcastRecipient.broadcast_id == job_id,
+        models.SmsBroadcastRecipient.id > after_id,
+    )
+    if status:
+        query = query.filter(models.SmsBroadcastRecipient.status == status)
+    return query.order_by(models.SmsBroadcastRecipient.id).limit(limit).all()
+
+
+@router.post("/sms-jobs/{job_id}/cancel", response_model=SmsBroadcastOut)
+def cancel_sms_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """stop a queued or running broadcast (a running one stops after its current chunk)."""
+    broadcast = _get_job(db, models.SmsBroadcast, job_id)
+    try:
+        cancel_job(db, broadcast)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return SmsBroadcastOut.from_broadcast(broadcast)
+
+
+@router.post("/sms-jobs/{job_id}/resume", response_model=SmsBroadcastOut)
+def resume_sms_job(job_id: int, db: Session = Depends(get_db), _: Principal = Depends(require_admin)):
+    """queue a failed or cancelled broadcast again; it continues after the last checkpointed user."""
+    broadcast = _get_job(db, models.SmsBroadcast, job_id)
+    try:
+        requeue_job(db, broadcast, broadcast_runner)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return SmsBroadcastOut.from_broadcast(broadcast)
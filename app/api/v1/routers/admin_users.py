@@ -1,12 +1,14 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 
-from app.core.security import require_admin_only, get_password_hash
+from app.core.security import require_admin_only, Principal, invalidate_principal
+from app.core.passwords import password_hasher
 from app.db.session import get_db
 from app import models
 from app.schemas.users import UserCreate, UserUpdateAdmin, UserOut
+from app.services.push.topics import mark_user_devices_stale, sync_devices
 
 router = APIRouter(prefix="/admin/users", tags=["admin"])
 
@@ -15,7 +17,7 @@ router = APIRouter(prefix="/admin/users", tags=["admin"])
 def create_user(
     payload: UserCreate,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(require_admin_only),
+    admin: Principal = Depends(require_admin_only),
 ):
     """Create a new manager or courier user"""
     # Check if user with email already exists
@@ -30,7 +32,7 @@ def create_user(
             raise HTTPException(status_code=400, detail="User with this phone number already exists")
     
     # Hash password
-    password_hash = get_password_hash(payload.password)
+    password_hash = password_hasher.hash_sync(payload.password)
     
     # Create new user
     new_user = models.User(
@@ -58,7 +60,7 @@ def list_users(
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin_only),
+    _: Principal = Depends(require_admin_only),
 ):
     """List all users with optional filtering"""
     query = db.query(models.User)
@@ -90,7 +92,7 @@ def list_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin_only),
+    _: Principal = Depends(require_admin_only),
 ):
     """Get specific user by ID"""
     user = db.get(models.User, user_id)
@@ -103,8 +105,9 @@ def get_user(
 def update_user(
     user_id: int,
     payload: UserUpdateAdmin,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(require_admin_only),
+    admin: Principal = Depends(require_admin_only),
 ):
     """Update user details and role"""
     user = db.get(models.User, user_id)
@@ -135,11 +138,19 @@ def update_user(
     
     # Update fields if provided
     update_data = payload.dict(exclude_unset=True)
+    role_changed = "role" in update_data and update_data["role"] != user.role
     for key, value in update_data.items():
         setattr(user, key, value)
     
+    # move the user's devices to the new role topic
+    device_ids = mark_user_devices_stale(db, user.id) if role_changed else []
+    
     db.add(user)
     db.commit()
+    if device_ids:
+        background.add_task(sync_devices, device_ids)
+    # role or verification flags may have changed
+    invalidate_principal(user.id)
     db.refresh(user)
     
     return user
@@ -148,8 +159,9 @@ def update_user(
 @router.delete("/{user_id}")
 def delete_user(
     user_id: int,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(require_admin_only),
+    admin: Principal = Depends(require_admin_only),
 ):
     """Delete a user (admin cannot delete themselves)"""
     user = db.get(models.User, user_id)
@@ -168,8 +180,13 @@ def delete_user(
             detail=f"Cannot delete user with {order_count} orders. Consider deactivating instead."
         )
     
+    # devices outlive the user (user_id SET NULL) and leave its role topic
+    device_ids = mark_user_devices_stale(db, user.id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
+    if device_ids:
+        background.add_task(sync_devices, device_ids)
     
     return {"message": f"User {user.full_name} deleted successfully"}
 
@@ -178,7 +195,7 @@ def delete_user(
 def activate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin_only),
+    _: Principal = Depends(require_admin_only),
 ):
     """Activate a user account (future feature - placeholder)"""
     user = db.get(models.User, user_id)
@@ -195,7 +212,7 @@ def activate_user(
 def deactivate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: models.User = Depends(require_admin_only),
+    admin: Principal = Depends(require_admin_only),
 ):
     """Deactivate a user account (future feature - placeholder)"""
     user = db.get(models.User, user_id)
@@ -212,25 +229,26 @@ def deactivate_user(
     return {"message": f"User {user.full_name} deactivated successfully"}
 
 
+@router.get("/stats/password-hashing")
+def get_password_hashing_stats(_: Principal = Depends(require_admin_only)):
+    """queue depth, latency and rejection counters of the password hashing pool (this worker)."""
+    return password_hasher.stats()
+
+
 @router.get("/stats/summary")
 def get_user_stats(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin_only),
+    _: Principal = Depends(require_admin_only),
 ):
     """Get user statistics by role"""
-    stats = {}
-    
-    # Count users by role
     roles = ["admin", "manager", "courier", "user"]
-    for role in roles:
-        count = db.query(models.User).filter(models.User.role == role).count()
-        stats[f"{role}_count"] = count
-    
-    # Total users
-    stats["total_users"] = db.query(models.User).count()
     
-    # Users with verified email/phone
-    stats["email_verified_count"] = db.query(models.User).filter(models.User.is_email_verified == True).count()
-    stats["phone_verified_count"] = db.query(models.User).filter(models.User.is_phone_verified == True).count()
+    # Count users by role, total and verified in a single statement using FILTER aggregates
+    row = db.query(
+        *[func.count(models.User.id).filter(models.User.role == role).label(f"{role}_count") for role in roles],
+        func.count(models.User.id).label("total_users"),
+        func.count(models.User.id).filter(models.User.is_email_verified == True).label("email_verified_count"),
+        func.count(models.User.id).filter(models.User.is_phone_verified == True).label("phone_verified_count"),
+    ).one()
     
-    return stats
\ No newline at end of file
+    return dict(row._mapping)
\ No newline at end of file
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash, verify_password, create_access_token
-from app.db.session import get_db
+from app.core.security import create_access_token
+from app.core.passwords import password_hasher
+from app.db.session import get_async_db
 from app import models
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse, UserOut
 
@@ -10,43 +12,55 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserOut)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     # ensure either email or phone is provided
     if not payload.email and not payload.phone:
         raise HTTPException(status_code=400, detail="Email or phone is required")
 
     # check duplicates
     if payload.email:
-        existing = db.query(models.User).filter(models.User.email == payload.email).first()
+        existing = await db.scalar(select(models.User.id).where(models.User.email == payload.email).limit(1))
         if existing:
             raise HTTPException(status_code=400, detail="Email already registered")
     if payload.phone:
-        existing = db.query(models.User).filter(models.User.phone == payload.phone).first()
+        existing = await db.scalar(select(models.User.id).where(models.User.phone == payload.phone).limit(1))
         if existing:
             raise HTTPException(status_code=400, detail="Phone already registered")
 
+    # bcrypt runs in the hashing process pool (429 when saturated)
+    password_hash = await password_hasher.hash(payload.password)
     user = models.User(
         full_name=payload.full_name,
         email=payload.email,
         phone=payload.phone,
         dob=payload.dob,
-        password_hash=get_password_hash(payload.password),
+        password_hash=password_hash,
         role="user",
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    q = db.query(models.User)
-    user = q.filter(models.User.email == payload.email_or_phone).first()
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    # email match wins over phone match, as before
+    candidates = (await db.scalars(
+        select(models.User).where(
+            or_(models.User.email == payload.email_or_phone, models.User.phone == payload.email_or_phone)
+        )
+    )).all()
+    user = next((u for u in candidates if u.email == payload.email_or_phone), None) or next(iter(candidates), None)
     if not user:
-        user = q.filter(models.User.phone == payload.email_or_phone).first()
-    if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await password_hasher.verify_and_update(payload.password, user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # stored hash used another bcrypt cost; upgrade it now that we know the password
+        user.password_hash = new_hash
+        await db.commit()
 
     token = create_access_token(subject=str(user.id), role=user.role)
-    return TokenResponse(access_token=token, user=user)
\ No newline at end of file
+    return TokenResponse(access_token=token, user=user)
@@ -9,9 +9,9 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.db.session import get_db
 from app import models
-from app.core.security import optional_oauth2_scheme, decode_token
+from app.core.security import optional_oauth2_scheme, decode_token, invalidate_principal
 from app.schemas.auth_email import EmailStartRequest, EmailStartResponse, EmailVerifyResponse, EmailVerifyCodeRequest
-from app.services.email.email_sender import send_email
+from app.services.email.queue import enqueue_email
 
 router = APIRouter(prefix="/auth/email", tags=["auth"])
 
@@ -59,7 +59,7 @@ def start_email_verification(payload: EmailStartRequest, db: Session = Depends(g
     db.add(ev)
     db.commit()
 
-    # send email (best-effort)
+    # queue email (best-effort)
     try:
         verify_link = f"{settings.FRONTEND_URL}/verify-email?email={target_email}&token={raw_token}"
         
@@ -76,9 +76,8 @@ def start_email_verification(payload: EmailStartRequest, db: Session = Depends(g
             except Exception:
                 pass
         
-        # use new email sender with verify_email template
-        import asyncio
-        result = asyncio.run(send_email(
+        # queued: the email queue sends it in its next batch
+        enqueue_email(
             template="verify_email",
             to=target_email,
             variables={
@@ -86,8 +85,9 @@ def start_email_verification(payload: EmailStartRequest, db: Session = Depends(g
                 "verify_url": verify_link,
                 "otp": raw_code
             },
-            user_id=user_id
-        ))
+            user_id=user_id,
+            idempotency_key=f"verify_email:{ev.id}",
+        )
     except Exception:
         pass
 
@@ -123,6 +123,8 @@ def verify_email(email: str = Query(...), token: str = Query(...), db: Session =
         db.add(user)
 
     db.commit()
+    if user:
+        invalidate_principal(user.id)
     return EmailVerifyResponse()
 
 
@@ -153,4 +155,6 @@ def verify_email_code(payload: EmailVerifyCodeRequest, db: Session = Depends(get
         db.add(user)
 
     db.commit()
+    if user:
+        invalidate_principal(user.id)
     return EmailVerifyResponse()
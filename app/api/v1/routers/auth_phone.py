@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.security import optional_oauth2_scheme, decode_token, create_access_token
+from app.core.security import optional_oauth2_scheme, decode_token, create_access_token, invalidate_principal
 from app.db.session import get_db
 from app import models
 from app.schemas.auth_phone import (
@@ -122,6 +122,7 @@ def verify_phone_code(payload: PhoneVerifyCodeRequest, db: Session = Depends(get
         user.is_phone_verified = True
         db.add(user)
         db.commit()
+        invalidate_principal(user.id)
     
     # mark any existing tracking records as used
     existing_pv = (
@@ -186,6 +187,7 @@ def login_with_phone_otp(payload: PhoneLoginRequest, db: Session = Depends(get_d
         db.add(existing_pv)
     
     db.commit()
+    invalidate_principal(user.id)
     
     # generate access token
     token = create_access_token(subject=str(user.id), role=user.role)
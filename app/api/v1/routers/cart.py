@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from decimal import Decimal
 
-from app.core.security import get_current_user
-from app.db.session import get_db
+from app.core.security import get_current_principal, Principal
+from app.db.instrumentation import query_budget
+from app.db.session import get_async_db
 from app import models
 from app.schemas.promo_cart import PriceRequest, PriceResponse, PriceDetailsLine
 from app.schemas.cart import (
@@ -15,18 +18,41 @@ from app.services.promo.validator import calculate_discount
 
 router = APIRouter(prefix="/cart", tags=["cart"]) 
 
+# async sessions can't lazy-load, so cart reads pull the whole item graph up front
+_CART_ITEMS_GRAPH = (
+    selectinload(models.Cart.items).selectinload(models.CartItem.menu_item),
+    selectinload(models.Cart.items)
+    .selectinload(models.CartItem.modifications)
+    .selectinload(models.CartItemModification.modification_type),
+)
+
 
-def get_or_create_cart(user_id: int, db: Session) -> models.Cart:
+async def get_or_create_cart(user_id: int, db: AsyncSession, with_items: bool = False) -> models.Cart:
     """get existing cart or create a new one for the user."""
-    cart = db.query(models.Cart).filter(models.Cart.user_id == user_id).first()
+    q = select(models.Cart).where(models.Cart.user_id == user_id)
+    if with_items:
+        q = q.options(*_CART_ITEMS_GRAPH)
+    cart = (await db.scalars(q)).first()
     if not cart:
-        cart = models.Cart(user_id=user_id)
+        cart = models.Cart(user_id=user_id, items=[])
         db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        await db.commit()
     return cart
 
 
+async def _active_modification_type_ids(db: AsyncSession, modifications: List[dict]) -> set:
+    """ids of active modification types referenced by the payload, in one query."""
+    ids = {m.get("modification_type_id") for m in modifications if m.get("modification_type_id") is not None}
+    if not ids:
+        return set()
+    rows = await db.scalars(
+        select(models.ModificationType.id).where(
+            models.ModificationType.id.in_(ids), models.ModificationType.is_active.is_(True)
+        )
+    )
+    return set(rows.all())
+
+
 def calculate_cart_totals(cart: models.Cart) -> dict:
     """calculate cart totals and item details."""
     subtotal = Decimal('0.0')
@@ -44,11 +70,10 @@ def calculate_cart_totals(cart: models.Cart) -> dict:
     }
 
 
-@router.get("/", response_model=CartResponse)
-def get_cart(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+@router.get("/", response_model=CartResponse, dependencies=[query_budget(6)])
+async def get_cart(db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal)):
     """get current user's cart."""
-    cart = get_or_create_cart(user.id, db)
-    
+    cart = await get_or_create_cart(user.id, db, with_items=True)
     # calculate totals
     totals = calculate_cart_totals(cart)
     
@@ -92,15 +117,15 @@ def get_cart(db: Session = Depends(get_db), user: models.User = Depends(get_curr
     return CartResponse(message="Cart retrieved successfully", cart=cart_response)
 
 
-@router.post("/add", response_model=CartItemResponse)
-def add_to_cart(
+@router.post("/add", response_model=CartItemResponse, dependencies=[query_budget(8)])
+async def add_to_cart(
     payload: AddToCartRequest, 
-    db: Session = Depends(get_db), 
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db), 
+    user: Principal = Depends(get_current_principal)
 ):
     """add item to cart."""
     # check menu item
-    menu_item = db.query(models.MenuItem).filter(models.MenuItem.id == payload.item_id).first()
+    menu_item = await db.get(models.MenuItem, payload.item_id)
     if not menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
     if not menu_item.is_active:
@@ -110,18 +135,19 @@ def add_to_cart(
         raise HTTPException(status_code=400, detail="Quantity must be positive")
     
     # get or create cart
-    cart = get_or_create_cart(user.id, db)
+    cart = await get_or_create_cart(user.id, db)
     
     # check if item already exists in cart
-    existing_item = db.query(models.CartItem).filter(
-        models.CartItem.cart_id == cart.id,
-        models.CartItem.item_id == payload.item_id
-    ).first()
+    existing_item = (await db.scalars(
+        select(models.CartItem).where(
+            models.CartItem.cart_id == cart.id,
+            models.CartItem.item_id == payload.item_id
+        )
+    )).first()
     
     if existing_item:
         # update quantity
         existing_item.qty += payload.qty
-        db.add(existing_item)
         cart_item = existing_item
     else:
         # create new cart item
@@ -132,45 +158,42 @@ def add_to_cart(
         )
         db.add(cart_item)
     
-    db.commit()
-    db.refresh(cart_item)
+    # flush to get the cart item id for its modifications
+    await db.flush()
     
     # add modifications if provided
+    active_types = await _active_modification_type_ids(db, payload.modifications)
     for mod_data in payload.modifications:
-        # check modification type
-        mod_type = db.query(models.ModificationType).filter(
-            models.ModificationType.id == mod_data.get("modification_type_id")
-        ).first()
-        if mod_type and mod_type.is_active:
-            cart_mod = models.CartItemModification(
+        if mod_data.get("modification_type_id") in active_types:
+            db.add(models.CartItemModification(
                 cart_item_id=cart_item.id,
                 modification_type_id=mod_data.get("modification_type_id"),
                 action=mod_data.get("action", "add")
-            )
-            db.add(cart_mod)
+            ))
     
-    db.commit()
-    db.refresh(cart_item)
+    await db.commit()
     
     return CartItemResponse(message="Item added to cart successfully", cart_item=None)
 
 
-@router.put("/item/{cart_item_id}", response_model=CartItemResponse)
-def update_cart_item(
+@router.put("/item/{cart_item_id}", response_model=CartItemResponse, dependencies=[query_budget(6)])
+async def update_cart_item(
     cart_item_id: int,
     payload: UpdateCartItemRequest,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal)
 ):
     """update cart item quantity and modifications."""
     # get user's cart
-    cart = get_or_create_cart(user.id, db)
+    cart = await get_or_create_cart(user.id, db)
     
     # find cart item
-    cart_item = db.query(models.CartItem).filter(
-        models.CartItem.id == cart_item_id,
-        models.CartItem.cart_id == cart.id
-    ).first()
+    cart_item = (await db.scalars(
+        select(models.CartItem).where(
+            models.CartItem.id == cart_item_id,
+            models.CartItem.cart_id == cart.id
+        )
+    )).first()
     
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
@@ -180,67 +203,66 @@ def update_cart_item(
     
     # update quantity
     cart_item.qty = payload.qty
-    db.add(cart_item)
     
     # update modifications if provided
     if payload.modifications is not None:
         # clear existing modifications
-        db.query(models.CartItemModification).filter(
-            models.CartItemModification.cart_item_id == cart_item.id
-        ).delete()
+        await db.execute(
+            delete(models.CartItemModification).where(
+                models.CartItemModification.cart_item_id == cart_item.id
+            )
+        )
         
         # add new modifications
+        active_types = await _active_modification_type_ids(db, payload.modifications)
         for mod_data in payload.modifications:
-            mod_type = db.query(models.ModificationType).filter(
-                models.ModificationType.id == mod_data.get("modification_type_id")
-            ).first()
-            if mod_type and mod_type.is_active:
-                cart_mod = models.CartItemModification(
+            if mod_data.get("modification_type_id") in active_types:
+                db.add(models.CartItemModification(
                     cart_item_id=cart_item.id,
                     modification_type_id=mod_data.get("modification_type_id"),
                     action=mod_data.get("action", "add")
-                )
-                db.add(cart_mod)
+                ))
     
-    db.commit()
-    db.refresh(cart_item)
+    await db.commit()
     
     return CartItemResponse(message="Cart item updated successfully", cart_item=None)
 
 
-@router.delete("/item/{cart_item_id}", response_model=CartItemResponse)
-def remove_cart_item(
+@router.delete("/item/{cart_item_id}", response_model=CartItemResponse, dependencies=[query_budget(6)])
+async def remove_cart_item(
     cart_item_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal)
 ):
     """remove item from cart."""
     # get user's cart
-    cart = get_or_create_cart(user.id, db)
+    cart = await get_or_create_cart(user.id, db)
     
     # find and delete cart item
-    cart_item = db.query(models.CartItem).filter(
-        models.CartItem.id == cart_item_id,
-        models.CartItem.cart_id == cart.id
-    ).first()
+    cart_item = (await db.scalars(
+        select(models.CartItem).where(
+            models.CartItem.id == cart_item_id,
+            models.CartItem.cart_id == cart.id
+        )
+    )).first()
     
     if not cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    db.delete(cart_item)
-    db.commit()
+    await db.delete(cart_item)
+    await db.commit()
     
     return CartItemResponse(message="Item removed from cart successfully", cart_item=None)
 
 
 @router.delete("/clear", response_model=CartResponse)
-def clear_cart(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+async def clear_cart(db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal)):
     """clear all items from cart."""
-    cart = get_or_create_cart(user.id, db)
+    cart = await get_or_create_cart(user.id, db)
     
     # delete all cart items
-    db.query(models.CartItem).filter(models.CartItem.cart_id == cart.id).delete()
-    db.commit()
+    await db.execute(delete(models.CartItem).where(models.CartItem.cart_id == cart.id))
+    await db.commit()
     
     # return empty cart
     cart_response = {
@@ -256,15 +278,14 @@ def clear_cart(db: Session = Depends(get_db), user: models.User = Depends(get_cu
     return CartResponse(message="Cart cleared successfully", cart=cart_response)
 
 
-@router.post("/price", response_model=CartPriceResponse)
-def calculate_cart_price(
+@router.post("/price", response_model=CartPriceResponse, dependencies=[query_budget(7)])
+async def calculate_cart_price(
     payload: CartPriceRequest,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal)
 ):
     """calculate cart price with optional promo code."""
-    cart = get_or_create_cart(user.id, db)
-    
+    cart = await get_or_create_cart(user.id, db, with_items=True)
     if not cart.items:
         return CartPriceResponse(
             subtotal=0.0,
@@ -287,7 +308,8 @@ def calculate_cart_price(
     promocode_message = None
     
     if payload.promocode:
-        promo_res = calculate_discount(db, payload.promocode, subtotal)
+        # promo validation is shared with the sync order flow
+        promo_res = await db.run_sync(calculate_discount, payload.promocode, subtotal)
         if promo_res.valid:
             discount = promo_res.discount
             promocode_valid = True
@@ -307,12 +329,12 @@ def calculate_cart_price(
 
 
 @router.post("/price-legacy", response_model=PriceResponse)
-def calculate_price(payload: PriceRequest, db: Session = Depends(get_db)):
+async def calculate_price(payload: PriceRequest, db: AsyncSession = Depends(get_async_db)):
     if not payload.items:
         return PriceResponse(subtotal=0.0, discount=0.0, total=0.0, details=[])
 
     item_ids = [ci.item_id for ci in payload.items]
-    items = {m.id: m for m in db.query(models.MenuItem).filter(models.MenuItem.id.in_(item_ids)).all()}
+    items = {m.id: m for m in (await db.scalars(select(models.MenuItem).where(models.MenuItem.id.in_(item_ids)))).all()}
 
     details: List[PriceDetailsLine] = []
     subtotal = Decimal('0.0')
@@ -335,7 +357,7 @@ def calculate_price(payload: PriceRequest, db: Session = Depends(get_db)):
             )
         )
 
-    promo_res = calculate_discount(db, payload.promocode, subtotal)
+    promo_res = await db.run_sync(calculate_discount, payload.promocode, subtotal)
     discount = promo_res.discount if promo_res.valid else Decimal('0.0')
     total = max(Decimal('0.0'), subtotal - discount).quantize(Decimal('0.01'))
     return PriceResponse(subtotal=float(subtotal), discount=float(discount), total=float(total), details=details)
@@ -5,10 +5,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
-from app.core.security import require_courier
+from app.core.security import require_courier, Principal
 from app.db.session import get_db
 from app import models
 from app.schemas.orders import OrderOut, OrderStatusUpdate
+from app.services.push.order_notifications import notify_order_status
 
 router = APIRouter(prefix="/courier", tags=["courier"])
 
@@ -23,7 +24,7 @@ def list_orders(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_courier),
+    _: Principal = Depends(require_courier),
 ):
     """List orders for courier - focus on delivery orders and active statuses"""
     query = db.query(models.Order)
@@ -60,7 +61,7 @@ def list_orders(
 def get_today_orders(
     status: Optional[str] = Query(None, description="Filter by status"),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_courier),
+    _: Principal = Depends(require_courier),
 ):
     """Get today's orders for courier dashboard"""
     from datetime import date, datetime, time
@@ -99,7 +100,7 @@ def get_today_orders(
 def get_order(
     order_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_courier),
+    _: Principal = Depends(require_courier),
 ):
     """Get specific order details for courier"""
     order = db.get(models.Order, order_id)
@@ -113,7 +114,7 @@ def update_order_status(
     order_id: int,
     status_update: OrderStatusUpdate,
     db: Session = Depends(get_db),
-    courier: models.User = Depends(require_courier),
+    courier: Principal = Depends(require_courier),
 ):
     """Update order status - couriers can change status for delivery workflow"""
     order = db.get(models.Order, order_id)
@@ -153,6 +154,9 @@ def update_order_status(
     db.commit()
     db.refresh(order)
     
+    # tell the customer (coalesced per order, sent off the request path)
+    notify_order_status(order, new_status)
+    
     return {
         "message": f"Order {order.number} status updated to {new_status}",
         "order_id": order.id,
@@ -167,7 +171,7 @@ def update_order_status(
 @router.get("/orders/assigned")
 def get_assigned_orders(
     db: Session = Depends(get_db),
-    courier: models.User = Depends(require_courier),
+    courier: Principal = Depends(require_courier),
 ):
     """Get orders currently assigned to this courier (if assignment system exists)"""
     # Note: This is a placeholder for future courier assignment functionality
@@ -196,7 +200,7 @@ def get_assigned_orders(
 def get_delivery_addresses(
     status: Optional[str] = Query("ON_WAY", description="Order status to filter addresses"),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_courier),
+    _: Principal = Depends(require_courier),
 ):
     """Get delivery addresses for orders in specified status"""
     query = db.query(models.Order).filter(
@@ -240,7 +244,7 @@ def get_delivery_addresses(
 def get_daily_stats(
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format, defaults to today"),
     db: Session = Depends(get_db),
-    courier: models.User = Depends(require_courier),
+    courier: Principal = Depends(require_courier),
 ):
     """Get daily statistics for courier performance"""
     from datetime import date as date_type, datetime
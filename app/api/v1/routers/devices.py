@@ -1,39 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import Optional, List
 
-from app.core.security import optional_oauth2_scheme, decode_token, require_admin
+from app.core.security import optional_oauth2_scheme, decode_token, require_admin, Principal
 from app.db.session import get_db
 from app import models
-from app.schemas.devices import DeviceRegisterRequest, DeviceOut
+from app.schemas.devices import DeviceRegisterBatchRequest, DeviceRegisterRequest, DeviceOut
+from app.services.push.device_tokens import upsert_devices
+from app.services.push.fcm_admin import unsubscribe_from_topic
+from app.services.push.topics import normalize_locale, sync_devices
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
 
+def _user_id_from_token(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    try:
+        sub = decode_token(token).get("sub")
+        return int(sub) if sub else None
+    except Exception:
+        # ignore invalid token for device registration (allow anonymous register)
+        return None
+
+
+def _register(db: Session, background: BackgroundTasks, registrations: List[DeviceRegisterRequest], user_id: Optional[int]) -> List[DeviceOut]:
+    rows = upsert_devices(db, [
+        {
+            "fcm_token": registration.fcm_token,
+            "platform": registration.platform,
+            "user_id": user_id,
+            "locale": normalize_locale(registration.locale),
+        }
+        for registration in registrations
+    ])
+    # platform/role/locale topics: subscribed after the response is sent
+    stale = [row.id for row in rows if row.topics_synced_at is None]
+    if stale:
+        background.add_task(sync_devices, stale)
+    return [DeviceOut(id=row.id, platform=row.platform, fcm_token=row.fcm_token) for row in rows]
+
+
 @router.post("/register", response_model=DeviceOut)
-def register_device(payload: DeviceRegisterRequest, db: Session = Depends(get_db), token: Optional[str] = Depends(optional_oauth2_scheme)):
-    user_id: Optional[int] = None
-    if token:
-        try:
-            payload_token = decode_token(token)
-            sub = payload_token.get("sub")
-            if sub:
-                user_id = int(sub)
-        except Exception:
-            # ignore invalid token for device registration (allow anonymous register)
-            pass
+def register_device(
+    payload: DeviceRegisterRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    # one upsert round trip; concurrent launches with the same token cannot collide on uq_devices_fcm_token
+    return _register(db, background, [payload], _user_id_from_token(token))[0]
 
-    device = db.query(models.Device).filter(models.Device.fcm_token == payload.fcm_token).first()
-    if device:
-        device.platform = payload.platform
-        if user_id and not device.user_id:
-            device.user_id = user_id
-    else:
-        device = models.Device(platform=payload.platform, fcm_token=payload.fcm_token, user_id=user_id)
-        db.add(device)
-    db.commit()
-    db.refresh(device)
-    return device
+
+@router.post("/register/batch", response_model=List[DeviceOut])
+def register_devices(
+    payload: DeviceRegisterBatchRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    """register several tokens (e.g. old and rotated) in a single statement."""
+    return _register(db, background, payload.devices, _user_id_from_token(token))
 
 
 # admin device management
@@ -41,7 +68,7 @@ def register_device(payload: DeviceRegisterRequest, db: Session = Depends(get_db
 @router.get("", response_model=List[DeviceOut])
 def list_devices(
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ):
     """list all devices (Admin only)"""
     devices = db.query(models.Device).order_by(models.Device.created_at.desc()).all()
@@ -51,14 +78,21 @@ def list_devices(
 @router.delete("/{device_id}")
 def delete_device(
     device_id: int,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ):
     """delete a device (Admin only)"""
     device = db.get(models.Device, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
+    topics = list(device.topics or [])
+    fcm_token = device.fcm_token
     db.delete(device)
     db.commit()
+    if topics:
+        # a deleted device keeps getting topic messages until it is unsubscribed
+        for topic in topics:
+            background.add_task(unsubscribe_from_topic, [fcm_token], topic)
     return {"message": "Device deleted successfully"}
@@ -7,11 +7,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, and_, or_, distinct
 
-from app.core.security import require_manager, get_password_hash
-from app.db.session import get_db
+from app.core.security import require_manager, Principal
+from app.core.passwords import password_hasher
+from app.db.session import get_db, get_read_db
 from app import models
 from app.schemas.admin import PromoGenerateRequest, PromoGenerateResponse, PromoOut, PromoUpdate, BannerCreate, BannerUpdate, BannerOut
 from app.schemas.users import CourierCreate, CourierUpdate, UserOut
+from app.services.cache import cached_result
 
 router = APIRouter(prefix="/manager", tags=["manager"])
 
@@ -71,7 +73,7 @@ def generate_promo(req: PromoGenerateRequest, db: Session = Depends(get_db), man
 @router.get("/promo", response_model=List[PromoOut])
 def list_promocodes(
     active: bool = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     manager = Depends(require_manager)
 ):
     """list all promocodes"""
@@ -104,7 +106,7 @@ def list_promocodes(
 @router.get("/promo/{code}", response_model=PromoOut)
 def get_promocode(
     code: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     manager = Depends(require_manager)
 ):
     """get a specific promocode"""
@@ -218,8 +220,8 @@ def delete_promocode(
 @router.get("/banners", response_model=List[BannerOut])
 def list_banners(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """list all banners with optional filtering"""
     query = db.query(models.Banner)
@@ -241,8 +243,8 @@ def list_banners(
 @router.get("/banners/all", response_model=List[BannerOut])
 def list_all_banners(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """list all banners including expired ones (manager view)"""
     query = db.query(models.Banner)
@@ -257,8 +259,8 @@ def list_all_banners(
 @router.get("/banners/{banner_id}", response_model=BannerOut)
 def get_banner(
     banner_id: int,
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """get a specific banner"""
     banner = db.get(models.Banner, banner_id)
@@ -271,7 +273,7 @@ def get_banner(
 def create_banner(
     payload: BannerCreate,
     db: Session = Depends(get_db),
-    manager: models.User = Depends(require_manager),
+    manager: Principal = Depends(require_manager),
 ):
     """create a new banner"""
     banner_data = payload.dict()
@@ -289,7 +291,7 @@ def update_banner(
     banner_id: int,
     payload: BannerUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """update a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -311,7 +313,7 @@ def update_banner(
 def delete_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """delete a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -327,7 +329,7 @@ def delete_banner(
 def activate_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """activate a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -344,7 +346,7 @@ def activate_banner(
 def deactivate_banner(
     banner_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """deactivate a banner"""
     banner = db.get(models.Banner, banner_id)
@@ -361,7 +363,7 @@ def deactivate_banner(
 def reorder_banners(
     banner_order: List[int],
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """reorder banners by updating their sort_order"""
     if not banner_order:
@@ -388,11 +390,12 @@ def reorder_banners(
 # =======================
 
 @router.get("/analytics/summary")
+@cached_result("manager.summary", params=("from_", "to"))
 def analytics_summary(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager)
 ):
     """Get summary analytics - read-only for managers"""
     from datetime import datetime
@@ -408,26 +411,29 @@ def analytics_summary(
     else:
         to_date = None
     
-    # base query
-    query = db.query(models.Order)
-    
+    # date range filter
+    conditions = []
     if from_date:
-        query = query.filter(models.Order.created_at >= from_date)
+        conditions.append(models.Order.created_at >= from_date)
     if to_date:
-        query = query.filter(models.Order.created_at <= to_date)
-    
-    # aggregate metrics
-    orders = query.all()
-    
-    total_orders = len(orders)
-    total_revenue = sum(order.total for order in orders)
-    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-    unique_customers = len(set(order.user_id for order in orders if order.user_id))
-    
-    # status breakdown
+        conditions.append(models.Order.created_at <= to_date)
+    
+    # one statement: a row per status plus the ROLLUP grand total (grouping(status) = 1)
+    rows = db.query(
+        func.grouping(models.Order.status),
+        models.Order.status,
+        func.count(models.Order.id),
+        func.coalesce(func.sum(models.Order.total), 0),
+        func.count(distinct(models.Order.user_id)),
+    ).filter(*conditions).group_by(func.rollup(models.Order.status)).all()
+    total_orders, total_revenue, unique_customers = 0, 0, 0
     status_counts = {}
-    for order in orders:
-        status_counts[order.status] = status_counts.get(order.status, 0) + 1
+    for is_total, status, count, revenue, customers in rows:
+        if is_total:
+            total_orders, total_revenue, unique_customers = count, revenue, customers
+        else:
+            status_counts[status] = count
+    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
     
     return {
         "total_orders": total_orders,
@@ -439,12 +445,13 @@ def analytics_summary(
 
 
 @router.get("/analytics/orders-by-period")
+@cached_result("manager.orders_by_period", params=("period", "from_", "to"))
 def orders_by_period(
     period: str = Query("day", description="Period: day, week, month"),
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager)
 ):
     """Get orders grouped by time period - read-only for managers"""
     from datetime import datetime, timedelta
@@ -500,12 +507,13 @@ def orders_by_period(
 
 
 @router.get("/analytics/dish-popularity")
+@cached_result("manager.dish_popularity", params=("from_", "to", "limit"))
 def dish_popularity(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=1000),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager)
 ):
     """Get dish popularity analytics - read-only for managers"""
     from datetime import datetime
@@ -564,7 +572,7 @@ def dish_popularity(
 def create_courier(
     payload: CourierCreate,
     db: Session = Depends(get_db),
-    manager: models.User = Depends(require_manager),
+    manager: Principal = Depends(require_manager),
 ):
     """Create a new courier user (managers only)"""
     # Check if user with email already exists
@@ -579,7 +587,7 @@ def create_courier(
             raise HTTPException(status_code=400, detail="User with this phone number already exists")
     
     # Hash password
-    password_hash = get_password_hash(payload.password)
+    password_hash = password_hasher.hash_sync(payload.password)
     
     # Create new courier user
     new_courier = models.User(
@@ -605,8 +613,8 @@ def list_couriers(
     search: Optional[str] = Query(None, description="Search by name or email"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """List all courier users"""
     query = db.query(models.User).filter(models.User.role == "courier")
@@ -630,8 +638,8 @@ def list_couriers(
 @router.get("/couriers/{courier_id}", response_model=UserOut)
 def get_courier(
     courier_id: int,
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """Get specific courier by ID"""
     courier = db.get(models.User, courier_id)
@@ -649,7 +657,7 @@ def update_courier(
     courier_id: int,
     payload: CourierUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """Update courier details"""
     courier = db.get(models.User, courier_id)
@@ -693,7 +701,7 @@ def update_courier(
 def delete_courier(
     courier_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    _: Principal = Depends(require_manager),
 ):
     """Delete a courier user"""
     courier = db.get(models.User, courier_id)
@@ -719,19 +727,16 @@ def delete_courier(
 
 @router.get("/couriers/stats/summary")
 def get_courier_stats(
-    db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager),
+    db: Session = Depends(get_read_db),
+    _: Principal = Depends(require_manager),
 ):
     """Get courier statistics"""
-    total_couriers = db.query(models.User).filter(models.User.role == "courier").count()
-    verified_email_couriers = db.query(models.User).filter(
-        models.User.role == "courier",
-        models.User.is_email_verified == True
-    ).count()
-    verified_phone_couriers = db.query(models.User).filter(
-        models.User.role == "courier",
-        models.User.is_phone_verified == True
-    ).count()
+    # single statement with FILTER aggregates instead of one count per metric
+    total_couriers, verified_email_couriers, verified_phone_couriers = db.query(
+        func.count(models.User.id),
+        func.count(models.User.id).filter(models.User.is_email_verified == True),
+        func.count(models.User.id).filter(models.User.is_phone_verified == True),
+    ).filter(models.User.role == "courier").one()
     
     return {
         "total_couriers": total_couriers,
@@ -1,15 +1,16 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 import os
 
-from app.db.session import get_db
+from app.db.session import get_db, get_async_read_db
 from app import models
-from app.core.security import require_manager
+from app.core.security import require_manager, Principal
 from app.schemas.menu import CategoryOut, CategoryCreate, CategoryUpdate, MenuItemOut, MenuItemCreate, MenuItemUpdate
 from app.schemas.admin import ImageUploadResponse, MenuItemImageUpdate
-from app.services.images.processor import image_processor
+from app.services.images.processor import get_image_processor
 from app.services.locale.locale_helper import get_localized_category_name, get_localized_menu_item_name, get_localized_menu_item_description
 from app.services.locale.translation_service import get_translation_service
 
@@ -17,11 +18,13 @@ router = APIRouter(prefix="/menu", tags=["menu"])
 
 
 @router.get("/categories", response_model=List[CategoryOut])
-def list_categories(
+async def list_categories(
     lc: str = Query("en", pattern="^(ru|kz|en)$"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    categories = db.query(models.Category).order_by(models.Category.sort.asc(), models.Category.name.asc()).all()
+    categories = (await db.scalars(
+        select(models.Category).order_by(models.Category.sort.asc(), models.Category.name.asc())
+    )).all()
     
     # apply localization
     for category in categories:
@@ -31,26 +34,26 @@ def list_categories(
 
 
 @router.get("/items", response_model=List[MenuItemOut])
-def list_items(
+async def list_items(
     category_id: Optional[int] = None,
     search: Optional[str] = None,
     active: Optional[bool] = True,
     lc: str = Query("en", pattern="^(ru|kz|en)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    q = db.query(models.MenuItem)
+    q = select(models.MenuItem)
     if category_id is not None:
-        q = q.filter(models.MenuItem.category_id == category_id)
+        q = q.where(models.MenuItem.category_id == category_id)
     if search:
         like = f"%{search}%"
-        q = q.filter(or_(models.MenuItem.name.ilike(like), models.MenuItem.description.ilike(like)))
+        q = q.where(or_(models.MenuItem.name.ilike(like), models.MenuItem.description.ilike(like)))
     if active is True:
-        q = q.filter(models.MenuItem.is_active.is_(True))
+        q = q.where(models.MenuItem.is_active.is_(True))
     elif active is False:
-        q = q.filter(models.MenuItem.is_active.is_(False))
+        q = q.where(models.MenuItem.is_active.is_(False))
     q = q.order_by(models.MenuItem.id.desc())
     
-    items = q.all()
+    items = (await db.scalars(q)).all()
     
     # apply localization
     for item in items:
@@ -61,8 +64,8 @@ def list_items(
 
 
 @router.get("/items/{item_id}", response_model=MenuItemOut)
-def get_item(item_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db: Session = Depends(get_db)):
-    item = db.get(models.MenuItem, item_id)
+async def get_item(item_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db: AsyncSession = Depends(get_async_read_db)):
+    item = await db.get(models.MenuItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -79,7 +82,7 @@ def get_item(item_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db: Se
 def create_category(
     payload: CategoryCreate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """create a new category"""
     # check for duplicate name
@@ -112,7 +115,7 @@ def update_category(
     category_id: int,
     payload: CategoryUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """update a category"""
     category = db.get(models.Category, category_id)
@@ -153,7 +156,7 @@ def update_category(
 def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """delete a category"""
     category = db.get(models.Category, category_id)
@@ -176,7 +179,7 @@ def delete_category(
 def create_menu_item(
     payload: MenuItemCreate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """create a new menu item"""
     # check category exists if provided
@@ -226,7 +229,7 @@ def update_menu_item(
     item_id: int,
     payload: MenuItemUpdate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """update a menu item"""
     menu_item = db.get(models.MenuItem, item_id)
@@ -283,7 +286,7 @@ def update_menu_item(
 def delete_menu_item(
     item_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """delete a menu item"""
     menu_item = db.get(models.MenuItem, item_id)
@@ -303,7 +306,7 @@ def delete_menu_item(
 @router.post("/images/upload", response_model=ImageUploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """Upload and process an image file for menu items.
     
@@ -314,7 +317,7 @@ async def upload_image(
     """
     try:
         # process the image
-        filename, file_path = await image_processor.process_image(file)
+        filename, file_path = await get_image_processor().process_image(file)
         
         # get file size
         file_size = os.path.getsize(file_path)
@@ -340,7 +343,7 @@ async def update_menu_item_image(
     item_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """Upload and set image for a specific menu item.
     
@@ -356,7 +359,7 @@ async def update_menu_item_image(
         old_image_url = menu_item.image_url
         
         # process the new image
-        filename, file_path = await image_processor.process_image(file)
+        filename, file_path = await get_image_processor().process_image(file)
         
         # generate new URL
         new_image_url = f"/static/images/{filename}"
@@ -370,7 +373,7 @@ async def update_menu_item_image(
         # optionally delete old image file (if it exists and was generated by us)
         if old_image_url and old_image_url.startswith("/static/images/"):
             old_filename = old_image_url.replace("/static/images/", "")
-            image_processor.delete_image(old_filename)
+            get_image_processor().delete_image(old_filename)
         
         return menu_item
         
@@ -385,7 +388,7 @@ async def update_menu_item_image(
 def remove_menu_item_image(
     item_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager)
+    _: Principal = Depends(require_manager)
 ):
     """remove image from a menu item."""
     menu_item = db.get(models.MenuItem, item_id)
@@ -402,7 +405,7 @@ def remove_menu_item_image(
     # optionally delete the file (if it was generated by us)
     if old_image_url and old_image_url.startswith("/static/images/"):
         old_filename = old_image_url.replace("/static/images/", "")
-        image_processor.delete_image(old_filename)
+        get_image_processor().delete_image(old_filename)
     
     return {"message": "Image removed from menu item successfully"}
 
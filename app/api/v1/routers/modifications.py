@@ -1,8 +1,9 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import get_current_user, require_admin
+from app.core.security import get_current_principal, require_admin, Principal
+from app.db.instrumentation import query_budget
 from app.db.session import get_db
 from app import models
 from app.schemas.modifications import (
@@ -20,7 +21,7 @@ router = APIRouter(prefix="/modifications", tags=["modifications"])
 
 
 # cRUD endpoints for modification types
-@router.get("/types", response_model=List[ModificationTypeOut])
+@router.get("/types", response_model=List[ModificationTypeOut], dependencies=[query_budget(2)])
 def get_modification_types(
     category: str = Query(None, description="Filter by category: sauce or removal"),
     is_active: bool = Query(True, description="Filter by active status"),
@@ -48,7 +49,7 @@ def get_modification_types(
 def create_modification_type(
     payload: ModificationTypeIn,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """create a new modification type (admin only)"""
     # Auto-generate translations if Russian text is provided
@@ -78,7 +79,7 @@ def update_modification_type(
     type_id: int,
     payload: ModificationTypeIn,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """update a modification type (admin only)"""
     modification_type = db.get(models.ModificationType, type_id)
@@ -115,7 +116,7 @@ def update_modification_type(
 def delete_modification_type(
     type_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """delete a modification type (admin only)"""
     modification_type = db.get(models.ModificationType, type_id)
@@ -132,7 +133,7 @@ def delete_modification_type(
 def apply_single_modification(
     payload: SingleModificationRequest,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     """apply modifications to a single order item"""
     # verify order item exists and belongs to user
@@ -182,7 +183,7 @@ def apply_single_modification(
 def apply_bulk_modifications(
     payload: BulkModificationRequest,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     """apply modifications to multiple order items"""
     if not payload.order_item_ids:
@@ -240,12 +241,12 @@ def apply_bulk_modifications(
     )
 
 
-@router.get("/order-item/{order_item_id}", response_model=List[OrderItemModificationOut])
+@router.get("/order-item/{order_item_id}", response_model=List[OrderItemModificationOut], dependencies=[query_budget(5)])
 def get_order_item_modifications(
     order_item_id: int,
     lc: str = Query("en", pattern="^(ru|kz|en)$"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     """get all modifications for a specific order item"""
     # verify order item exists and belongs to user
@@ -257,7 +258,9 @@ def get_order_item_modifications(
     if not order or order.user_id != user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    modifications = db.query(models.OrderItemModification).filter(
+    modifications = db.query(models.OrderItemModification).options(
+        selectinload(models.OrderItemModification.modification_type)
+    ).filter(
         models.OrderItemModification.order_item_id == order_item_id
     ).all()
     
@@ -273,7 +276,7 @@ def get_order_item_modifications(
 def clear_order_item_modifications(
     order_item_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     """clear all modifications for a specific order item"""
     # verify order item exists and belongs to user
@@ -1,14 +1,16 @@
 import random
 from datetime import datetime
 from uuid import uuid4
-from typing import List
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import get_current_user
-from app.db.session import get_db
+from app.core.security import get_current_user, get_current_principal, Principal
+from app.db.instrumentation import query_budget
+from app.db.session import get_db, get_async_db, get_async_read_db
 from app import models
 from app.schemas.orders import (
     OrderCreateRequest,
@@ -17,13 +19,21 @@ from app.schemas.orders import (
 )
 from app.services.promo.validator import calculate_discount
 from app.services.email.order_emails import send_order_created
-from app.services.push.fcm_admin import send_to_token
+from app.services.push.order_notifications import order_notifier
 from app.services.locale.locale_helper import get_localized_menu_item_name, get_localized_modification_type_name
 from app.services.business.hours import validate_business_hours
 from app.services.analytics.ga4_streams import send_platform_event
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# everything OrderOut renders, loaded eagerly for async reads
+_ORDER_OUT_GRAPH = (
+    selectinload(models.Order.items).selectinload(models.OrderItem.menu_item),
+    selectinload(models.Order.items)
+    .selectinload(models.OrderItem.modifications)
+    .selectinload(models.OrderItemModification.modification_type),
+)
+
 
 def _gen_order_number() -> str:
     # include timestamp and random suffix to avoid collisions
@@ -179,13 +189,8 @@ def create_order(
         except Exception:
             pass
 
-    # push notifications (best-effort)
-    devices: List[models.Device] = db.query(models.Device).filter(models.Device.user_id == user.id).all()
-    for d in devices:
-        try:
-            send_to_token(d.fcm_token, title="Заказ принят", body=f"#{order.number} на {order.total}")
-        except Exception:
-            pass
+    # push notification to all user's devices (best-effort, sent by the notifier thread)
+    order_notifier.notify(order.id, user.id, title="Заказ принят", body=f"#{order.number} на {order.total}")
 
     # GA4 analytics tracking (best-effort)
     try:
@@ -231,24 +236,24 @@ def create_order(
     return order
 
 
-@router.get("/mine", response_model=OrderListResponse)
-def my_orders(
+@router.get("/mine", response_model=OrderListResponse, dependencies=[query_budget(6)])
+async def my_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     lc: str = Query("en", pattern="^(ru|kz|en)$"),
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_current_principal),
 ):
     q = (
-        db.query(models.Order)
-        .filter(models.Order.user_id == user.id)
+        select(models.Order)
+        .where(models.Order.user_id == user.id)
         .order_by(models.Order.created_at.desc())
+        .options(*_ORDER_OUT_GRAPH)
     )
-    orders = q.offset((page - 1) * page_size).limit(page_size).all()
+    orders = (await db.scalars(q.offset((page - 1) * page_size).limit(page_size))).all()
     
     # apply localization to order items
     for order in orders:
-        _ = order.items  # trigger load
         for order_item in order.items:
             if order_item.menu_item:
                 order_item.menu_item.name = get_localized_menu_item_name(order_item.menu_item, lc)
@@ -259,14 +264,13 @@ def my_orders(
     return OrderListResponse(items=orders)
 
 
-@router.get("/{order_id}", response_model=OrderOut)
-def get_order(order_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
-    order = db.get(models.Order, order_id)
+@router.get("/{order_id}", response_model=OrderOut, dependencies=[query_budget(6)])
+async def get_order(order_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db: AsyncSession = Depends(get_async_read_db), user: Principal = Depends(get_current_principal)):
+    order = await db.get(models.Order, order_id, options=_ORDER_OUT_GRAPH)
     if not order or order.user_id != user.id:
         raise HTTPException(status_code=404, detail="Order not found")
     
     # apply localization to order items
-    _ = order.items  # trigger load
     for order_item in order.items:
         if order_item.menu_item:
             order_item.menu_item.name = get_localized_menu_item_name(order_item.menu_item, lc)
@@ -278,13 +282,13 @@ def get_order(order_id: int, lc: str = Query("en", pattern="^(ru|kz|en)$"), db:
 
 
 @router.patch("/{order_id}/cancel")
-def cancel_order(
+async def cancel_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal)
 ):
     """Cancel an order if it's in a valid status for cancellation"""
-    order = db.get(models.Order, order_id)
+    order = await db.get(models.Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -304,9 +308,7 @@ def cancel_order(
     order.status = "CANCELLED"
     order.updated_at = datetime.utcnow()
     
-    db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
     
     return {
         "message": f"Order {order.number} has been cancelled",
@@ -2,7 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.core.security import get_current_user, require_admin
+from app.core.security import get_current_user, require_admin, Principal, invalidate_principal
 from app.db.session import get_db
 from app import models
 from app.schemas.users import UserMeOut, UserUpdate, SavedAddressCreate, SavedAddressUpdate, SavedAddressOut
@@ -39,6 +39,7 @@ def update_me(payload: UserUpdate, db: Session = Depends(get_db), user: models.U
 
     db.add(user)
     db.commit()
+    invalidate_principal(user.id)
     db.refresh(user)
     return user
 
@@ -157,7 +158,7 @@ def delete_address(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_admin)
+    _: Principal = Depends(require_admin)
 ):
     """delete a user account (Admin only)"""
     user = db.get(models.User, user_id)
@@ -185,6 +186,7 @@ def delete_user(
     # delete the user
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -224,6 +226,7 @@ def update_user_profile(payload: UserUpdate, db: Session = None, current_user: m
 
     db.add(current_user)
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -28,6 +28,12 @@ class Settings:
     DB_CONNECTION_TIMEOUT: int = int(os.getenv("DB_CONNECTION_TIMEOUT", "30"))
     DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
     DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+    # read replicas for GET endpoints (comma separated DSNs; empty keeps every read on the primary)
+    DB_REPLICA_URLS: List[str] = [u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()]
+    DB_READ_STICKY_SEC: float = float(os.getenv("DB_READ_STICKY_SEC", "5"))
+    DB_REPLICA_CHECK_INTERVAL_SEC: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_SEC", "10"))
+    DB_REPLICA_MAX_LAG_SEC: float = float(os.getenv("DB_REPLICA_MAX_LAG_SEC", "10"))
     
     
     @property
@@ -53,10 +59,48 @@ class Settings:
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
     EMAIL_VERIFICATION_EXPIRES_MIN: int = int(os.getenv("EMAIL_VERIFICATION_EXPIRES_MIN", "30"))
     RESEND_WEBHOOK_SECRET: str | None = os.getenv("RESEND_WEBHOOK_SECRET")
+    # transactional emails go through the email_outbox queue: "resend", or "fake" (kept in memory, for tests)
+    EMAIL_TRANSPORT: str = os.getenv("EMAIL_TRANSPORT", "resend")
+    EMAIL_QUEUE_WORKER_ENABLED: bool = os.getenv("EMAIL_QUEUE_WORKER_ENABLED", "true").lower() == "true"
+    # messages per Resend batch call (the API takes at most 100)
+    EMAIL_BATCH_SIZE: int = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+    # how long the sender waits after an enqueue so more messages join the batch
+    EMAIL_BATCH_LINGER_MS: int = int(os.getenv("EMAIL_BATCH_LINGER_MS", "200"))
+    # batch calls/sec, shared by all workers (Resend's default limit is 2 requests/sec per team; 0 = unlimited)
+    EMAIL_RATE_LIMIT_PER_SEC: float = float(os.getenv("EMAIL_RATE_LIMIT_PER_SEC", "2"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    EMAIL_RETRY_BACKOFF_SEC: float = float(os.getenv("EMAIL_RETRY_BACKOFF_SEC", "30"))
+    EMAIL_QUEUE_POLL_SEC: float = float(os.getenv("EMAIL_QUEUE_POLL_SEC", "5"))
+    # a batch still "sending" after this long is retried (its worker died mid-call)
+    EMAIL_SEND_LEASE_SEC: int = int(os.getenv("EMAIL_SEND_LEASE_SEC", "120"))
+    # Resend webhook events are buffered and inserted in bulk: every N events or M ms,
+    # retried after a failed INSERT, and refused with 503 (Svix redelivers) past the buffer cap
+    EMAIL_EVENTS_BATCH_SIZE: int = int(os.getenv("EMAIL_EVENTS_BATCH_SIZE", "500"))
+    EMAIL_EVENTS_FLUSH_MS: int = int(os.getenv("EMAIL_EVENTS_FLUSH_MS", "1000"))
+    EMAIL_EVENTS_RETRY_SEC: float = float(os.getenv("EMAIL_EVENTS_RETRY_SEC", "5"))
+    EMAIL_EVENTS_BUFFER_MAX: int = int(os.getenv("EMAIL_EVENTS_BUFFER_MAX", "20000"))
+    # raw email_events older than this are pruned (already counted in email_daily_stats; 0 = keep)
+    EMAIL_EVENTS_RETENTION_DAYS: int = int(os.getenv("EMAIL_EVENTS_RETENTION_DAYS", "90"))
+    EMAIL_EVENTS_PRUNE_INTERVAL_SEC: float = float(os.getenv("EMAIL_EVENTS_PRUNE_INTERVAL_SEC", "3600"))
 
     # push notifications via Firebase
     GOOGLE_APPLICATION_CREDENTIALS: str | None = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     FCM_PROJECT_ID: str | None = os.getenv("FCM_PROJECT_ID")
+    # multicast chunks (500 tokens) in flight at once, and messages/sec per project (0 = unlimited)
+    FCM_SEND_CONCURRENCY: int = int(os.getenv("FCM_SEND_CONCURRENCY", "4"))
+    FCM_RATE_LIMIT_PER_SEC: float = float(os.getenv("FCM_RATE_LIMIT_PER_SEC", "10000"))
+    # admin campaigns above this many devices run as background jobs (push_campaigns)
+    PUSH_INLINE_MAX_DEVICES: int = int(os.getenv("PUSH_INLINE_MAX_DEVICES", "1000"))
+    PUSH_CAMPAIGNS_WORKER_ENABLED: bool = os.getenv("PUSH_CAMPAIGNS_WORKER_ENABLED", "true").lower() == "true"
+    PUSH_CAMPAIGN_CHUNK: int = int(os.getenv("PUSH_CAMPAIGN_CHUNK", "5000"))
+    PUSH_CAMPAIGN_POLL_SEC: float = float(os.getenv("PUSH_CAMPAIGN_POLL_SEC", "10"))
+    PUSH_CAMPAIGN_STALE_SEC: int = int(os.getenv("PUSH_CAMPAIGN_STALE_SEC", "300"))
+    # devices are subscribed to all/platform/role/locale topics; /admin/push/send uses a topic
+    # when the targeting maps to one and every matching device is subscribed
+    PUSH_TOPIC_FANOUT: bool = os.getenv("PUSH_TOPIC_FANOUT", "true").lower() == "true"
+    FCM_TOPIC_PREFIX: str = os.getenv("FCM_TOPIC_PREFIX", "")
+    # order status pushes: updates to one order within this window go out as one (latest) notification
+    PUSH_COALESCE_WINDOW_SEC: float = float(os.getenv("PUSH_COALESCE_WINDOW_SEC", "2"))
 
     # SMS via Twilio
     TWILIO_ACCOUNT_SID: str | None = os.getenv("TWILIO_ACCOUNT_SID")
@@ -64,6 +108,16 @@ class Settings:
     TWILIO_FROM_NUMBER: str | None = os.getenv("TWILIO_FROM_NUMBER")
     TWILIO_VERIFY_SERVICE_SID: str | None = os.getenv("TWILIO_VERIFY_SERVICE_SID")
     PHONE_VERIFICATION_EXPIRES_MIN: int = int(os.getenv("PHONE_VERIFICATION_EXPIRES_MIN", "10"))
+    # SMS broadcasts (sms_broadcasts jobs): messages/sec allowed on the Twilio account or
+    # sender, sends in flight, and retries with exponential backoff on 429/5xx/network errors
+    SMS_RATE_LIMIT_PER_SEC: float = float(os.getenv("SMS_RATE_LIMIT_PER_SEC", "1"))
+    SMS_SEND_CONCURRENCY: int = int(os.getenv("SMS_SEND_CONCURRENCY", "8"))
+    SMS_MAX_ATTEMPTS: int = int(os.getenv("SMS_MAX_ATTEMPTS", "4"))
+    SMS_RETRY_BACKOFF_SEC: float = float(os.getenv("SMS_RETRY_BACKOFF_SEC", "1"))
+    SMS_BROADCAST_CHUNK: int = int(os.getenv("SMS_BROADCAST_CHUNK", "200"))
+    SMS_BROADCASTS_WORKER_ENABLED: bool = os.getenv("SMS_BROADCASTS_WORKER_ENABLED", "true").lower() == "true"
+    SMS_BROADCAST_POLL_SEC: float = float(os.getenv("SMS_BROADCAST_POLL_SEC", "10"))
+    SMS_BROADCAST_STALE_SEC: int = int(os.getenv("SMS_BROADCAST_STALE_SEC", "300"))
 
     # Google Maps integration
     GOOGLE_MAPS_API_KEY_SERVER: str | None = os.getenv("GOOGLE_MAPS_API_KEY_SERVER")
@@ -72,6 +126,60 @@ class Settings:
     GA4_MEASUREMENT_ID: str | None = os.getenv("GA4_MEASUREMENT_ID")
     GA4_API_SECRET: str | None = os.getenv("GA4_API_SECRET")
 
+    # in-memory analytics snapshot of orders
+    ANALYTICS_SNAPSHOT_REFRESH_SEC: float = float(os.getenv("ANALYTICS_SNAPSHOT_REFRESH_SEC", "30"))
+    ANALYTICS_SNAPSHOT_REBUILD_SEC: float = float(os.getenv("ANALYTICS_SNAPSHOT_REBUILD_SEC", "3600"))
+
+    # analytics result cache (per worker, invalidated by order writes)
+    ANALYTICS_CACHE_TTL_SEC: float = float(os.getenv("ANALYTICS_CACHE_TTL_SEC", "15"))
+    ANALYTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "256"))
+
+    # authenticated principal cache (per worker, invalidated on user updates)
+    PRINCIPAL_CACHE_TTL_SEC: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SEC", "30"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+    # password hashing process pool (bcrypt cost changes are applied on next login)
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    PASSWORD_HASH_TIMEOUT_SEC: float = float(os.getenv("PASSWORD_HASH_TIMEOUT_SEC", "10"))
+
+    # sql instrumentation (per request statement counts, N+1 warnings, query budgets)
+    SQL_INSTRUMENTATION_ENABLED: bool = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_QUERY_BUDGET_DEFAULT: int = int(os.getenv("SQL_QUERY_BUDGET_DEFAULT", "0"))
+    # over-budget requests raise instead of logging; on by default for APP_ENV=test so CI fails
+    SQL_QUERY_BUDGET_STRICT: bool = os.getenv("SQL_QUERY_BUDGET_STRICT", str(APP_ENV == "test")).lower() == "true"
+
+    # slow query log (per-worker ring buffer under /admin/integrations/database/slow-queries; 0 = off)
+    SLOW_QUERY_THRESHOLD_MS: int = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SEC: int = int(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN_SEC", "300"))
+
+    # prometheus metrics (/metrics); set the dir to merge values across uvicorn workers
+    METRICS_MULTIPROC_DIR: str | None = os.getenv("METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_SEC: float = float(os.getenv("METRICS_FLUSH_SEC", "5"))
+    # bearer token for /metrics; required outside APP_ENV=dev (unset there: 403)
+    METRICS_TOKEN: str | None = os.getenv("METRICS_TOKEN")
+
+    # on-demand request profiling (X-Profile-Token header, tokens from /admin/profiling/token)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "/tmp/appetit-profiles")
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_SECONDS: float = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+
+    # third-party SDKs are imported on first use; names listed here load at startup
+    # (firebase_admin, gemini, ga4_data, twilio, resend, svix, pillow)
+    INTEGRATIONS_PRELOAD: List[str] = [n.strip() for n in os.getenv("INTEGRATIONS_PRELOAD", "").split(",") if n.strip()]
+
+    # warm-up before the worker reports ready on /ready
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_STEPS: List[str] = [s.strip() for s in os.getenv("WARMUP_STEPS", "mappers,pool,snapshots,openapi").split(",") if s.strip()]
+    WARMUP_POOL_CONNECTIONS: int = int(os.getenv("WARMUP_POOL_CONNECTIONS", os.getenv("DB_POOL_SIZE", "5")))
+    WARMUP_TIMEOUT_SEC: float = float(os.getenv("WARMUP_TIMEOUT_SEC", "60"))
+
     # admin notification emails
     ADMIN_EMAILS: List[str] = [e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
 
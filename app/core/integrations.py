@@ -0,0 +1,123 @@
+"""
+Lazy loading of third-party SDKs.
+
+firebase_admin, google.generativeai, google.analytics.data_v1beta, twilio, resend,
+svix and Pillow together cost seconds of import time and a lot of memory per
+worker, and most workers never touch most of them. Service modules therefore do
+not import their SDK at module level; they register a loader here and call
+``.get()`` at the point of use:
+
+    def _load_twilio():
+        from twilio.rest import Client
+        from twilio.base.exceptions import TwilioRestException
+        return Client, TwilioRestException
+
+    _twilio = integrations.register("twilio", "twilio", _load_twilio)
+    ...
+    sdk = _twilio.get()   # imported on the first call, None if not installed
+
+``.installed()`` answers "is the package there" without importing it (health
+checks use it). Workers that want an SDK ready before the first request list it
+in INTEGRATIONS_PRELOAD. scripts/check_import_time.py keeps these modules out of
+``import app.main``.
+"""
+import importlib.util
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class Integration:
+    """one SDK: imported and set up by its loader on first use, at most once per process."""
+
+    def __init__(self, name: str, module: str, loader: Callable[[], Any]):
+        self.name = name
+        self.module = module
+        self._loader = loader
+        self._value: Any = _UNSET
+        self._lock = threading.Lock()
+        self.load_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNSET
+
+    def installed(self) -> bool:
+        if self.loaded:
+            return self._value is not None
+        try:
+            return importlib.util.find_spec(self.module) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def get(self) -> Any:
+        """the loader's result, or None when the SDK is not installed or failed to import."""
+        value = self._value
+        if value is not _UNSET:
+            return value
+        with self._lock:
+            if self._value is _UNSET:
+                started = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    # an ImportError is the usual case; anything else is logged loudly
+                    if not isinstance(e, ImportError):
+                        logger.exception(f"Loading {self.name} SDK failed")
+                    self.error = f"{type(e).__name__}: {e}"
+                    self._value = None
+                self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+                if self._value is not None:
+                    logger.info(f"Loaded {self.name} SDK in {self.load_ms}ms")
+            return self._value
+
+    def stats(self) -> dict:
+        return {
+            "module": self.module,
+            "loaded": self.loaded,
+            "available": self._value is not None if self.loaded else None,
+            "load_ms": self.load_ms,
+            "error": self.error,
+        }
+
+
+class IntegrationRegistry:
+    def __init__(self):
+        self._integrations: Dict[str, Integration] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, module: str, loader: Callable[[], Any]) -> Integration:
+        with self._lock:
+            existing = self._integrations.get(name)
+            if existing is not None:
+                # module reloads (tests, --reload) register again; keep the loaded SDK
+                return existing
+            integration = Integration(name, module, loader)
+            self._integrations[name] = integration
+            return integration
+
+    def get(self, name: str) -> Optional[Integration]:
+        return self._integrations.get(name)
+
+    def preload(self, names: Iterable[str]) -> None:
+        for name in names:
+            integration = self._integrations.get(name)
+            if integration is None:
+                logger.warning(f"Cannot preload unknown integration {name!r}")
+                continue
+            integration.get()
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = sorted(self._integrations.items())
+        return {name: integration.stats() for name, integration in items}
+
+
+# global instance
+integrations = IntegrationRegistry()
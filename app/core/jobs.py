@@ -0,0 +1,179 @@
+"""
+Background runner for admin bulk-send jobs (push campaigns, SMS broadcasts).
+
+A job is a row with status (queued|running|completed|failed|cancelled), error,
+heartbeat_at, started_at and finished_at columns. Every worker runs one daemon
+thread per job type that polls for work (or is woken by wake() after an enqueue):
+
+- claiming:   SELECT ... FOR UPDATE SKIP LOCKED on the oldest queued job, or on a
+              running one whose heartbeat is older than stale_sec() (its worker
+              died), so a job is only ever executed by one worker at a time
+- executing:  the subclass sends the job in _execute() in chunks and commits a
+              checkpoint per chunk (cursor, counters, heartbeat) on the row locked
+              by _lock_job(); a chunk sent while the job was cancelled is still
+              recorded, and the subclass stops there
+- finishing:  _finish() records the final status unless the job was cancelled
+
+A resumed job continues after its last checkpoint, so delivery is at-least-once
+for the chunk that was in flight when a worker died.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    model = None  # the job table's mapped class
+    thread_name = "jobs"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.current_job_id: Optional[int] = None
+        self.jobs_run = 0
+        self.chunks_sent = 0
+        self.errors = 0
+
+    # ---- settings, overridden per job type ----
+
+    def enabled(self) -> bool:
+        return True
+
+    def poll_sec(self) -> float:
+        return 10.0
+
+    def stale_sec(self) -> float:
+        return 300.0
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        """start the polling thread (called from the startup hook)."""
+        with self._lock:
+            if not self.enabled() or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        """check for queued jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                while self.run_once():
+                    pass
+            except Exception:
+                self.errors += 1
+                logger.exception(f"{self.thread_name} runner failed")
+            self._wake.wait(self.poll_sec())
+            self._wake.clear()
+
+    def run_once(self) -> bool:
+        """claim and execute one job; False when there was nothing to do."""
+        job_id = self._claim()
+        if job_id is None:
+            return False
+        self.current_job_id = job_id
+        try:
+            self._execute(job_id)
+        except Exception as e:
+            self.errors += 1
+            logger.exception(f"{self.model.__tablename__} job {job_id} failed")
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            self.current_job_id = None
+            self.jobs_run += 1
+        return True
+
+    def _execute(self, job_id: int) -> None:
+        raise NotImplementedError
+
+    # ---- state transitions ----
+
+    def _claim(self) -> Optional[int]:
+        model = self.model
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.stale_sec())
+        with SessionLocal() as db:
+            job = db.query(model).filter(
+                or_(
+                    model.status == "queued",
+                    and_(model.status == "running", model.heartbeat_at < stale_before),
+                )
+            ).order_by(model.id).with_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            if job.status == "running":
+                logger.warning(f"Resuming stale {model.__tablename__} job {job.id}")
+            job.status = "running"
+            job.heartbeat_at = now
+            job.started_at = job.started_at or now
+            db.commit()
+            return job.id
+
+    def _lock_job(self, db: Session, job_id: int):
+        """lock the job row for a checkpoint, bumping the heartbeat while it is running."""
+        job = db.get(self.model, job_id, with_for_update=True)
+        if job.status == "running":
+            job.heartbeat_at = datetime.utcnow()
+        return job
+
+    def _touch(self, job_id: int) -> None:
+        """bump the heartbeat during a long chunk so no other worker takes the job over."""
+        with SessionLocal() as db:
+            db.query(self.model).filter(self.model.id == job_id, self.model.status == "running").update(
+                {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+    def _finish(self, job_id: int, status: str, error: Optional[str] = None) -> None:
+        with SessionLocal() as db:
+            job = self._lock_job(db, job_id)
+            if job.status != "running":
+                db.commit()
+                return
+            job.status = status
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            logger.info(f"{self.model.__tablename__} job {job_id} {status}" + (f" ({error})" if error else ""))
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "current_job_id": self.current_job_id,
+            "jobs_run": self.jobs_run,
+            "chunks_sent": self.chunks_sent,
+            "errors": self.errors,
+        }
+
+
+def cancel_job(db: Session, job) -> None:
+    """stop a queued or running job (a running one stops at its next checkpoint). Raises ValueError."""
+    if job.status not in ("queued", "running"):
+        raise ValueError(f"Job is already {job.status}")
+    job.status = "cancelled"
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def requeue_job(db: Session, job, runner: JobRunner) -> None:
+    """queue a failed or cancelled job again; it continues after its last checkpoint. Raises ValueError."""
+    if job.status not in ("failed", "cancelled"):
+        raise ValueError(f"Job is {job.status}")
+    job.status = "queued"
+    job.error = None
+    job.finished_at = None
+    db.commit()
+    runner.wake()
@@ -0,0 +1,353 @@
+"""
+Prometheus metrics without a client library.
+
+Each uvicorn worker keeps its own in-memory counters, gauges and histograms (guarded
+by one lock, never shared between processes). With METRICS_MULTIPROC_DIR set, every
+worker also writes a JSON snapshot of its values to <dir>/metrics-<pid>.json every
+METRICS_FLUSH_SEC; whichever worker serves /metrics merges all snapshots, summing
+counters and histograms across workers and summing gauges over live workers only.
+Clear the directory on deploy, like prometheus_client's multiprocess mode.
+
+What is recorded:
+- http_request_duration_seconds / http_requests_in_flight (MetricsMiddleware)
+- db_pool_* gauges and db_pool_wait_seconds (engines registered via track_pool)
+- integration_call_duration_seconds / integration_call_errors_total
+  (``with integration_call("fcm", "send"):`` around outbound SDK/HTTP calls)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+_lock = threading.Lock()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, object] = {}
+
+    def _labels(self, labels: Tuple) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._labels(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        key = self._labels(labels)
+        with _lock:
+            self._values[key] = float(value)
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._labels(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels) -> float:
+        """this worker's current value."""
+        with _lock:
+            return self._values.get(self._labels(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._labels(labels)
+        with _lock:
+            # per-bucket (non-cumulative) counts, then sum and count
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """fn runs right before each snapshot, to refresh scrape-time gauges."""
+        self._collectors.append(fn)
+
+    # ---- snapshots ----
+
+    def snapshot(self) -> dict:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        with _lock:
+            return {
+                "pid": os.getpid(),
+                "values": {
+                    name: [[list(k), v if not isinstance(v, list) else list(v)] for k, v in m._values.items()]
+                    for name, m in self.metrics.items()
+                },
+            }
+
+    def _flush(self, directory: str) -> None:
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def _load_snapshots(self, directory: str) -> List[dict]:
+        self._flush(directory)
+        snapshots = []
+        for entry in os.scandir(directory):
+            if not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # ---- exposition ----
+
+    def render(self) -> str:
+        directory = settings.METRICS_MULTIPROC_DIR
+        snapshots = self._load_snapshots(directory) if directory else [self.snapshot()]
+
+        merged: Dict[str, Dict[LabelValues, object]] = {name: {} for name in self.metrics}
+        for snap in snapshots:
+            alive = snap["pid"] == os.getpid() or _pid_alive(snap["pid"])
+            for name, series in snap["values"].items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                target = merged[name]
+                for labels, value in series:
+                    key = tuple(labels)
+                    if metric.kind == "histogram":
+                        current = target.get(key)
+                        target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0.0) + value
+
+        lines: List[str] = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged[name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(metric.buckets, value):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + [('le', _fmt_value(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels + [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(value[-2])}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+# global instance
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.",
+))
+DB_POOL_SIZE = registry.register(Gauge("db_pool_size", "Configured pool size.", ("pool",)))
+DB_POOL_CHECKED_OUT = registry.register(Gauge("db_pool_checked_out", "Connections currently checked out.", ("pool",)))
+DB_POOL_OVERFLOW = registry.register(Gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool fills).", ("pool",)))
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+))
+INTEGRATION_DURATION = registry.register(Histogram(
+    "integration_call_duration_seconds", "Outbound integration call latency.", ("integration", "operation"),
+))
+INTEGRATION_ERRORS = registry.register(Counter(
+    "integration_call_errors_total", "Outbound integration calls that raised or returned an error.", ("integration", "operation"),
+))
+
+
+# ---- db pools ----
+
+_pools: Dict[str, object] = {}
+
+
+def track_pool(name: str, engine) -> None:
+    """report size / checked-out / overflow of an engine's QueuePool under the given name.
+
+    The engine is kept rather than the pool: dispose() swaps in a new pool, which
+    is the one to report.
+    """
+    engine.pool.metrics_name = name
+    _pools[name] = engine
+
+
+def _collect_pools() -> None:
+    for name, engine in list(_pools.items()):
+        pool = engine.pool
+        try:
+            DB_POOL_SIZE.set(pool.size(), name)
+            DB_POOL_CHECKED_OUT.set(pool.checkedout(), name)
+            DB_POOL_OVERFLOW.set(pool.overflow(), name)
+        except AttributeError:
+            continue
+
+
+registry.add_collector(_collect_pools)
+
+
+# ---- integrations ----
+
+class _Call:
+    def __init__(self):
+        self.error = False
+
+    def failed(self) -> None:
+        """mark a call that returned normally but reported an error (HTTP 4xx/5xx, failed sends)."""
+        self.error = True
+
+
+@contextmanager
+def integration_call(integration: str, operation: str) -> Iterator[_Call]:
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.error = True
+        raise
+    finally:
+        INTEGRATION_DURATION.observe(time.perf_counter() - started, integration, operation)
+        if call.error:
+            INTEGRATION_ERRORS.inc(integration, operation)
+
+
+# ---- http ----
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # unmatched paths share one label so scanners can't blow up cardinality
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, scope.get("method", ""), path, status[0])
+
+
+# ---- background flush ----
+
+_flusher: Optional[threading.Thread] = None
+
+
+def start_flusher() -> None:
+    """periodically write this worker's snapshot when METRICS_MULTIPROC_DIR is set."""
+    global _flusher
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory or _flusher is not None:
+        return
+    os.makedirs(directory, exist_ok=True)
+
+    def _run():
+        while True:
+            try:
+                registry._flush(directory)
+            except Exception:
+                logger.exception("Failed to flush metrics snapshot")
+            time.sleep(settings.METRICS_FLUSH_SEC)
+
+    _flusher = threading.Thread(target=_run, name="metrics-flush", daemon=True)
+    _flusher.start()
@@ -0,0 +1,203 @@
+"""
+Password hashing off the request path.
+
+bcrypt costs ~100-300ms of CPU per call, so hashing and verification run in a small
+dedicated process pool instead of the API process. The number of outstanding jobs is
+bounded: once PASSWORD_HASH_MAX_PENDING calls are queued or running, new ones fail fast
+with 429 instead of piling up behind a login storm.
+
+verify_and_update() also reports when a stored hash was made with a different cost
+factor than PASSWORD_BCRYPT_ROUNDS, returning a fresh hash so callers can transparently
+upgrade (or downgrade) it on successful login.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def build_context(rounds: int) -> CryptContext:
+    # pinning min/max to the target cost makes needs_update() flag hashes made with any other cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# ---- worker-side functions (must be importable top-level callables) ----
+
+def _hash_job(password: str, rounds: int) -> str:
+    return build_context(rounds).hash(password)
+
+
+def _verify_job(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return build_context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """bounded process pool for bcrypt with backpressure and counters."""
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, timeout: float = 10.0, rounds: int = 12):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rehashed = 0
+        self._busy_seconds = 0.0
+        self._max_seconds = 0.0
+
+    # ---- pool lifecycle ----
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn keeps workers from inheriting the API process's threads and connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+    # ---- submission ----
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many sign-in attempts in progress, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self.submitted += 1
+
+    def _release(self, started: float, future: Future) -> None:
+        ok = not future.cancelled() and future.exception() is None
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._busy_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """submit a job, counting it as pending until the worker finishes (even if the caller gives up)."""
+        self._acquire()
+        started = time.monotonic()
+        try:
+            try:
+                future = self._get_pool().submit(fn, *args)
+            except BrokenProcessPool:
+                logger.warning("Password hashing pool was broken, restarting it")
+                self._reset_pool()
+                future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(lambda f: self._release(started, f))
+        return future
+
+    def _timed_out(self, what: str) -> HTTPException:
+        with self._lock:
+            self.timed_out += 1
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Password {what} timed out")
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        future = self._submit(fn, *args)
+        try:
+            # shield: a timed-out caller must not cancel the job it's still counted for
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out("check")
+
+    def _run_sync(self, fn: Callable, *args) -> Any:
+        """blocking variant for sync endpoints (already on a threadpool thread)."""
+        future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise self._timed_out("hashing")
+
+    # ---- public API ----
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_job, password, self.rounds)
+
+    def hash_sync(self, password: str) -> str:
+        return self._run_sync(_hash_job, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+        if not hashed:
+            return False, None
+        valid, new_hash = await self._run(_verify_job, password, hashed, self.rounds)
+        if valid and new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": self.rounds,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_ms": round(self._busy_seconds / finished * 1000, 1) if finished else 0.0,
+                "max_ms": round(self._max_seconds * 1000, 1),
+            }
+
+
+# global instance
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SEC,
+    rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
@@ -0,0 +1,301 @@
+"""
+On-demand sampling profiler for single requests.
+
+An admin fetches a short-lived profile token (POST /admin/profiling/token, guarded by
+require_admin) and replays the slow request with ``X-Profile-Token: <token>``. Only
+that request is profiled: a sampler thread snapshots every thread's stack with
+sys._current_frames() each PROFILING_INTERVAL_MS while the request is in flight,
+drops idle stacks (threads parked in select/wait), and stores the folded stacks
+as <PROFILING_DIR>/<id>.json so any worker can serve it back as speedscope JSON or
+flamegraph.pl "collapsed" text. The response carries X-Profile-Id.
+
+A token profiles one request only: its jti is claimed on first use with an
+exclusive file create in the same shared directory, so a leaked header cannot be
+replayed for the rest of its TTL, on this worker or another.
+
+Stopping the sampler and writing the profile run in a worker thread, off the
+event loop. Requests without the header only pay for one header lookup. Samples cover the whole
+worker process (the event loop plus threadpool threads, one root per thread), so
+concurrent requests show up too; `in_flight` in the metadata says how busy it was.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.metrics import HTTP_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_SCOPE = "profile"
+
+# leaf functions of threads that are parked, not working
+_IDLE_LEAVES = {"select", "poll", "wait", "_wait_for_tstate_lock", "accept"}
+# our own housekeeping threads, which mostly sit in time.sleep()
+_BACKGROUND_THREADS = {"metrics-flush", "db-replica-health"}
+# longest token TTL /admin/profiling/token hands out; claims older than this are pruned
+_MAX_TOKEN_TTL = 3600
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def issue_profile_token(admin_id: int, ttl_seconds: int = 600) -> str:
+    # no "sub" claim, so it can never pass for an access token
+    expire = datetime.now(tz=timezone.utc) + timedelta(seconds=ttl_seconds)
+    claims = {"scope": PROFILE_SCOPE, "by": admin_id, "jti": uuid.uuid4().hex, "exp": expire}
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm="HS256")
+
+
+def _verify_profile_token(token: str) -> Optional[Tuple[int, str]]:
+    """(admin id, jti) of a valid profile token; claiming the jti is up to the caller."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except JWTError:
+        return None
+    if payload.get("scope") != PROFILE_SCOPE or not payload.get("jti") or payload.get("by") is None:
+        return None
+    return payload["by"], payload["jti"]
+
+
+class _Sampler:
+    """background thread folding stack samples of every other thread into counts."""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                if frame.f_code.co_name in _IDLE_LEAVES or name in _BACKGROUND_THREADS:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+
+def _short_path(path: str) -> str:
+    index = path.rfind("/site-packages/")
+    if index != -1:
+        return path[index + len("/site-packages/"):]
+    if path.startswith(_ROOT):
+        return os.path.relpath(path, _ROOT)
+    return os.path.basename(path)
+
+
+class ProfileStore:
+    """profiles as JSON files in a directory shared by the workers, newest max_profiles kept."""
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(profile["id"]) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, self._path(profile["id"]))
+        self._prune()
+
+    def claim(self, jti: str) -> bool:
+        """mark a profile token as used; False if some worker already used it."""
+        if not jti.isalnum():
+            return False
+        used = os.path.join(self.directory, "used")
+        os.makedirs(used, exist_ok=True)
+        try:
+            os.close(os.open(os.path.join(used, jti), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        # claims outlive their token's expiry at most by the longest TTL
+        cutoff = time.time() - _MAX_TOKEN_TTL
+        for entry in os.scandir(used):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+        return True
+
+    def _files(self) -> List[os.DirEntry]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        return sorted(entries, key=lambda e: e.stat().st_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        for entry in self._files()[self.max_profiles:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def list(self) -> List[dict]:
+        result = []
+        for entry in self._files():
+            try:
+                with open(entry.path) as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profile.pop("stacks", None)
+            result.append(profile)
+        return result
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        # ids are uuid hex; anything else could walk out of the directory
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def to_collapsed(profile: dict) -> str:
+    """flamegraph.pl / speedscope "collapsed stack" text."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+def to_speedscope(profile: dict) -> dict:
+    """speedscope file format (sampled profile); open at https://www.speedscope.app."""
+    frames: List[dict] = []
+    index: Dict[str, int] = {}
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in profile["stacks"].items():
+        ids = []
+        for name in stack.split(";"):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            ids.append(index[name])
+        samples.append(ids)
+        weights.append(count * profile["interval_ms"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f'{profile["method"]} {profile["path"]}',
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": profile["id"],
+        "exporter": "appetit",
+    }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: profiles requests that carry a valid X-Profile-Token header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                token = value.decode("latin-1")
+                break
+        verified = _verify_profile_token(token) if token else None
+        if verified is not None:
+            try:
+                claimed = await asyncio.to_thread(profile_store.claim, verified[1])
+            except OSError:
+                logger.exception("Failed to claim profile token")
+                claimed = False
+            if not claimed:
+                verified = None
+        if verified is None:
+            await self.app(scope, receive, send)
+            return
+        admin_id = verified[0]
+
+        profile_id = uuid.uuid4().hex
+        status = [500]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        interval_ms = settings.PROFILING_INTERVAL_MS
+        sampler = _Sampler(interval_ms / 1000, settings.PROFILING_MAX_SECONDS)
+        in_flight = HTTP_IN_FLIGHT.value()
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # joining the sampler and the file write would block every request on the loop
+            await asyncio.to_thread(sampler.stop)
+            profile = {
+                "id": profile_id,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status[0],
+                "requested_by": admin_id,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "interval_ms": interval_ms,
+                "samples": sampler.samples,
+                "in_flight": int(in_flight),
+                "stacks": dict(sampler.stacks),
+            }
+            try:
+                await asyncio.to_thread(profile_store.save, profile)
+                logger.info(f"Stored profile {profile_id} for {profile['method']} {profile['path']} ({profile['duration_ms']}ms)")
+            except OSError:
+                logger.exception("Failed to store request profile")
+
+
+# global instance
+profile_store = ProfileStore(settings.PROFILING_DIR, max_profiles=settings.PROFILING_MAX_PROFILES)
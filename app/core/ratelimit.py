@@ -0,0 +1,65 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+
+class TokenBucket:
+    """thread-safe token bucket: at most rate_per_sec units per second, bursts up to one second's worth."""
+
+    def __init__(self, rate_per_sec: float):
+        self.rate = rate_per_sec
+        self.tokens = rate_per_sec
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> None:
+        """block until n units are available (rate <= 0 means unlimited)."""
+        if self.rate <= 0:
+            return
+        # every unit is charged: the balance may go negative, which reserves the next
+        # slots in call order, so a request larger than the burst waits it off
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate) - n
+            self.updated = now
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+# refill for the time since the last call (database clock, so worker clocks don't matter),
+# then take n; the balance may go negative, which reserves the next slots in call order
+_RESERVE_SQL = text(
+    "INSERT INTO rate_limit_buckets AS b (name, tokens, updated_at)"
+    " VALUES (:name, :rate - :n, timezone('utc', clock_timestamp()))"
+    " ON CONFLICT (name) DO UPDATE SET"
+    " tokens = LEAST(:rate, b.tokens + EXTRACT(EPOCH FROM timezone('utc', clock_timestamp()) - b.updated_at) * :rate) - :n,"
+    " updated_at = timezone('utc', clock_timestamp())"
+    " RETURNING tokens"
+)
+
+
+class SharedTokenBucket:
+    """TokenBucket kept in Postgres (rate_limit_buckets), one budget for every worker.
+
+    For limits that hold per account rather than per process: with N workers each
+    owning a TokenBucket, the account sees N times the rate. acquire() reserves its
+    units with a single upsert and then sleeps off any shortfall.
+    """
+
+    def __init__(self, name: str, rate_per_sec: float):
+        self.name = name
+        self.rate = rate_per_sec
+
+    def acquire(self, n: int = 1) -> None:
+        """block until n units are available (rate <= 0 means unlimited)."""
+        if self.rate <= 0:
+            return
+        with SessionLocal() as db:
+            tokens = db.execute(_RESERVE_SQL, {"name": self.name, "rate": float(self.rate), "n": float(n)}).scalar()
+            db.commit()
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
@@ -1,18 +1,24 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.passwords import build_context
+from app.db.session import get_db, get_async_db
 from app import models
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# in-process bcrypt for scripts; request handlers go through app.core.passwords.password_hasher
+pwd_context = build_context(settings.PASSWORD_BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 # optional bearer for endpoints that may accept anonymous requests
 optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
@@ -46,38 +52,131 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from e
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+@dataclass(frozen=True)
+class Principal:
+    """slim authenticated user: enough for ownership and role checks without loading the ORM row."""
+    id: int
+    role: str
+    full_name: str
+    is_email_verified: bool
+    is_phone_verified: bool
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            full_name=user.full_name,
+            is_email_verified=bool(user.is_email_verified),
+            is_phone_verified=bool(user.is_phone_verified),
+        )
+
+
+class PrincipalCache:
+    """per-worker TTL + LRU map of user id -> Principal."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[Principal, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """drop one user (or everyone when user_id is None)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl}
+
+
+# global instance
+principal_cache = PrincipalCache(ttl=settings.PRINCIPAL_CACHE_TTL_SEC, max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def invalidate_principal(user_id: Optional[int] = None) -> None:
+    """call after committing changes to a user's role, verification flags or existence."""
+    principal_cache.invalidate(user_id)
+
+
+def _token_user_id(token: str) -> int:
     payload = decode_token(token)
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    user = db.get(models.User, int(sub))
+    try:
+        return int(sub)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+    # sync on purpose: the lookup uses the sync session, so let FastAPI run it in the threadpool
+    user = db.get(models.User, _token_user_id(token))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    principal_cache.put(Principal.from_user(user))
     return user
 
 
-def require_admin(user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """like get_current_user, but served from the principal cache, falling back to a non-blocking lookup."""
+    user_id = _token_user_id(token)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    return principal
+
+
+def require_admin(user: Principal = Depends(get_current_principal)) -> Principal:
     if user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin only")
     return user
 
 
-def require_admin_only(user: models.User = Depends(get_current_user)) -> models.User:
+def require_admin_only(user: Principal = Depends(get_current_principal)) -> Principal:
     """Require admin role exclusively - no other roles allowed"""
     if user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only access required")
     return user
 
 
-def require_manager(user: models.User = Depends(get_current_user)) -> models.User:
+def require_manager(user: Principal = Depends(get_current_principal)) -> Principal:
     """Require manager or admin role - managers can access marketing, promo, menu, analytics"""
     if user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Manager access required")
     return user
 
 
-def require_courier(user: models.User = Depends(get_current_user)) -> models.User:
+def require_courier(user: Principal = Depends(get_current_principal)) -> Principal:
     """Require courier, manager, or admin role - couriers can manage orders and deliveries"""
     if user.role not in ["admin", "manager", "courier"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Courier access required")
@@ -0,0 +1,185 @@
+"""
+Worker warm-up before taking traffic.
+
+The first requests a fresh worker serves are slow: database connections are not
+open yet, SQLAlchemy configures its mappers and compiles each statement on first
+use, and the OpenAPI schema is built on the first /docs hit. The startup hook runs
+the steps listed in WARMUP_STEPS as a background task so the worker is listening
+(and /health answers) while it warms up; GET /ready answers 503 until it is done,
+so the load balancer only routes traffic to warm workers.
+
+- mappers:     sqlalchemy configure_mappers()
+- pool:        open DB_POOL_SIZE connections (WARMUP_POOL_CONNECTIONS) on the sync and
+               async primary pools and on every replica
+- snapshots:   load the menu categories and items, active banners and modification
+               types with the same statements the hot endpoints run, and push them
+               through their response models (statement and serializer caches, and
+               the Postgres buffer cache)
+- openapi:     build and cache the OpenAPI schema
+
+A failing step is logged and skipped: a cold worker is better than none. The whole
+warm-up is capped at WARMUP_TIMEOUT_SEC, after which the worker reports ready anyway.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import configure_mappers
+
+from app import models
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine, read_router
+from app.schemas.admin import BannerOut
+from app.schemas.menu import CategoryOut, MenuItemOut
+from app.schemas.modifications import ModificationTypeOut
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.duration_ms: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, app) -> None:
+        """schedule the warm-up on the running event loop (called from the startup hook)."""
+        if not settings.WARMUP_ENABLED:
+            self.ready = True
+            return
+        # keep a reference, the loop only holds a weak one
+        self._task = asyncio.get_running_loop().create_task(self.run(app))
+
+    async def run(self, app) -> None:
+        self.started_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._run_steps(app), timeout=settings.WARMUP_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up did not finish within {settings.WARMUP_TIMEOUT_SEC}s, accepting traffic anyway")
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.finished_at = datetime.utcnow()
+        self.ready = True
+        logger.info(f"Warm-up finished in {self.duration_ms}ms: {self.steps}")
+
+    async def _run_steps(self, app) -> None:
+        for name in settings.WARMUP_STEPS:
+            step = _STEPS.get(name)
+            if step is None:
+                logger.warning(f"Unknown warm-up step {name!r}")
+                continue
+            self.steps[name] = {"status": "running"}
+            started = time.perf_counter()
+            try:
+                await step(app)
+                self.steps[name] = {"status": "ok"}
+            except Exception as e:
+                logger.exception(f"Warm-up step {name} failed")
+                self.steps[name] = {"status": "error", "error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+            self.steps[name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_ms": self.duration_ms,
+            "steps": dict(self.steps),
+        }
+
+
+# ---- steps ----
+
+async def _warm_mappers(app) -> None:
+    await asyncio.to_thread(configure_mappers)
+
+
+def _open_connections(sync_engine, count: int) -> None:
+    # hold them all at once, otherwise the pool hands back the same connection
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(sync_engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _open_async_connections(engine_, count: int) -> None:
+    connections = await asyncio.gather(*(engine_.connect() for _ in range(count)), return_exceptions=True)
+    errors = [c for c in connections if isinstance(c, BaseException)]
+    for connection in connections:
+        if not isinstance(connection, BaseException):
+            await connection.close()
+    if errors:
+        raise errors[0]
+
+
+async def _warm_pool(app) -> None:
+    count = settings.WARMUP_POOL_CONNECTIONS
+    await asyncio.to_thread(_open_connections, engine, count)
+    await _open_async_connections(async_engine, count)
+    for replica in read_router.replicas:
+        # a replica that is down must not fail the primary's warm-up
+        try:
+            await asyncio.to_thread(_open_connections, replica.engine, count)
+            await _open_async_connections(replica.async_engine, count)
+        except Exception as e:
+            logger.warning(f"Warm-up could not open connections to replica {replica.name}: {e}")
+
+
+def _serialize(model, rows) -> None:
+    adapter = TypeAdapter(List[model])
+    adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+async def _warm_snapshots(app) -> None:
+    # the menu endpoints read through the async stack
+    async with AsyncSessionLocal() as db:
+        categories = (await db.scalars(
+            select(models.Category).order_by(models.Category.sort.asc(), models.Category.name.asc())
+        )).all()
+        items = (await db.scalars(
+            select(models.MenuItem).where(models.MenuItem.is_active.is_(True)).order_by(models.MenuItem.id.desc())
+        )).all()
+        _serialize(CategoryOut, categories)
+        _serialize(MenuItemOut, items)
+    await asyncio.to_thread(_warm_sync_snapshots)
+
+
+def _warm_sync_snapshots() -> None:
+    # same statements as the manager banner list and /modifications/types
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        banners = db.query(models.Banner).filter(models.Banner.is_active == True).filter(  # noqa: E712
+            (models.Banner.start_date.is_(None) | (models.Banner.start_date <= now)) &
+            (models.Banner.end_date.is_(None) | (models.Banner.end_date >= now))
+        ).order_by(models.Banner.sort_order.asc(), models.Banner.created_at.desc()).all()
+        modification_types = db.query(models.ModificationType).filter(
+            models.ModificationType.is_active == True  # noqa: E712
+        ).order_by(models.ModificationType.name).all()
+        _serialize(BannerOut, banners)
+        _serialize(ModificationTypeOut, modification_types)
+
+
+async def _warm_openapi(app) -> None:
+    await asyncio.to_thread(app.openapi)
+
+
+_STEPS: Dict[str, Callable[..., Awaitable[None]]] = {
+    "mappers": _warm_mappers,
+    "pool": _warm_pool,
+    "snapshots": _warm_snapshots,
+    "openapi": _warm_openapi,
+}
+
+
+# global instance
+warmup = WarmupState()
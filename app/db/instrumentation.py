@@ -0,0 +1,207 @@
+"""
+Per-request SQL instrumentation.
+
+Every engine built in app.db.session gets cursor hooks that count statements and time
+spent in the database for the request currently being served (tracked through a
+contextvar set by QueryStatsMiddleware). At the end of each request the middleware:
+
+- adds a Server-Timing header (db time and statement count, plus total app time);
+- warns when the same statement shape ran SQL_N_PLUS_ONE_THRESHOLD or more times,
+  the usual signature of a lazy load inside a loop;
+- checks the route's query budget. Routes declare it with
+  ``dependencies=[query_budget(n)]``; SQL_QUERY_BUDGET_DEFAULT applies elsewhere
+  (0 = no budget). Over budget logs a warning; with SQL_QUERY_BUDGET_STRICT on
+  (default in APP_ENV=test) the response is replaced by a 500 before it starts, so
+  CI catches regressions. Statements run after the response started (background
+  tasks) can only be logged.
+
+Statement shapes are the compiled SQL with expanded IN lists collapsed, so
+"WHERE id IN (1, 2)" and "WHERE id IN (1, 2, 3)" count as the same shape.
+
+The same hooks feed app.db.slow_queries with every statement slower than
+SLOW_QUERY_THRESHOLD_MS, whether or not it ran inside a request.
+"""
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import Depends
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.slow_queries import SKIP_OPTION, slow_query_log
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueryStats:
+    """statement counters for one request (shared by its threadpool and parallel-read threads)."""
+
+    def __init__(self, budget: Optional[int] = None, scope: Optional[dict] = None):
+        self.budget = budget
+        self.scope = scope or {}
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.db_seconds += elapsed
+            self.shapes[shape] += 1
+
+    def route_name(self) -> str:
+        # the route is only known once routing ran; fall back to the raw path before that
+        route = self.scope.get("route")
+        return f'{self.scope.get("method")} {getattr(route, "path", None) or self.scope.get("path")}'
+
+    def over_budget(self) -> Optional[str]:
+        """what to report when the request ran more statements than its budget, else None."""
+        if self.budget is None or self.count <= self.budget:
+            return None
+        return f"{self.route_name()} ran {self.count} SQL statements, budget is {self.budget}"
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        with self._lock:
+            return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+_current: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar("request_query_stats", default=None)
+
+_IN_LIST = re.compile(r"\(\s*(?:%\(\w+\)s|\?|\$\d+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("(?)", statement)).strip()
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+
+# ---- engine hooks ----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _make_after_cursor_execute(explain_engine):
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000 if settings.SLOW_QUERY_THRESHOLD_MS > 0 else None
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if threshold is not None and elapsed >= threshold and not conn.get_execution_options().get(SKIP_OPTION, False):
+            slow_query_log.record(
+                statement,
+                statement_shape(statement),
+                parameters,
+                elapsed,
+                route=stats.route_name() if stats is not None else None,
+                pool=getattr(conn.engine.pool, "metrics_name", None),
+                explain_engine=explain_engine,
+            )
+
+    return _after_cursor_execute
+
+
+def instrument_engine(engine, explain_engine=None) -> None:
+    """attach per-request counters and the slow query log to a sync engine.
+
+    For async engines pass ``async_engine.sync_engine`` plus a sync engine on the same
+    database as explain_engine; slow-query EXPLAINs run from a plain thread.
+    """
+    if not settings.SQL_INSTRUMENTATION_ENABLED and settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _make_after_cursor_execute(explain_engine or engine))
+
+
+# ---- budgets ----
+
+def query_budget(max_queries: int):
+    """route dependency declaring how many statements the route may run, e.g.
+    ``@router.get("/mine", dependencies=[query_budget(4)])``."""
+    def _set_budget() -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return Depends(_set_budget)
+
+
+# ---- middleware ----
+
+class QueryStatsMiddleware:
+    """ASGI middleware: scopes RequestQueryStats to each HTTP request and reports on it."""
+
+    def __init__(self, app):
+        self.app = app
+        self.threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        self.default_budget = settings.SQL_QUERY_BUDGET_DEFAULT or None
+        self.strict = settings.SQL_QUERY_BUDGET_STRICT
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(budget=self.default_budget, scope=scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        rejected = False
+
+        async def send_with_timing(message):
+            nonlocal rejected
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - started) * 1000
+                value = f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.count} queries", app;dur={app_ms:.1f}'
+                over = stats.over_budget() if self.strict else None
+                if over is not None:
+                    # fail the request itself; the handler's own response is dropped
+                    rejected = True
+                    logger.error(over)
+                    body = json.dumps({"detail": f"Query budget exceeded: {over}"}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"server-timing", value.encode()),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", value.encode())]
+            elif rejected:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+        self._report(stats, rejected)
+
+    def _report(self, stats: RequestQueryStats, rejected: bool) -> None:
+        name = stats.route_name()
+
+        for shape, n in stats.repeated(self.threshold).items():
+            logger.warning(f"Possible N+1 in {name}: statement ran {n}x: {shape[:200]}")
+
+        over = stats.over_budget()
+        if over is not None and not rejected:
+            logger.warning(over)
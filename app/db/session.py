@@ -1,11 +1,57 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import logging
+import math
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Dict, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_WAIT, track_pool
+from app.db.instrumentation import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+class AppSession(Session):
+    """session class shared by sync and async sessions, so ORM event listeners see both."""
+
+
+class _TimedPoolMixin:
+    """records how long each checkout took to get a connection (db_pool_wait_seconds)."""
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started, self.metrics_name)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class _TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
 
 
-def _build_engine():
-    url = settings.DATABASE_URL
+class _TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_kwargs(url: str) -> dict:
     engine_kwargs = {
         "echo": (settings.APP_ENV == "dev"),
         "pool_pre_ping": True,
@@ -27,17 +73,327 @@ def _build_engine():
             "application_name": "appetit_backend",
         }
     })
+    return engine_kwargs
+
+
+def _build_engine(url: Optional[str] = None, pool_name: str = "primary"):
+    url = url or settings.DATABASE_URL
+    built = create_engine(url, poolclass=_TimedQueuePool, **_engine_kwargs(url))
+    instrument_engine(built)
+    track_pool(pool_name, built)
+    return built
+
 
-    return create_engine(url, **engine_kwargs)
+def _build_async_engine(url: Optional[str] = None, pool_name: str = "primary_async", explain_engine=None):
+    # same DSN and pool settings; psycopg3 picks its async connection class under create_async_engine
+    url = url or settings.DATABASE_URL
+    if url.startswith("postgresql://"):
+        url = "postgresql+psycopg://" + url[len("postgresql://"):]
+    kwargs = _engine_kwargs(url)
+    kwargs.pop("future", None)
+    built = create_async_engine(url, poolclass=_TimedAsyncQueuePool, **kwargs)
+    # slow-query EXPLAINs run from a plain thread, so they go through the sync twin
+    instrument_engine(built.sync_engine, explain_engine=explain_engine)
+    track_pool(pool_name, built.sync_engine)
+    return built
 
 
 engine = _build_engine()
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+SessionLocal = sessionmaker(bind=engine, class_=AppSession, autoflush=False, autocommit=False, expire_on_commit=False)
+
+# async stack for endpoints that should not tie up a threadpool worker while waiting on postgres
+async_engine = _build_async_engine(explain_engine=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, sync_session_class=AppSession, autoflush=False, expire_on_commit=False
+)
+
+
+# ---- read replicas ----
+
+# 0 on a primary or a caught-up standby; otherwise seconds since the last replayed transaction
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class _Replica:
+    """engines and session factories for one replica DSN, plus its last health check."""
+
+    def __init__(self, url: str):
+        parsed = make_url(url)
+        # host:port only, so the password never ends up in logs or stats
+        self.name = f"{parsed.host}:{parsed.port or 5432}"
+        self.engine = _build_engine(url, pool_name=f"replica {self.name}")
+        self.async_engine = _build_async_engine(url, pool_name=f"replica_async {self.name}", explain_engine=self.engine)
+        self.session_factory = sessionmaker(
+            bind=self.engine, class_=AppSession, autoflush=False, autocommit=False, expire_on_commit=False
+        )
+        self.async_session_factory = async_sessionmaker(
+            bind=self.async_engine, sync_session_class=AppSession, autoflush=False, expire_on_commit=False
+        )
+        # not trusted until the first check passes
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+
+class ReadRouter:
+    """picks the engine for read-only dependencies.
+
+    Reads go round-robin over replicas that passed their last health check (reachable and
+    within DB_REPLICA_MAX_LAG_SEC). A user who wrote within the last DB_READ_STICKY_SEC
+    reads from the primary so they always see their own cart/order changes; with no
+    replicas configured, or none healthy, everything falls back to the primary.
+
+    The write times kept here only cover this process; ReadYourWritesMiddleware also
+    hands the writer a signed cookie, so the next read sticks to the primary on
+    whichever worker serves it.
+    """
+
+    def __init__(self, urls, sticky_seconds: float = 5.0, check_interval: float = 10.0, max_lag: float = 10.0):
+        self.replicas = [_Replica(u) for u in urls]
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._lock = threading.Lock()
+        self._recent_writes: Dict[int, float] = {}
+        self._rr = itertools.count()
+        self._monitor: Optional[threading.Thread] = None
+        self.replica_reads = 0
+        self.sticky_reads = 0
+        self.fallback_reads = 0
+        for replica in self.replicas:
+            self._watch_errors(replica)
+
+    # ---- read-your-writes ----
+
+    def note_write(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[user_id] = now + self.sticky_seconds
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {u: t for u, t in self._recent_writes.items() if t > now}
+
+    def _is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._recent_writes.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    # ---- routing ----
+
+    def pick(self, user_id: Optional[int] = None, sticky: bool = False) -> Optional[_Replica]:
+        """replica to read from, or None for the primary (sticky: the caller knows the user just wrote)."""
+        if not self.replicas:
+            return None
+        self._ensure_monitor()
+        with self._lock:
+            if sticky or self._is_sticky(user_id):
+                self.sticky_reads += 1
+                return None
+            healthy = [r for r in self.replicas if r.healthy]
+            if not healthy:
+                self.fallback_reads += 1
+                return None
+            self.replica_reads += 1
+            return healthy[next(self._rr) % len(healthy)]
+
+    # ---- health ----
+
+    def _mark(self, replica: _Replica, healthy: bool, lag: Optional[float] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            was = replica.healthy
+            replica.healthy = healthy
+            replica.lag_seconds = lag
+            replica.last_error = error
+            replica.checked_at = time.time()
+        if was and not healthy:
+            logger.warning(f"Read replica {replica.name} taken out of rotation: {error}")
+        elif healthy and not was:
+            logger.info(f"Read replica {replica.name} is back in rotation (lag {lag:.1f}s)")
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    lag = float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0)
+            except Exception as e:
+                self._mark(replica, False, error=str(e).splitlines()[0] if str(e) else type(e).__name__)
+                continue
+            if lag > self.max_lag:
+                self._mark(replica, False, lag=lag, error=f"replication lag {lag:.1f}s")
+            else:
+                self._mark(replica, True, lag=lag)
+
+    def _watch_errors(self, replica: _Replica) -> None:
+        # fail over right away on a dropped connection instead of waiting for the next check
+        def on_error(context):
+            if context.is_disconnect:
+                self._mark(replica, False, error=str(context.original_exception).splitlines()[0])
+
+        event.listen(replica.engine, "handle_error", on_error)
+        event.listen(replica.async_engine.sync_engine, "handle_error", on_error)
+
+    def _run_monitor(self) -> None:
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Read replica health check failed")
+            time.sleep(self.check_interval)
+
+    def _ensure_monitor(self) -> None:
+        if self._monitor is not None:
+            return
+        with self._lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._run_monitor, name="db-replica-health", daemon=True)
+                self._monitor.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "name": r.name,
+                        "healthy": r.healthy,
+                        "lag_seconds": r.lag_seconds,
+                        "last_error": r.last_error,
+                        "checked_at": r.checked_at,
+                    }
+                    for r in self.replicas
+                ],
+                "sticky_seconds": self.sticky_seconds,
+                "sticky_users": sum(1 for t in self._recent_writes.values() if t > time.monotonic()),
+                "replica_reads": self.replica_reads,
+                "sticky_reads": self.sticky_reads,
+                "fallback_reads": self.fallback_reads,
+            }
+
+
+# global instance
+read_router = ReadRouter(
+    settings.DB_REPLICA_URLS,
+    sticky_seconds=settings.DB_READ_STICKY_SEC,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL_SEC,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SEC,
+)
+
+
+def _request_user_id(request: Optional[Request]) -> Optional[int]:
+    """user id from the bearer token, without a db lookup; None for anonymous or bad tokens."""
+    if request is None:
+        return None
+    cached = getattr(request.state, "db_user_id", False)
+    if cached is not False:
+        return cached
+    user_id = None
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_id = int(jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"]).get("sub"))
+        except (JWTError, TypeError, ValueError):
+            user_id = None
+    request.state.db_user_id = user_id
+    return user_id
+
+
+@event.listens_for(AppSession, "after_flush")
+def _flag_user_write(session, flush_context):
+    if session.info.get("user_id") is not None and (session.new or session.dirty or session.deleted):
+        session.info["wrote"] = True
+
+
+@event.listens_for(AppSession, "do_orm_execute")
+def _flag_user_bulk_write(orm_execute_state):
+    session = orm_execute_state.session
+    if session.info.get("user_id") is not None and (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        session.info["wrote"] = True
+
+
+@event.listens_for(AppSession, "after_commit")
+def _note_user_write(session):
+    if session.info.pop("wrote", False):
+        read_router.note_write(session.info["user_id"])
+        state = session.info.get("request_state")
+        if state is not None:
+            # picked up by ReadYourWritesMiddleware when the response starts
+            state.db_wrote_user_id = session.info["user_id"]
+
+
+# ---- read-your-writes across workers ----
+
+STICKY_COOKIE = "db_read_primary"
+
+
+def _sticky_cookie(user_id: int) -> str:
+    """Set-Cookie value keeping user_id's reads on the primary for DB_READ_STICKY_SEC."""
+    seconds = math.ceil(read_router.sticky_seconds)
+    token = jwt.encode(
+        {"sub": str(user_id), "exp": int(time.time()) + seconds + 1, "typ": "read_primary"},
+        settings.SECRET_KEY,
+        algorithm="HS256",
+    )
+    cookie = SimpleCookie()
+    cookie[STICKY_COOKIE] = token
+    morsel = cookie[STICKY_COOKIE]
+    morsel["max-age"] = seconds
+    morsel["path"] = "/"
+    morsel["httponly"] = True
+    morsel["samesite"] = "lax"
+    morsel["secure"] = settings.APP_ENV != "dev"
+    return morsel.OutputString()
+
+
+def _request_sticky(request: Optional[Request], user_id: Optional[int]) -> bool:
+    """True when the request carries an unexpired sticky cookie issued to user_id."""
+    if request is None or user_id is None:
+        return False
+    token = request.cookies.get(STICKY_COOKIE)
+    if not token:
+        return False
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except JWTError:  # expired or forged
+        return False
+    return claims.get("typ") == "read_primary" and claims.get("sub") == str(user_id)
+
+
+class ReadYourWritesMiddleware:
+    """sets the sticky cookie on responses to requests that committed a user's write.
+
+    Pure ASGI like QueryStatsMiddleware; a no-op without replicas. A write committed
+    after the response started (background tasks) only sticks on this worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not read_router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                user_id = scope.get("state", {}).get("db_wrote_user_id")
+                if user_id is not None:
+                    MutableHeaders(scope=message).append("set-cookie", _sticky_cookie(user_id))
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
 
 
 # fastAPI dependency
 from contextlib import contextmanager
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 
 @contextmanager
@@ -54,9 +410,43 @@ def session_scope() -> Iterator["Session"]:
         db.close()
 
 
-def get_db() -> Iterator["Session"]:
+def get_db(request: Request = None) -> Iterator["Session"]:
     db = SessionLocal()
+    # remembered so a commit opens this user's read-your-writes window
+    db.info["user_id"] = _request_user_id(request)
+    db.info["request_state"] = request.state if request is not None else None
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request = None) -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        db.sync_session.info["user_id"] = _request_user_id(request)
+        db.sync_session.info["request_state"] = request.state if request is not None else None
+        yield db
+
+
+def read_session(user_id: Optional[int] = None, sticky: bool = False) -> "Session":
+    """new session for read-only work: a healthy replica, or the primary."""
+    replica = read_router.pick(user_id, sticky)
+    return replica.session_factory() if replica else SessionLocal()
+
+
+def get_read_db(request: Request = None) -> Iterator["Session"]:
+    """read-only session for GET endpoints; never commit on it."""
+    user_id = _request_user_id(request)
+    db = read_session(user_id, _request_sticky(request, user_id))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_read_db(request: Request = None) -> AsyncIterator[AsyncSession]:
+    user_id = _request_user_id(request)
+    replica = read_router.pick(user_id, _request_sticky(request, user_id))
+    factory = replica.async_session_factory if replica else AsyncSessionLocal
+    async with factory() as db:
+        yield db
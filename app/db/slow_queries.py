@@ -0,0 +1,166 @@
+"""
+Slow query log.
+
+The cursor hooks in app.db.instrumentation hand every statement slower than
+SLOW_QUERY_THRESHOLD_MS to slow_query_log, which keeps the last SLOW_QUERY_LOG_SIZE
+in a per-worker ring buffer: normalized SQL, the parameter shape (names and types,
+never values), the route that ran it, the pool and the duration.
+
+With SLOW_QUERY_EXPLAIN on, a single background thread then re-runs the statement
+under EXPLAIN on a separate pooled connection, inside a transaction that is always
+rolled back. SELECTs get ``EXPLAIN (ANALYZE, BUFFERS)``; writes only get a plain
+EXPLAIN so they are never executed twice. The same statement shape is explained at
+most once per SLOW_QUERY_EXPLAIN_COOLDOWN_SEC, and when the queue is full new
+requests are dropped rather than slowing the database down further.
+"""
+import itertools
+import logging
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# execution option that keeps our own EXPLAIN runs out of the log: skip_slow_query_log=True
+SKIP_OPTION = "skip_slow_query_log"
+
+_HEAD = re.compile(r"\s*\(*\s*(\w+)")
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def parameters_shape(parameters: Any) -> Any:
+    """parameter names and python types, without the values (they may hold personal data)."""
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {"rows": len(parameters), "first": parameters_shape(parameters[0])}
+        return [type(v).__name__ for v in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def _is_select(statement: str) -> bool:
+    match = _HEAD.match(statement)
+    head = match.group(1).upper() if match else ""
+    if head == "SELECT":
+        return True
+    # CTEs are fine as long as nothing in them writes
+    return head == "WITH" and not _WRITE.search(statement)
+
+
+class SlowQueryLog:
+    def __init__(self, size: int = 200, explain: bool = True, cooldown: float = 300.0):
+        self.entries: deque = deque(maxlen=size)
+        self.explain = explain
+        self.cooldown = cooldown
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._explained_at: Dict[str, float] = {}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=50)
+        self._worker: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.explain_dropped = 0
+
+    def record(self, statement: str, shape: str, parameters: Any, elapsed: float,
+               route: Optional[str], pool: Optional[str], explain_engine=None) -> None:
+        entry = {
+            "id": next(self._ids),
+            "at": datetime.utcnow().isoformat(),
+            "duration_ms": round(elapsed * 1000, 1),
+            "statement": shape,
+            "parameters": parameters_shape(parameters),
+            "route": route,
+            "pool": pool,
+            "explain": None,
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.recorded += 1
+            due = explain_engine is not None and self.explain and (
+                time.monotonic() - self._explained_at.get(shape, -self.cooldown) >= self.cooldown
+            )
+            if due:
+                self._explained_at[shape] = time.monotonic()
+        logger.warning(f"Slow query ({entry['duration_ms']}ms) in {route or 'background'}: {shape[:200]}")
+        if due:
+            self._enqueue(entry, statement, parameters, explain_engine)
+
+    # ---- explain ----
+
+    def _enqueue(self, entry: dict, statement: str, parameters: Any, explain_engine) -> None:
+        self._ensure_worker()
+        try:
+            entry["explain"] = {"status": "pending"}
+            self._queue.put_nowait((entry, statement, parameters, explain_engine))
+        except queue.Full:
+            entry["explain"] = {"status": "dropped"}
+            with self._lock:
+                self.explain_dropped += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            entry, statement, parameters, explain_engine = self._queue.get()
+            entry["explain"] = self._explain(statement, parameters, explain_engine)
+
+    def _explain(self, statement: str, parameters: Any, explain_engine) -> dict:
+        analyze = _is_select(statement)
+        if isinstance(parameters, list) and parameters and isinstance(parameters[0], (dict, tuple)):
+            # executemany: the plan of the first row is representative
+            parameters = parameters[0]
+        prefix = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " if analyze else "EXPLAIN (FORMAT JSON) "
+        try:
+            with explain_engine.connect() as conn:
+                conn = conn.execution_options(**{SKIP_OPTION: True})
+                with conn.begin() as tx:
+                    conn.exec_driver_sql("SET LOCAL statement_timeout = 30000")
+                    plan = conn.exec_driver_sql(prefix + statement, parameters or None).scalar()
+                    tx.rollback()
+            return {"status": "ok", "analyze": analyze, "plan": plan}
+        except Exception as e:
+            return {"status": "error", "analyze": analyze, "error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+
+    # ---- reading ----
+
+    def list(self, limit: int = 50, min_ms: float = 0.0) -> List[dict]:
+        with self._lock:
+            entries = [e for e in reversed(self.entries) if e["duration_ms"] >= min_ms]
+        return entries[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self._explained_at.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+                "buffered": len(self.entries),
+                "buffer_size": self.entries.maxlen,
+                "recorded": self.recorded,
+                "explain_enabled": self.explain,
+                "explain_queue": self._queue.qsize(),
+                "explain_dropped": self.explain_dropped,
+            }
+
+
+# global instance
+slow_query_log = SlowQueryLog(
+    size=settings.SLOW_QUERY_LOG_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    cooldown=settings.SLOW_QUERY_EXPLAIN_COOLDOWN_SEC,
+)
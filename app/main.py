@@ -1,8 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.db.session import engine
+from app.core.integrations import integrations
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry, start_flusher
+from app.core.passwords import password_hasher
+from app.core.profiling import ProfilingMiddleware
+from app.core.warmup import warmup
+from app.services.push.campaigns import campaign_runner
+from app.services.push.order_notifications import order_notifier
+from app.services.sms.broadcasts import broadcast_runner
+from app.services.email.queue import email_queue
+from app.services.email.events import email_event_ingestor
+from app.services.email.engagement import email_event_retention
+from app.db.session import ReadYourWritesMiddleware, engine
+from app.db.instrumentation import QueryStatsMiddleware
 from app.db.base import Base
 from app.api.v1.api import router as api_v1_router
 
@@ -17,18 +30,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# per-request SQL counts, N+1 warnings and query budgets (Server-Timing header)
+app.add_middleware(QueryStatsMiddleware)
+
+# keeps a user's reads on the primary right after their write, on every worker
+app.add_middleware(ReadYourWritesMiddleware)
+
+# latency histograms and in-flight gauge for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# admin-triggered sampling profiles of single requests (X-Profile-Token header)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # mount our API routes
 app.include_router(api_v1_router, prefix="/api/v1")
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     # db's handled by alembic migrations
     # run 'alembic upgrade head' or scripts/init_db.py
     # startup hook for any app-level init stuff
-    pass
+    start_flusher()
+    # SDKs are imported on first use unless this worker asks for them up front
+    integrations.preload(settings.INTEGRATIONS_PRELOAD)
+    # runs in the background; /ready answers 503 until it is done
+    warmup.start(app)
+    # queued/interrupted push campaigns, SMS broadcasts and emails (*_WORKER_ENABLED)
+    campaign_runner.start()
+    broadcast_runner.start()
+    email_queue.start()
+    # prunes email_events past EMAIL_EVENTS_RETENTION_DAYS
+    email_event_retention.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # stop the bcrypt worker processes
+    password_hasher.shutdown()
+    # order pushes still inside their coalescing window
+    order_notifier.flush()
+    # Resend webhook events acknowledged but not inserted yet
+    email_event_ingestor.flush()
 
 
 @app.get("/health")
 def health():
     return {"status": "ok", "env": settings.APP_ENV}
+
+
+@app.get("/ready")
+def ready():
+    # readiness probe: liveness is /health, this one waits for the warm-up
+    if not warmup.ready:
+        return JSONResponse({"status": "warming_up", "warmup": warmup.stats()}, status_code=503)
+    return {"status": "ready", "warmup": warmup.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(None)):
+    # prometheus text format, merged across workers when METRICS_MULTIPROC_DIR is set
+    if settings.METRICS_TOKEN:
+        if authorization != f"Bearer {settings.METRICS_TOKEN}":
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif settings.APP_ENV != "dev":
+        # open only in development; everywhere else a token has to be configured
+        raise HTTPException(status_code=403, detail="Metrics require METRICS_TOKEN")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
@@ -17,6 +17,13 @@ from .models import (
     CartItem,
     CartItemModification,
     Banner,
+    OrderDailyStats,
+    EmailDailyStats,
+    PushCampaign,
+    SmsBroadcast,
+    SmsBroadcastRecipient,
+    EmailOutbox,
+    RateLimitBucket,
 )
 
 __all__ = [
@@ -38,4 +45,11 @@ __all__ = [
     "CartItem",
     "CartItemModification",
     "Banner",
+    "OrderDailyStats",
+    "EmailDailyStats",
+    "PushCampaign",
+    "SmsBroadcast",
+    "SmsBroadcastRecipient",
+    "EmailOutbox",
+    "RateLimitBucket",
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Numeric, Text, Float, UniqueConstraint, JSON, func
+from datetime import date, datetime
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, ForeignKey, Numeric, Text, Float, UniqueConstraint, Index, JSON, LargeBinary, func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.db.base import Base
@@ -62,6 +62,9 @@ class Device(Base):
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     platform: Mapped[str] = mapped_column(String(16))  # android|ios|web
     fcm_token: Mapped[str] = mapped_column(String(512))
+    locale: Mapped[str | None] = mapped_column(String(8), nullable=True)  # ru|kz|en, for the locale topic
+    topics: Mapped[list | None] = mapped_column(JSON, nullable=True)  # FCM topics the token is subscribed to
+    topics_synced_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # NULL = topics need a sync
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, onupdate=now)
 
@@ -282,6 +285,10 @@ class PhoneVerification(Base):
 
 class EmailEvent(Base):
     __tablename__ = "email_events"
+    __table_args__ = (
+        Index("ix_email_events_email_id_type", "email_id", "type"),  # first open/click per email (rollup)
+        Index("ix_email_events_created_at", "created_at"),  # retention pruning
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     svix_id: Mapped[str] = mapped_column(String(255), unique=True)  # Unique event ID from Svix
@@ -386,6 +393,133 @@ class Banner(Base):
     creator: Mapped[User] = relationship("User")
 
 
+class OrderDailyStats(Base):
+    """daily order rollup with mergeable user sketches for range analytics."""
+    __tablename__ = "order_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)  # UTC day
+    orders_count: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[float] = mapped_column(Numeric(12, 2), default=0)
+    distinct_users: Mapped[int] = mapped_column(Integer, default=0)
+    hll: Mapped[bytes] = mapped_column(LargeBinary)  # HyperLogLog registers (uint8 per register)
+    user_ids: Mapped[bytes] = mapped_column(LargeBinary)  # sorted int64 user ids with orders that day
+    user_order_counts: Mapped[bytes] = mapped_column(LargeBinary)  # int32 order counts aligned with user_ids
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, onupdate=now)
+
+
+class EmailDailyStats(Base):
+    """daily email engagement rollup, maintained as webhook events are ingested."""
+    __tablename__ = "email_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)  # UTC day of the event
+    template: Mapped[str] = mapped_column(String(64), primary_key=True)  # tags.category, "unknown" if untagged
+    event_type: Mapped[str] = mapped_column(String(64), primary_key=True)  # email.sent, email.opened, ...
+    events: Mapped[int] = mapped_column(Integer, default=0)
+    unique_emails: Mapped[int] = mapped_column(Integer, default=0)  # events that were the first of their type for the email
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, onupdate=now)
+
+
+class PushCampaign(Base):
+    """admin push campaign executed by the background runner, checkpointed per chunk."""
+    __tablename__ = "push_campaigns"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    title: Mapped[str] = mapped_column(String(100))
+    body: Mapped[str] = mapped_column(String(500))
+    data: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    priority: Mapped[str] = mapped_column(String(16), default="normal")
+    ttl: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    targeting: Mapped[dict] = mapped_column(JSON)  # AdminPushTargeting as submitted
+    targeting_method: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)  # queued|running|completed|failed|cancelled
+    total: Mapped[int] = mapped_column(Integer, default=0)  # devices targeted when the campaign was created
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    pruned: Mapped[int] = mapped_column(Integer, default=0)
+    last_device_id: Mapped[int] = mapped_column(Integer, default=0)  # resume cursor: devices up to here are done
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # stale while running = runner died
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, onupdate=now)
+
+
+class SmsBroadcast(Base):
+    """admin SMS broadcast executed by the background runner, checkpointed per chunk of users."""
+    __tablename__ = "sms_broadcasts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    message: Mapped[str] = mapped_column(Text)
+    audience: Mapped[str] = mapped_column(String(32), default="all")
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)  # queued|running|completed|failed|cancelled
+    total: Mapped[int] = mapped_column(Integer, default=0)  # recipients when the broadcast was created
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    last_user_id: Mapped[int] = mapped_column(Integer, default=0)  # resume cursor: users up to here are done
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # stale while running = runner died
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, onupdate=now)
+
+
+class SmsBroadcastRecipient(Base):
+    """per-recipient outcome of an SMS broadcast, inserted in bulk at each checkpoint."""
+    __tablename__ = "sms_broadcast_recipients"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "user_id", name="uq_sms_broadcast_recipient"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    broadcast_id: Mapped[int] = mapped_column(ForeignKey("sms_broadcasts.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)  # no FK: outlives deleted users
+    phone: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16))  # sent|failed
+    attempts: Mapped[int] = mapped_column(Integer, default=1)
+    sid: Mapped[str | None] = mapped_column(String(64), nullable=True)  # Twilio message SID
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
+
+
+class EmailOutbox(Base):
+    """a rendered email waiting for (or done with) delivery by the email queue's batch sender."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    idempotency_key: Mapped[str | None] = mapped_column(String(255), unique=True, nullable=True)  # enqueueing twice is a no-op
+    template: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    to_email: Mapped[str] = mapped_column(String(255))
+    subject: Mapped[str] = mapped_column(String(512))
+    html: Mapped[str] = mapped_column(Text)
+    tags: Mapped[list | None] = mapped_column(JSON, nullable=True)  # [{"name", "value"}] as Resend takes them
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)  # no FK: outlives deleted users
+    status: Mapped[str] = mapped_column(String(16), default="pending")  # pending|sending|sent|dead|skipped
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=now)  # while sending: lease expiry
+    batch_key: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)  # Resend idempotency key of its batch
+    message_id: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)  # Resend email ID
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class RateLimitBucket(Base):
+    """token bucket shared by all workers (app.core.ratelimit.SharedTokenBucket)."""
+    __tablename__ = "rate_limit_buckets"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float)  # negative: reserved ahead, callers are waiting
+    updated_at: Mapped[datetime] = mapped_column(DateTime)  # database clock, UTC
+
+
 # update CartItem to include modifications relationship
 CartItem.modifications = relationship("CartItemModification", back_populates="cart_item", cascade="all, delete-orphan")
 
@@ -97,6 +97,46 @@ class AdminPushResponse(BaseModel):
     errors: Optional[List[str]] = Field(None, description="List of error reasons")
     results: Optional[List[PushResult]] = Field(None, description="Detailed per-device results")
     reason: Optional[str] = Field(None, description="Reason for skipped or error status")
+    pruned: int = Field(0, description="Devices deleted because FCM rejected their token for good")
+    job_id: Optional[int] = Field(None, description="Push campaign job id when the send was queued")
+
+
+class PushCampaignOut(BaseModel):
+    """push campaign job progress."""
+    id: int
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    title: str
+    targeting_method: str
+    total: int = Field(..., description="Devices targeted when the campaign was created")
+    sent: int
+    failed: int
+    pruned: int
+    remaining: int = Field(..., description="Devices not sent to yet")
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+
+    @classmethod
+    def from_campaign(cls, campaign) -> "PushCampaignOut":
+        remaining = 0 if campaign.status == "completed" else max(0, campaign.total - campaign.sent - campaign.failed)
+        return cls(
+            id=campaign.id,
+            status=campaign.status,
+            title=campaign.title,
+            targeting_method=campaign.targeting_method,
+            total=campaign.total,
+            sent=campaign.sent,
+            failed=campaign.failed,
+            pruned=campaign.pruned,
+            remaining=remaining,
+            error=campaign.error,
+            created_at=campaign.created_at,
+            started_at=campaign.started_at,
+            finished_at=campaign.finished_at,
+            heartbeat_at=campaign.heartbeat_at,
+        )
 
 
 class AdminSmsRequest(BaseModel):
@@ -105,7 +145,60 @@ class AdminSmsRequest(BaseModel):
 
 
 class AdminSmsResponse(BaseModel):
+    sent: int = Field(0, description="Messages sent so far (0 when the broadcast was just queued)")
+    status: str = Field("queued", description="queued: follow the broadcast at /admin/push/sms-jobs/{job_id}")
+    job_id: Optional[int] = Field(None, description="SMS broadcast job id")
+    total: int = Field(0, description="Recipients when the broadcast was queued")
+
+
+class SmsBroadcastOut(BaseModel):
+    """SMS broadcast job progress."""
+    id: int
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    message: str
+    audience: str
+    total: int = Field(..., description="Recipients when the broadcast was created")
     sent: int
+    failed: int
+    remaining: int = Field(..., description="Recipients not sent to yet")
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+
+    @classmethod
+    def from_broadcast(cls, broadcast) -> "SmsBroadcastOut":
+        remaining = 0 if broadcast.status == "completed" else max(0, broadcast.total - broadcast.sent - broadcast.failed)
+        return cls(
+            id=broadcast.id,
+            status=broadcast.status,
+            message=broadcast.message,
+            audience=broadcast.audience,
+            total=broadcast.total,
+            sent=broadcast.sent,
+            failed=broadcast.failed,
+            remaining=remaining,
+            error=broadcast.error,
+            created_at=broadcast.created_at,
+            started_at=broadcast.started_at,
+            finished_at=broadcast.finished_at,
+            heartbeat_at=broadcast.heartbeat_at,
+        )
+
+
+class SmsRecipientOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    phone: str
+    status: str  # sent|failed
+    attempts: int
+    sid: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
 
 
 class ImageUploadResponse(BaseModel):
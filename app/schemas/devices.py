@@ -1,10 +1,16 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class DeviceRegisterRequest(BaseModel):
     fcm_token: str
     platform: str  # android|ios|web
+    locale: Optional[str] = None  # ru|kz|en
+
+
+class DeviceRegisterBatchRequest(BaseModel):
+    # e.g. the previous and the rotated token of one device, registered in one call
+    devices: List[DeviceRegisterRequest] = Field(..., min_length=1, max_length=100)
 
 
 class DeviceOut(BaseModel):
@@ -9,34 +9,17 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 
-# Graceful handling of Google Analytics Data API imports
-try:
-    from google.analytics.data_v1beta import BetaAnalyticsDataClient
-    from google.analytics.data_v1beta.types import (
-        RunReportRequest,
-        Dimension,
-        Metric,
-        DateRange,
-        OrderBy,
-        FilterExpression,
-        Filter,
-        FilterStringFilter,
-    )
-    from google.oauth2.service_account import Credentials
-    GA4_DATA_API_AVAILABLE = True
-except ImportError:
-    # Mock classes when library is not available
-    BetaAnalyticsDataClient = None
-    RunReportRequest = None
-    Dimension = None
-    Metric = None
-    DateRange = None
-    OrderBy = None
-    FilterExpression = None
-    Filter = None
-    FilterStringFilter = None
-    Credentials = None
-    GA4_DATA_API_AVAILABLE = False
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
+
+
+def _load_ga4_data():
+    # the package re-exports the client and all request types
+    from google.analytics import data_v1beta  # type: ignore
+    return data_v1beta
+
+
+_ga4_data = integrations.register("ga4_data", "google.analytics.data_v1beta", _load_ga4_data)
 
 
 class GA4DataClient:
@@ -83,7 +66,8 @@ class GA4DataClient:
         
     def _get_client(self):
         """Initialize and return GA4 Data API client."""
-        if not GA4_DATA_API_AVAILABLE:
+        ga = _ga4_data.get()
+        if ga is None:
             return None
             
         if self._client is None:
@@ -92,11 +76,12 @@ class GA4DataClient:
             
             try:
                 if self.credentials_path and os.path.exists(self.credentials_path):
+                    from google.oauth2.service_account import Credentials  # type: ignore
                     credentials = Credentials.from_service_account_file(self.credentials_path)
-                    self._client = BetaAnalyticsDataClient(credentials=credentials)
+                    self._client = ga.BetaAnalyticsDataClient(credentials=credentials)
                 else:
                     # Fallback to default credentials
-                    self._client = BetaAnalyticsDataClient()
+                    self._client = ga.BetaAnalyticsDataClient()
             except Exception:
                 return None
                 
@@ -104,7 +89,7 @@ class GA4DataClient:
     
     def health_check(self) -> Dict[str, Any]:
         """Check GA4 Data API configuration and connectivity."""
-        if not GA4_DATA_API_AVAILABLE:
+        if not _ga4_data.installed():
             return {
                 "status": "library_not_available",
                 "reason": "google_analytics_data_library_not_installed",
@@ -130,6 +115,7 @@ class GA4DataClient:
             }
         
         client = self._get_client()
+        ga = _ga4_data.get()
         if not client:
             return {
                 "status": "misconfigured",
@@ -140,14 +126,15 @@ class GA4DataClient:
         
         # Test connectivity with a minimal request
         try:
-            request = RunReportRequest(
+            request = ga.RunReportRequest(
                 property=f"properties/{self.property_id}",
-                dimensions=[Dimension(name="date")],
-                metrics=[Metric(name="sessions")],
-                date_ranges=[DateRange(start_date="7daysAgo", end_date="yesterday")],
+                dimensions=[ga.Dimension(name="date")],
+                metrics=[ga.Metric(name="sessions")],
+                date_ranges=[ga.DateRange(start_date="7daysAgo", end_date="yesterday")],
                 limit=1,
             )
-            response = client.run_report(request=request)
+            with integration_call("ga4_data", "run_report"):
+                response = client.run_report(request=request)
             return {
                 "status": "configured",
                 "property_id": self.property_id,
@@ -169,24 +156,26 @@ class GA4DataClient:
     ) -> Dict[str, Any]:
         """Get sessions and users metrics from GA4."""
         client = self._get_client()
+        ga = _ga4_data.get()
         if not client or not self.property_id:
             return {"status": "skipped", "reason": "not_configured"}
         
         try:
-            request = RunReportRequest(
+            request = ga.RunReportRequest(
                 property=f"properties/{self.property_id}",
-                dimensions=[Dimension(name="date")],
+                dimensions=[ga.Dimension(name="date")],
                 metrics=[
-                    Metric(name="sessions"),
-                    Metric(name="totalUsers"),
-                    Metric(name="newUsers"),
-                    Metric(name="screenPageViews"),
+                    ga.Metric(name="sessions"),
+                    ga.Metric(name="totalUsers"),
+                    ga.Metric(name="newUsers"),
+                    ga.Metric(name="screenPageViews"),
                 ],
-                date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-                order_bys=[OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name="date"))],
+                date_ranges=[ga.DateRange(start_date=start_date, end_date=end_date)],
+                order_bys=[ga.OrderBy(dimension=ga.OrderBy.DimensionOrderBy(dimension_name="date"))],
             )
             
-            response = client.run_report(request=request)
+            with integration_call("ga4_data", "run_report"):
+                response = client.run_report(request=request)
             
             # Process response data
             daily_data = []
@@ -240,28 +229,30 @@ class GA4DataClient:
     ) -> Dict[str, Any]:
         """Get traffic sources data from GA4."""
         client = self._get_client()
+        ga = _ga4_data.get()
         if not client or not self.property_id:
             return {"status": "skipped", "reason": "not_configured"}
         
         try:
-            request = RunReportRequest(
+            request = ga.RunReportRequest(
                 property=f"properties/{self.property_id}",
                 dimensions=[
-                    Dimension(name="sessionSource"),
-                    Dimension(name="sessionMedium"),
-                    Dimension(name="sessionCampaignName"),
+                    ga.Dimension(name="sessionSource"),
+                    ga.Dimension(name="sessionMedium"),
+                    ga.Dimension(name="sessionCampaignName"),
                 ],
                 metrics=[
-                    Metric(name="sessions"),
-                    Metric(name="totalUsers"),
-                    Metric(name="conversions"),
+                    ga.Metric(name="sessions"),
+                    ga.Metric(name="totalUsers"),
+                    ga.Metric(name="conversions"),
                 ],
-                date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-                order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name="sessions"), desc=True)],
+                date_ranges=[ga.DateRange(start_date=start_date, end_date=end_date)],
+                order_bys=[ga.OrderBy(metric=ga.OrderBy.MetricOrderBy(metric_name="sessions"), desc=True)],
                 limit=limit,
             )
             
-            response = client.run_report(request=request)
+            with integration_call("ga4_data", "run_report"):
+                response = client.run_report(request=request)
             
             # Process response data
             sources_data = []
@@ -315,23 +306,25 @@ class GA4DataClient:
     ) -> Dict[str, Any]:
         """Get events data from GA4."""
         client = self._get_client()
+        ga = _ga4_data.get()
         if not client or not self.property_id:
             return {"status": "skipped", "reason": "not_configured"}
         
         try:
-            request = RunReportRequest(
+            request = ga.RunReportRequest(
                 property=f"properties/{self.property_id}",
-                dimensions=[Dimension(name="eventName")],
+                dimensions=[ga.Dimension(name="eventName")],
                 metrics=[
-                    Metric(name="eventCount"),
-                    Metric(name="eventCountPerUser"),
+                    ga.Metric(name="eventCount"),
+                    ga.Metric(name="eventCountPerUser"),
                 ],
-                date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-                order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name="eventCount"), desc=True)],
+                date_ranges=[ga.DateRange(start_date=start_date, end_date=end_date)],
+                order_bys=[ga.OrderBy(metric=ga.OrderBy.MetricOrderBy(metric_name="eventCount"), desc=True)],
                 limit=limit,
             )
             
-            response = client.run_report(request=request)
+            with integration_call("ga4_data", "run_report"):
+                response = client.run_report(request=request)
             
             # Process response data
             events_data = []
@@ -376,26 +369,28 @@ class GA4DataClient:
     ) -> Dict[str, Any]:
         """Get device and platform analytics from GA4."""
         client = self._get_client()
+        ga = _ga4_data.get()
         if not client or not self.property_id:
             return {"status": "skipped", "reason": "not_configured"}
         
         try:
-            request = RunReportRequest(
+            request = ga.RunReportRequest(
                 property=f"properties/{self.property_id}",
                 dimensions=[
-                    Dimension(name="deviceCategory"),
-                    Dimension(name="operatingSystem"),
+                    ga.Dimension(name="deviceCategory"),
+                    ga.Dimension(name="operatingSystem"),
                 ],
                 metrics=[
-                    Metric(name="sessions"),
-                    Metric(name="totalUsers"),
-                    Metric(name="screenPageViews"),
+                    ga.Metric(name="sessions"),
+                    ga.Metric(name="totalUsers"),
+                    ga.Metric(name="screenPageViews"),
                 ],
-                date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
-                order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name="sessions"), desc=True)],
+                date_ranges=[ga.DateRange(start_date=start_date, end_date=end_date)],
+                order_bys=[ga.OrderBy(metric=ga.OrderBy.MetricOrderBy(metric_name="sessions"), desc=True)],
             )
             
-            response = client.run_report(request=request)
+            with integration_call("ga4_data", "run_report"):
+                response = client.run_report(request=request)
             
             # Process response data
             devices_data = []
@@ -2,6 +2,7 @@ import hashlib
 import httpx
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.core.metrics import integration_call
 
 
 GA4_MEASUREMENT_ID = settings.GA4_MEASUREMENT_ID
@@ -96,12 +97,15 @@ async def forward_email_event_to_ga4(
         url = f"{GA4_ENDPOINT}?measurement_id={GA4_MEASUREMENT_ID}&api_secret={GA4_API_SECRET}"
         
         async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5.0
-            )
+            with integration_call("ga4", "collect") as call:
+                response = await client.post(
+                    url,
+                    json=payload,
+                    headers={"Content-Type": "application/json"},
+                    timeout=5.0
+                )
+                if response.status_code >= 400:
+                    call.failed()
         
         if response.status_code == 204:
             return {
@@ -3,6 +3,8 @@ from typing import Optional, Dict, Any
 
 import httpx
 
+from app.core.metrics import integration_call
+
 GA_ENDPOINT = "https://www.google-analytics.com/mp/collect"
 
 
@@ -38,12 +40,15 @@ def send_event(name: str, client_id: str, params: Optional[Dict[str, Any]] = Non
         ],
     }
     try:
-        r = httpx.post(
-            GA_ENDPOINT,
-            params={"measurement_id": measurement_id, "api_secret": api_secret},
-            json=payload,
-            timeout=5.0,
-        )
+        with integration_call("ga4", "collect") as call:
+            r = httpx.post(
+                GA_ENDPOINT,
+                params={"measurement_id": measurement_id, "api_secret": api_secret},
+                json=payload,
+                timeout=5.0,
+            )
+            if r.status_code >= 400:
+                call.failed()
         return {"status": "sent", "code": r.status_code}
     except Exception:
         return {"status": "skipped", "reason": "request_failed"}
@@ -4,6 +4,7 @@ import httpx
 from datetime import datetime
 
 from .ga4_mp import GA_ENDPOINT
+from app.core.metrics import integration_call
 
 SUPPORTED_PLATFORMS = {"android", "ios", "web"}
 
@@ -81,12 +82,15 @@ def send_platform_event(platform: str, name: str, client_id: Optional[str] = Non
     }
 
     try:
-        r = httpx.post(
-            GA_ENDPOINT,
-            params={"measurement_id": measurement_id, "api_secret": api_secret},
-            json=payload,
-            timeout=5.0,
-        )
+        with integration_call("ga4", "collect") as call:
+            r = httpx.post(
+                GA_ENDPOINT,
+                params={"measurement_id": measurement_id, "api_secret": api_secret},
+                json=payload,
+                timeout=5.0,
+            )
+            if r.status_code >= 400:
+                call.failed()
         return {"status": "sent" if r.status_code in (204, 200) else "queued", "code": r.status_code, "platform": cfg["platform"]}
     except Exception as e:
         return {"status": "skipped", "platform": cfg.get("platform", platform), "reason": "request_failed", "error": str(e)}
@@ -0,0 +1,429 @@
+"""
+Columnar in-memory snapshot of orders for analytics slicing.
+
+Keeps one NumPy array per column (epoch seconds, totals in minor units,
+categorical codes) so dashboard group-by/filter requests are answered with
+vectorized operations instead of row-by-row SQL or Python loops.
+The snapshot is refreshed incrementally by an id watermark (new orders) and an
+updated_at watermark (edits to already loaded orders). Ids and
+timestamps are taken before commit, so a transaction can commit after a refresh
+that already moved past its order: each refresh re-checks the last id_overlap ids
+below the id watermark for orders it has not loaded, and re-reads changes from
+updated_overlap seconds before the updated_at watermark.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app import models
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_DAY = 86400
+# above this many possible group combinations, aggregate over the occurring keys only
+_DENSE_GROUP_LIMIT = 1_000_000
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# categorical columns: snapshot column name -> Order attribute
+CATEGORICAL_COLUMNS = {
+    "fulfillment": "pickup_or_delivery",
+    "payment": "payment_method",
+    "status": "status",
+    "utm_source": "utm_source",
+}
+
+# calendar group keys, labelled the same way as the existing period endpoints
+_CALENDAR_LABELS = {
+    "day": lambda d: d.isoformat(),
+    "week": lambda d: f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}",
+    "month": lambda d: f"{d.year:04d}-{d.month:02d}",
+}
+
+# group keys understood by SnapshotView.group_by
+GROUP_KEYS = {"hour", "weekday", *_CALENDAR_LABELS.keys(), *CATEGORICAL_COLUMNS.keys()}
+
+
+def to_epoch(dt: Optional[datetime]) -> Optional[int]:
+    """convert a datetime to epoch seconds (naive values are treated as UTC)."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((dt - _EPOCH).total_seconds())
+
+
+class Categorical:
+    """append-only string dictionary mapping values to integer codes (int32: utm_source is
+    free-form client input, so its cardinality is unbounded)."""
+
+    def __init__(self, missing: str):
+        self.missing = missing
+        self.values: List[str] = [missing]
+        self._codes: Dict[str, int] = {missing: 0}
+
+    def encode(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        """return the code for a value or None if it never occurred."""
+        if not value:
+            return 0
+        return self._codes.get(value)
+
+
+@dataclass
+class _Columns:
+    """immutable set of column arrays; replaced wholesale on refresh."""
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    created: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    total: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    user_id: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    codes: Dict[str, np.ndarray] = field(
+        default_factory=lambda: {name: np.empty(0, dtype=np.int32) for name in CATEGORICAL_COLUMNS}
+    )
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+
+class SnapshotView:
+    """vectorized filter/group-by primitives over one consistent set of columns."""
+
+    def __init__(self, cols: _Columns, dictionaries: Dict[str, Categorical]):
+        self.cols = cols
+        self.dictionaries = dictionaries
+
+    def __len__(self) -> int:
+        return len(self.cols)
+
+    def mask(
+        self,
+        dt_from: Optional[datetime] = None,
+        dt_to: Optional[datetime] = None,
+        **equals: Optional[str],
+    ) -> np.ndarray:
+        """boolean row mask for a created_at range and categorical equality filters."""
+        cols = self.cols
+        m = np.ones(len(cols), dtype=bool)
+        lo, hi = to_epoch(dt_from), to_epoch(dt_to)
+        if lo is not None:
+            m &= cols.created >= lo
+        if hi is not None:
+            m &= cols.created <= hi
+        for name, value in equals.items():
+            if value is None:
+                continue
+            if name not in CATEGORICAL_COLUMNS:
+                raise ValueError(f"Unknown filter column: {name}")
+            code = self.dictionaries[name].lookup(value)
+            if code is None:
+                return np.zeros(len(cols), dtype=bool)
+            m &= cols.codes[name] == code
+        return m
+
+    def _key_codes(self, key: str) -> Tuple[np.ndarray, int, List]:
+        """return (codes, cardinality, labels) for a group key."""
+        cols = self.cols
+        if key == "hour":
+            return (cols.created // 3600) % 24, 24, list(range(24))
+        if key == "weekday":
+            # 1970-01-01 was a Thursday (weekday 3)
+            return (cols.created // _DAY + 3) % 7, 7, _WEEKDAYS
+        if key in _CALENDAR_LABELS:
+            # label each distinct day once, then map rows through the day index
+            uniq, inv = np.unique(cols.created // _DAY, return_inverse=True)
+            day_labels = [_CALENDAR_LABELS[key](date.fromordinal(int(d) + _EPOCH_ORDINAL)) for d in uniq]
+            labels = sorted(set(day_labels))
+            index = {label: i for i, label in enumerate(labels)}
+            day_to_label = np.array([index[label] for label in day_labels], dtype=np.int64)
+            return (day_to_label[inv] if len(inv) else inv.astype(np.int64)), len(labels), labels
+        if key in CATEGORICAL_COLUMNS:
+            values = list(self.dictionaries[key].values)
+            return cols.codes[key].astype(np.int64), len(values), values
+        raise ValueError(f"Unknown group key: {key}")
+
+    def group_by(self, keys: Sequence[str], mask: Optional[np.ndarray] = None) -> List[Dict]:
+        """order count and revenue aggregates grouped by one or more keys."""
+        cols = self.cols
+        if mask is None:
+            mask = np.ones(len(cols), dtype=bool)
+
+        combined = np.zeros(len(cols), dtype=np.int64)
+        cards: List[int] = []
+        labels: List[List] = []
+        for key in keys:
+            codes, card, key_labels = self._key_codes(key)
+            combined = combined * card + codes
+            cards.append(card)
+            labels.append(key_labels)
+
+        size = int(np.prod(cards)) if cards else 1
+        selected = combined[mask]
+        weights = cols.total[mask]
+        if size > _DENSE_GROUP_LIMIT:
+            # sparse key space (e.g. day x utm_source x hour): compact to the occurring keys first
+            flats, selected = np.unique(selected, return_inverse=True)
+            size = len(flats)
+        else:
+            flats = None
+        counts = np.bincount(selected, minlength=size)
+        revenue = np.bincount(selected, weights=weights, minlength=size)
+
+        groups = []
+        for idx in np.flatnonzero(counts):
+            # decode the mixed-radix group code back into one label per key
+            rest = int(flats[idx]) if flats is not None else int(idx)
+            decoded = []
+            for card, key_labels in zip(reversed(cards), reversed(labels)):
+                decoded.append(key_labels[rest % card])
+                rest //= card
+            row: Dict = dict(zip(keys, reversed(decoded)))
+            count = int(counts[idx])
+            rev = float(revenue[idx]) / 100
+            row.update({
+                "orders_count": count,
+                "revenue": round(rev, 2),
+                "avg_order_value": round(rev / count, 2) if count else 0.0,
+            })
+            groups.append(row)
+        return groups
+
+    def totals(self, mask: Optional[np.ndarray] = None) -> Dict:
+        """overall count/revenue/unique customers for a mask."""
+        cols = self.cols
+        if mask is None:
+            mask = np.ones(len(cols), dtype=bool)
+        count = int(mask.sum())
+        revenue = float(cols.total[mask].sum()) / 100
+        users = cols.user_id[mask]
+        return {
+            "orders_count": count,
+            "revenue": round(revenue, 2),
+            "avg_order_value": round(revenue / count, 2) if count else 0.0,
+            "unique_customers": int(np.unique(users[users >= 0]).shape[0]),
+        }
+
+
+class OrderSnapshot:
+    """columnar snapshot of the orders table with vectorized filter/group-by."""
+
+    def __init__(
+        self,
+        refresh_interval: float = 30.0,
+        rebuild_interval: float = 3600.0,
+        chunk_size: int = 10000,
+        id_overlap: int = 1000,
+        updated_overlap: float = 60.0,
+    ):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.chunk_size = chunk_size
+        self.id_overlap = id_overlap
+        self.updated_overlap = updated_overlap
+        self._refresh_lock = threading.Lock()
+        self._cols = _Columns()
+        # dictionaries are append-only and survive rebuilds, so codes held by readers stay valid
+        self.dictionaries: Dict[str, Categorical] = {
+            "fulfillment": Categorical("unknown"),
+            "payment": Categorical("unknown"),
+            "status": Categorical("unknown"),
+            "utm_source": Categorical("direct"),
+        }
+        self.max_id = 0
+        self.max_updated_at: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.built_at = 0.0
+
+    # ---- refresh ----
+
+    def _encode_rows(self, rows: Sequence[tuple]) -> _Columns:
+        n = len(rows)
+        ids = np.empty(n, dtype=np.int64)
+        created = np.empty(n, dtype=np.int64)
+        total = np.empty(n, dtype=np.int64)
+        user_id = np.empty(n, dtype=np.int64)
+        codes = {name: np.empty(n, dtype=np.int32) for name in CATEGORICAL_COLUMNS}
+        for i, row in enumerate(rows):
+            ids[i] = row.id
+            created[i] = to_epoch(row.created_at)
+            total[i] = int(round(float(row.total or 0) * 100))
+            user_id[i] = row.user_id if row.user_id is not None else -1
+            for name, attr in CATEGORICAL_COLUMNS.items():
+                codes[name][i] = self.dictionaries[name].encode(getattr(row, attr))
+        return _Columns(ids=ids, created=created, total=total, user_id=user_id, codes=codes)
+
+    def _select(self, db: Session):
+        # orders without created_at fall outside every date range, as in the SQL reports
+        return db.query(
+            models.Order.id,
+            models.Order.created_at,
+            models.Order.updated_at,
+            models.Order.total,
+            models.Order.user_id,
+            *(getattr(models.Order, attr) for attr in CATEGORICAL_COLUMNS.values()),
+        ).filter(models.Order.created_at.is_not(None))
+
+    @staticmethod
+    def _latest_update(rows: Iterable[tuple], current: Optional[datetime]) -> Optional[datetime]:
+        for row in rows:
+            if row.updated_at and (current is None or row.updated_at > current):
+                current = row.updated_at
+        return current
+
+    def refresh(self, db: Session, full: bool = False, max_age: Optional[float] = None) -> int:
+        """pull new and changed orders into the snapshot. Returns number of rows touched.
+
+        With max_age, an incremental refresh is skipped when another caller refreshed
+        within max_age seconds while this one waited for the lock.
+        """
+        with self._refresh_lock:
+            now = time.monotonic()
+            if not full and max_age is not None and self.refreshed_at and now - self.refreshed_at <= max_age:
+                return 0
+            rebuild = full or not self.built_at or now - self.built_at > self.rebuild_interval
+            # work on locals and publish at the end, so a failed refresh leaves the old state intact
+            # and readers keep using the previous columns until the swap below
+            if rebuild:
+                # periodic rebuild also drops orders that were deleted since the last build
+                cols, max_id, max_updated_at = _Columns(), 0, None
+            else:
+                cols, max_id, max_updated_at = self._cols, self.max_id, self.max_updated_at
+            touched = 0
+
+            # orders below the id watermark that committed after the last refresh
+            late = []
+            if len(cols):
+                low = max(0, max_id - self.id_overlap)
+                loaded = cols.ids[np.searchsorted(cols.ids, low, side="right"):]
+                late = (
+                    self._select(db)
+                    .filter(models.Order.id > low, models.Order.id <= max_id, models.Order.id.not_in(loaded.tolist()))
+                    .order_by(models.Order.id.asc())
+                    .all()
+                )
+
+            # changed rows below the watermark: patch every column on a copy
+            if max_updated_at is not None and len(cols):
+                since = max_updated_at - timedelta(seconds=self.updated_overlap)
+                changed = (
+                    self._select(db)
+                    .filter(models.Order.id <= max_id, models.Order.updated_at > since)
+                    .all()
+                )
+                if changed:
+                    patched = self._encode_rows(changed)
+                    pos = np.searchsorted(cols.ids, patched.ids)
+                    found = (pos < len(cols)) & (cols.ids[np.minimum(pos, len(cols) - 1)] == patched.ids)
+                    at = pos[found]
+                    created, total, user_id = cols.created.copy(), cols.total.copy(), cols.user_id.copy()
+                    created[at] = patched.created[found]
+                    total[at] = patched.total[found]
+                    user_id[at] = patched.user_id[found]
+                    codes = {name: arr.copy() for name, arr in cols.codes.items()}
+                    for name in codes:
+                        codes[name][at] = patched.codes[name][found]
+                    cols = _Columns(ids=cols.ids, created=created, total=total, user_id=user_id, codes=codes)
+                    max_updated_at = self._latest_update(changed, max_updated_at)
+                    touched += len(changed)
+
+            # new rows above the id watermark, fetched in chunks
+            parts = [cols]
+            if late:
+                parts.append(self._encode_rows(late))
+                max_updated_at = self._latest_update(late, max_updated_at)
+                touched += len(late)
+            while True:
+                rows = (
+                    self._select(db)
+                    .filter(models.Order.id > max_id)
+                    .order_by(models.Order.id.asc())
+                    .limit(self.chunk_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                parts.append(self._encode_rows(rows))
+                max_id = rows[-1].id
+                max_updated_at = self._latest_update(rows, max_updated_at)
+                touched += len(rows)
+                if len(rows) < self.chunk_size:
+                    break
+
+            if len(parts) > 1:
+                cols = _Columns(
+                    ids=np.concatenate([p.ids for p in parts]),
+                    created=np.concatenate([p.created for p in parts]),
+                    total=np.concatenate([p.total for p in parts]),
+                    user_id=np.concatenate([p.user_id for p in parts]),
+                    codes={name: np.concatenate([p.codes[name] for p in parts]) for name in CATEGORICAL_COLUMNS},
+                )
+                if late:
+                    # late orders sit below the watermark: restore id order for searchsorted
+                    order = np.argsort(cols.ids, kind="stable")
+                    cols = _Columns(
+                        ids=cols.ids[order],
+                        created=cols.created[order],
+                        total=cols.total[order],
+                        user_id=cols.user_id[order],
+                        codes={name: arr[order] for name, arr in cols.codes.items()},
+                    )
+
+            # single reference swap so concurrent readers always see a consistent set of columns
+            self._cols = cols
+            self.max_id, self.max_updated_at = max_id, max_updated_at
+            if rebuild:
+                self.built_at = now
+            self.refreshed_at = time.monotonic()
+            if touched:
+                logger.info(f"Order snapshot refreshed: {touched} rows, {len(cols)} total")
+            return touched
+
+    def ensure_fresh(self, db: Session) -> "OrderSnapshot":
+        """refresh when the snapshot is older than refresh_interval."""
+        if time.monotonic() - self.refreshed_at > self.refresh_interval:
+            # requests queued behind a refresh skip their own once it has run
+            self.refresh(db, max_age=self.refresh_interval)
+        return self
+
+    def mark_stale(self) -> None:
+        """force the next ensure_fresh() to run an incremental refresh."""
+        self.refreshed_at = 0.0
+
+    def view(self) -> "SnapshotView":
+        """consistent read-only view over the current columns."""
+        return SnapshotView(self._cols, self.dictionaries)
+
+    def stats(self) -> Dict:
+        cols = self._cols
+        nbytes = cols.ids.nbytes + cols.created.nbytes + cols.total.nbytes + cols.user_id.nbytes
+        nbytes += sum(arr.nbytes for arr in cols.codes.values())
+        return {
+            "rows": len(cols),
+            "max_id": self.max_id,
+            "bytes": int(nbytes),
+            "age_seconds": round(time.monotonic() - self.refreshed_at, 1) if self.refreshed_at else None,
+            "cardinality": {name: len(d.values) for name, d in self.dictionaries.items()},
+        }
+
+
+# global instance
+order_snapshot = OrderSnapshot(
+    refresh_interval=settings.ANALYTICS_SNAPSHOT_REFRESH_SEC,
+    rebuild_interval=settings.ANALYTICS_SNAPSHOT_REBUILD_SEC,
+)
@@ -0,0 +1,284 @@
+"""
+Mergeable per-day user sketches for range analytics.
+
+Every complete UTC day of orders is rolled up once into `order_daily_stats`:
+- a HyperLogLog sketch of the distinct user ids (for active users),
+- the exact sorted user ids with their order counts (for repeat customers).
+
+Arbitrary ranges are answered by merging the stored days and adding the partial
+edge days (and today) from a small live query. Distinct counts from HyperLogLog
+have a relative standard error of 1.04 / sqrt(2 ** HLL_PRECISION) (~0.81% at p=14,
+so ~98% of estimates are within 2.5%). Repeat-customer stats are exact except for
+orders deleted after their day was rolled up; pass exact=True to endpoints to
+bypass sketches entirely for audits.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db.session import session_scope
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_STANDARD_ERROR = 1.04 / (HLL_REGISTERS ** 0.5)
+
+_U64 = np.uint64
+
+
+def _hash64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: well-mixed 64-bit hashes for integer ids."""
+    with np.errstate(over="ignore"):
+        x = values.astype(np.uint64) + _U64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> _U64(30))) * _U64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> _U64(27))) * _U64(0x94D049BB133111EB)
+        return x ^ (x >> _U64(31))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """exact vectorized bit length of uint64 values."""
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (_U64(1) << _U64(shift))
+        n += big * shift
+        x = np.where(big, x >> _U64(shift), x)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """HyperLogLog cardinality sketch with 64-bit hashes (no large-range correction needed)."""
+
+    def __init__(self, registers: Optional[np.ndarray] = None):
+        self.registers = registers if registers is not None else np.zeros(HLL_REGISTERS, dtype=np.uint8)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(np.frombuffer(data, dtype=np.uint8).copy())
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    def add_many(self, ids: np.ndarray) -> "HyperLogLog":
+        if len(ids) == 0:
+            return self
+        h = _hash64(np.asarray(ids))
+        index = (h >> _U64(64 - HLL_PRECISION)).astype(np.int64)
+        rest = h & _U64((1 << (64 - HLL_PRECISION)) - 1)
+        # rank = position of the leftmost 1-bit in the remaining 64-p bits
+        rank = ((64 - HLL_PRECISION) - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = HLL_REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # small-range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+@dataclass
+class DaySketch:
+    """one day's rollup as loaded into memory."""
+    orders_count: int
+    hll: HyperLogLog
+    user_ids: np.ndarray  # sorted int64
+    user_counts: np.ndarray  # int32, aligned with user_ids
+
+
+@dataclass
+class RangeSketch:
+    """merged sketches for a date range."""
+    orders_count: int
+    hll: HyperLogLog
+    user_ids: np.ndarray
+    user_counts: np.ndarray
+
+    def distinct_users(self) -> int:
+        return self.hll.count()
+
+
+def _merge_user_counts(parts: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    parts = [p for p in parts if len(p[0])]
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    ids = np.concatenate([p[0] for p in parts])
+    counts = np.concatenate([p[1] for p in parts])
+    uniq, inv = np.unique(ids, return_inverse=True)
+    merged = np.bincount(inv, weights=counts, minlength=len(uniq)).astype(np.int32)
+    return uniq, merged
+
+
+def _day_start(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """order timestamps are naive UTC; convert aware inputs to match."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class DailyUserSketches:
+    """reads, lazily builds and merges per-day user sketches from order_daily_stats."""
+
+    def __init__(self, max_cached_days: int = 800):
+        self.max_cached_days = max_cached_days
+        self._lock = threading.Lock()
+        self._days: "OrderedDict[date, DaySketch]" = OrderedDict()
+
+    # ---- live queries ----
+
+    def _live_counts(self, db: Session, *conditions) -> Tuple[int, float, np.ndarray, np.ndarray]:
+        """(orders, revenue, user_ids, counts) for orders matching conditions, straight from the DB."""
+        rows = (
+            db.query(models.Order.user_id, func.count(models.Order.id), func.coalesce(func.sum(models.Order.total), 0))
+            .filter(*conditions)
+            .group_by(models.Order.user_id)
+            .all()
+        )
+        orders = sum(int(c) for _, c, _ in rows)
+        revenue = sum(float(r or 0) for _, _, r in rows)
+        users = sorted((int(uid), int(c)) for uid, c, _ in rows if uid is not None)
+        ids = np.array([u for u, _ in users], dtype=np.int64)
+        counts = np.array([c for _, c in users], dtype=np.int32)
+        return orders, revenue, ids, counts
+
+    # ---- day storage ----
+
+    def _build_day(self, db: Session, day: date) -> Tuple[DaySketch, Any]:
+        start = _day_start(day)
+        orders, revenue, ids, counts = self._live_counts(
+            db, models.Order.created_at >= start, models.Order.created_at < start + timedelta(days=1)
+        )
+        hll = HyperLogLog().add_many(ids)
+        stmt = pg_insert(models.OrderDailyStats).values(
+            day=day,
+            orders_count=orders,
+            revenue=round(revenue, 2),
+            distinct_users=len(ids),
+            hll=hll.to_bytes(),
+            user_ids=ids.tobytes(),
+            user_order_counts=counts.tobytes(),
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        ).on_conflict_do_nothing(index_elements=["day"])
+        return DaySketch(orders, hll, ids, counts), stmt
+
+    def _load_days(self, db: Session, days: List[date]) -> Dict[date, DaySketch]:
+        result: Dict[date, DaySketch] = {}
+        with self._lock:
+            for d in days:
+                sketch = self._days.get(d)
+                if sketch is not None:
+                    self._days.move_to_end(d)
+                    result[d] = sketch
+        missing = [d for d in days if d not in result]
+        if not missing:
+            return result
+
+        rows = db.query(models.OrderDailyStats).filter(models.OrderDailyStats.day.in_(missing)).all()
+        for row in rows:
+            result[row.day] = DaySketch(
+                row.orders_count,
+                HyperLogLog.from_bytes(row.hll),
+                np.frombuffer(row.user_ids, dtype=np.int64).copy(),
+                np.frombuffer(row.user_order_counts, dtype=np.int32).copy(),
+            )
+        built = [d for d in missing if d not in result]
+        if built:
+            # db may be a lagging read replica; rollups are stored for good, so they
+            # are computed and written on the primary
+            with session_scope() as primary:
+                for d in built:
+                    result[d], stmt = self._build_day(primary, d)
+                    primary.execute(stmt)
+            logger.info(f"Rolled up {len(built)} day(s) into order_daily_stats")
+
+        with self._lock:
+            for d in missing:
+                self._days[d] = result[d]
+            while len(self._days) > self.max_cached_days:
+                self._days.popitem(last=False)
+        return result
+
+    def forget(self, start: Optional[date] = None, end: Optional[date] = None) -> None:
+        """drop cached days in [start, end] so they are re-read from the table."""
+        with self._lock:
+            for d in list(self._days):
+                if (start is None or d >= start) and (end is None or d <= end):
+                    del self._days[d]
+
+    # ---- range queries ----
+
+    def range(self, db: Session, dt_from: Optional[datetime], dt_to: Optional[datetime]) -> RangeSketch:
+        """merged sketch for created_at in [dt_from, dt_to] (open ends allowed)."""
+        created = models.Order.created_at
+        now = datetime.utcnow()
+        today = now.date()
+        dt_from, dt_to = _naive_utc(dt_from), _naive_utc(dt_to)
+
+        if dt_from is None:
+            first = db.query(func.min(created)).scalar()
+            if first is None:
+                return RangeSketch(0, HyperLogLog(), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32))
+            dt_from = _day_start(first.date())
+        upper = min(dt_to, now) if dt_to is not None else now
+
+        # complete days fully inside the range and before today come from the rollup
+        first_full = dt_from.date() if dt_from == _day_start(dt_from.date()) else dt_from.date() + timedelta(days=1)
+        end_exclusive = upper + timedelta(microseconds=1)
+        last_full = min((end_exclusive - timedelta(days=1)).date(), today - timedelta(days=1))
+        days = []
+        d = first_full
+        while d <= last_full:
+            days.append(d)
+            d += timedelta(days=1)
+
+        parts: List[Tuple[np.ndarray, np.ndarray]] = []
+        hll = HyperLogLog()
+        orders = 0
+        for sketch in self._load_days(db, days).values():
+            orders += sketch.orders_count
+            hll.merge(sketch.hll)
+            parts.append((sketch.user_ids, sketch.user_counts))
+
+        # partial edges (and today) are small enough to query live
+        if days:
+            edges = [(dt_from, _day_start(days[0]), False), (_day_start(days[-1]) + timedelta(days=1), upper, True)]
+        else:
+            edges = [(dt_from, upper, True)]
+        for lo, hi, inclusive in edges:
+            if lo > hi or (lo == hi and not inclusive):
+                continue
+            conds = [created >= lo, created <= hi if inclusive else created < hi]
+            edge_orders, _, ids, counts = self._live_counts(db, *conds)
+            orders += edge_orders
+            hll.add_many(ids)
+            parts.append((ids, counts))
+
+        ids, counts = _merge_user_counts(parts)
+        return RangeSketch(orders, hll, ids, counts)
+
+
+# global instance
+daily_user_sketches = DailyUserSketches()
@@ -0,0 +1,19 @@
+"""
+Caching services package.
+
+This package contains in-process caches used to keep hot read paths off the database:
+- TTL result cache with single-flight coalescing for analytics endpoints
+- Write-based invalidation driven by SQLAlchemy session events
+"""
+
+from .result_cache import (
+    ResultCache,
+    analytics_cache,
+    cached_result,
+)
+
+__all__ = [
+    'ResultCache',
+    'analytics_cache',
+    'cached_result',
+]
@@ -0,0 +1,199 @@
+"""
+TTL result cache for analytics endpoints.
+
+Results are keyed by endpoint name and normalized query parameters and kept for a short TTL.
+Concurrent identical requests are coalesced into a single computation (single-flight),
+and any committed write touching orders invalidates the cache of the current worker.
+Other uvicorn workers keep their entries until the TTL expires.
+
+With read replicas, a result computed right after an invalidation may come from a
+replica that has not replayed the write yet; for DB_READ_STICKY_SEC (the window
+the read router already assumes replicas need to catch up) such results are served
+but not stored.
+"""
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.session import AppSession
+from app import models
+from app.services.analytics.order_snapshot import order_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+
+
+@dataclass
+class _Flight:
+    """an in-progress computation that followers wait on."""
+    generation: int
+    started_at: float
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """thread-safe TTL + LRU cache with single-flight computation and generation-based invalidation."""
+
+    def __init__(self, ttl: float = 15.0, max_entries: int = 256, settle: float = 0.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.settle = settle  # seconds after an invalidation whose results are not cached
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """return a cached value for key, computing it at most once across concurrent callers."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(generation=self._generation, started_at=now)
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # skip storing results computed across an invalidation, or so soon after one
+                # that a lagging replica may have served them; they may predate the write
+                if (
+                    flight.error is None
+                    and flight.generation == self._generation
+                    and flight.started_at >= self._invalidated_at + self.settle
+                ):
+                    self._entries[key] = _Entry(flight.value, time.monotonic() + self.ttl)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self) -> None:
+        """drop all entries and make in-flight computations non-cacheable."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+            }
+
+
+def _normalize(value: Any) -> Hashable:
+    """normalize a query param so equivalent requests share a cache key."""
+    if isinstance(value, str):
+        stripped = value.strip()
+        try:
+            return datetime.fromisoformat(stripped.replace("Z", "+00:00")).isoformat()
+        except ValueError:
+            return stripped.lower()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def cached_result(name: str, params: Sequence[str] = (), cache: Optional[ResultCache] = None):
+    """cache a sync endpoint's return value by endpoint name and the given query params.
+
+    Dependency-injected arguments (db, current user) are intentionally left out of the key,
+    so only use this on endpoints whose result doesn't depend on who is asking.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = cache or analytics_cache
+            key: Tuple = (name, tuple((p, _normalize(kwargs.get(p))) for p in params))
+            return target.get_or_compute(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# global instance
+analytics_cache = ResultCache(
+    ttl=settings.ANALYTICS_CACHE_TTL_SEC,
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    settle=settings.DB_READ_STICKY_SEC if settings.DB_REPLICA_URLS else 0.0,
+)
+
+
+# ---- write invalidation ----
+
+_ORDER_MODELS = (models.Order, models.OrderItem, models.OrderItemModification)
+_WRITE_FLAG = "orders_written"
+
+
+@event.listens_for(AppSession, "after_flush")
+def _track_order_writes(session, flush_context) -> None:
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, _ORDER_MODELS):
+            session.info[_WRITE_FLAG] = True
+            return
+
+
+@event.listens_for(AppSession, "after_commit")
+def _invalidate_on_order_commit(session) -> None:
+    if session.info.pop(_WRITE_FLAG, False):
+        logger.debug("Order write committed, invalidating analytics cache")
+        analytics_cache.invalidate()
+        # let the next analytics read pull the new rows into the order snapshot right away
+        order_snapshot.mark_stale()
+
+
+@event.listens_for(AppSession, "after_rollback")
+def _clear_order_write_flag(session) -> None:
+    session.info.pop(_WRITE_FLAG, None)
@@ -1,12 +1,20 @@
 import os
 import hashlib
-from typing import Dict, Optional, Any
+import string
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qs
 
-try:
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
+
+
+def _load_resend():
     import resend  # type: ignore
-except Exception:  # pragma: no cover
-    resend = None  # graceful fallback when dependency not installed yet
+    return resend
+
+
+_resend = integrations.register("resend", "resend", _load_resend)
 
 FROM_EMAIL = os.getenv("FROM_EMAIL", "notify@example.com")
 FROM_NAME = os.getenv("FROM_NAME", "MyApp")
@@ -42,11 +50,123 @@ TEMPLATES = {
 }
 
 
+# localized subject lines, formatted with the template variables
+SUBJECTS = {
+    "verify_email": {
+        "en": "Verify your email address",
+        "ru": "Подтвердите ваш email адрес",
+        "kz": "Электрондық поштаңызды растаңыз"
+    },
+    "order_created": {
+        "en": "Order #{order_id} created",
+        "ru": "Заказ №{order_id} создан",
+        "kz": "Тапсырыс №{order_id} жасалды"
+    },
+    "order_status": {
+        "en": "Order #{order_id} status update",
+        "ru": "Обновление статуса заказа №{order_id}",
+        "kz": "Тапсырыс №{order_id} мәртебесі жаңартылды"
+    },
+    "order_delivered": {
+        "en": "Order #{order_id} delivered",
+        "ru": "Заказ №{order_id} доставлен",
+        "kz": "Тапсырыс №{order_id} жеткізілді"
+    },
+    "password_reset": {
+        "en": "Reset your password",
+        "ru": "Сброс пароля",
+        "kz": "Құпия сөзді қалпына келтіру"
+    }
+}
+
+# localized text blocks of the HTML layouts
+TEXTS = {
+    "hello": {"en": "Hello", "ru": "Привет", "kz": "Сәлем"},
+    "verify_email_desc": {"en": "Please verify your email address to complete your account setup.", "ru": "Пожалуйста, подтвердите свой email для завершения настройки аккаунта.", "kz": "Тіркелгіні орнатуды аяқтау үшін электрондық поштаңызды растаңыз."},
+    "verification_code": {"en": "Your verification code", "ru": "Ваш код подтверждения", "kz": "Сіздің растау кодыңыз"},
+    "verify_email_btn": {"en": "Verify Email", "ru": "Подтвердить Email", "kz": "Email растау"},
+    "button_not_work": {"en": "If the button doesn't work, copy and paste this link", "ru": "Если кнопка не работает, скопируйте и вставьте эту ссылку", "kz": "Егер түйме жұмыс істемесе, осы сілтемені көшіріп жапсырыңыз"},
+    "order_confirmed": {"en": "Order #{order_id} Confirmed!", "ru": "Заказ №{order_id} подтвержден!", "kz": "Тапсырыс №{order_id} расталды!"},
+    "thank_you_order": {"en": "Thank you for your order. We're preparing it now.", "ru": "Спасибо за ваш заказ. Мы готовим его сейчас.", "kz": "Тапсырысыңыз үшін рахмет. Біз оны дайындап жатырмыз."},
+    "type": {"en": "Type", "ru": "Тип", "kz": "Түрі"},
+    "estimated_time": {"en": "Estimated time", "ru": "Предполагаемое время", "kz": "Болжалды уақыт"},
+    "view_order": {"en": "View Order", "ru": "Посмотреть заказ", "kz": "Тапсырысты көру"},
+    "pickup": {"en": "Pickup", "ru": "Самовывоз", "kz": "Өзіңіз алу"},
+    "delivery": {"en": "Delivery", "ru": "Доставка", "kz": "Жеткізу"},
+    "order_update": {"en": "Order #{order_id} Update", "ru": "Обновление заказа №{order_id}", "kz": "Тапсырыс №{order_id} жаңартылуы"},
+    "status_updated": {"en": "Your order status has been updated to", "ru": "Статус вашего заказа обновлен до", "kz": "Тапсырысыңыздың мәртебесі жаңартылды"},
+    "order_delivered_msg": {"en": "Order #{order_id} Delivered!", "ru": "Заказ №{order_id} доставлен!", "kz": "Тапсырыс №{order_id} жеткізілді!"},
+    "delivered_thanks": {"en": "Your order has been successfully delivered. Thank you for choosing us!", "ru": "Ваш заказ успешно доставлен. Спасибо, что выбрали нас!", "kz": "Тапсырысыңыз сәтті жеткізілді. Бізді таңдағаныңыз үшін рахмет!"},
+    "rate_experience": {"en": "How was your experience?", "ru": "Как вам понравился наш сервис?", "kz": "Біздің қызмет қалай ұнады?"},
+    "rate_order": {"en": "Rate Your Order", "ru": "Оценить заказ", "kz": "Тапсырысты бағалау"},
+    "password_reset_msg": {"en": "Password Reset Request", "ru": "Запрос на сброс пароля", "kz": "Құпия сөзді қалпына келтіру сұрауы"},
+    "reset_desc": {"en": "You requested to reset your password. Click the button below to create a new password:", "ru": "Вы запросили сброс пароля. Нажмите кнопку ниже, чтобы создать новый пароль:", "kz": "Сіз құпия сөзді қалпына келтіруді сұрадыңыз. Жаңа құпия сөз жасау үшін төмендегі түймені басыңыз:"},
+    "reset_password": {"en": "Reset Password", "ru": "Сбросить пароль", "kz": "Құпия сөзді қалпына келтіру"},
+    "ignore_if_not_requested": {"en": "If you didn't request this, please ignore this email.", "ru": "Если вы не запрашивали это, пожалуйста, проигнорируйте это письмо.", "kz": "Егер сіз мұны сұрамаған болсаңыз, бұл хатты елемеңіз."}
+}
+
+# HTML layouts: {text.<key>} is resolved when a (template, locale) pair is compiled,
+# the other {fields} come from the template's field function on every render
+LAYOUTS = {
+    "verify_email": """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2>{text.hello} {user_name}!</h2>
+            <p>{text.verify_email_desc}</p>
+            {otp_block}
+            <p><a href="{verify_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{text.verify_email_btn}</a></p>
+            <p>{text.button_not_work}: <a href="{verify_url}">{verify_url}</a></p>
+        </div>
+        """,
+    "order_created": """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2>{text.order_confirmed}</h2>
+            <p>{text.thank_you_order}</p>
+            <p><strong>{text.type}:</strong> {delivery_type}</p>
+            <p><strong>{text.estimated_time}:</strong> {eta}</p>
+            <p><a href="{order_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{text.view_order}</a></p>
+        </div>
+        """,
+    "order_status": """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2>{text.order_update}</h2>
+            <p>{text.status_updated}: <strong>{status}</strong></p>
+            <p><strong>{text.estimated_time}:</strong> {eta}</p>
+        </div>
+        """,
+    "order_delivered": """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2>{text.order_delivered_msg}</h2>
+            <p>{text.delivered_thanks}</p>
+            <p>{text.rate_experience}</p>
+            <p><a href="{rating_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{text.rate_order}</a></p>
+        </div>
+        """,
+    "password_reset": """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2>{text.password_reset_msg}</h2>
+            <p>{text.reset_desc}</p>
+            <p><a href="{reset_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{text.reset_password}</a></p>
+            <p>{text.ignore_if_not_requested}</p>
+            <p>{text.button_not_work}: <a href="{reset_url}">{reset_url}</a></p>
+        </div>
+        """,
+}
+
+
+@lru_cache(maxsize=64)
+def _utm_query(template: str) -> str:
+    return urlencode({"utm_source": "email", "utm_medium": "transactional", "utm_campaign": template})
+
+
+@lru_cache(maxsize=4096)
 def add_utm_parameters(url: str, template: str) -> str:
-    """add UTM parameters to a URL for email tracking."""
+    """add UTM parameters to a URL for email tracking (memoized: campaigns repeat the same links)."""
     if not url or not url.startswith(('http://', 'https://')):
         return url
-    
+    if "?" not in url and "#" not in url:
+        # the common case (a plain page link): append the per-template query as is
+        return f"{url}?{_utm_query(template)}"
+
     parsed = urlparse(url)
     query_params = parse_qs(parsed.query)
     
@@ -65,38 +185,9 @@ def select_subject(template: str, variables: Dict[str, Any], locale: str = "en")
     if template not in TEMPLATES:
         return f"Notification from {FROM_NAME}"
     
-    # locale-specific subjects
-    subjects = {
-        "verify_email": {
-            "en": "Verify your email address",
-            "ru": "Подтвердите ваш email адрес",
-            "kz": "Электрондық поштаңызды растаңыз"
-        },
-        "order_created": {
-            "en": "Order #{order_id} created",
-            "ru": "Заказ №{order_id} создан",
-            "kz": "Тапсырыс №{order_id} жасалды"
-        },
-        "order_status": {
-            "en": "Order #{order_id} status update", 
-            "ru": "Обновление статуса заказа №{order_id}",
-            "kz": "Тапсырыс №{order_id} мәртебесі жаңартылды"
-        },
-        "order_delivered": {
-            "en": "Order #{order_id} delivered",
-            "ru": "Заказ №{order_id} доставлен",
-            "kz": "Тапсырыс №{order_id} жеткізілді"
-        },
-        "password_reset": {
-            "en": "Reset your password",
-            "ru": "Сброс пароля",
-            "kz": "Құпия сөзді қалпына келтіру"
-        }
-    }
-    
     # get localized subject or fallback to English or default template
-    if template in subjects:
-        subject_template = subjects[template].get(locale, subjects[template].get("en", TEMPLATES[template]["subject"]))
+    if template in SUBJECTS:
+        subject_template = SUBJECTS[template].get(locale, SUBJECTS[template].get("en", TEMPLATES[template]["subject"]))
     else:
         subject_template = TEMPLATES[template]["subject"]
     
@@ -107,118 +198,148 @@ def select_subject(template: str, variables: Dict[str, Any], locale: str = "en")
         return subject_template
 
 
+def _text(key: str, locale: str) -> str:
+    return TEXTS.get(key, {}).get(locale, TEXTS.get(key, {}).get("en", ""))
+
+
+def _url(variables: Dict[str, Any], key: str, template: str) -> Any:
+    value = variables.get(key, "#")
+    return add_utm_parameters(value, template) if isinstance(value, str) else value
+
+
+def _verify_email_fields(variables: Dict[str, Any], locale: str) -> Dict[str, Any]:
+    otp = variables.get("otp", "")
+    return {
+        "user_name": variables.get("user_name", "User"),
+        "verify_url": _url(variables, "verify_url", "verify_email"),
+        "otp_block": f'<p>{_text("verification_code", locale)}: <strong>{otp}</strong></p>' if otp else '',
+    }
+
+
+def _order_created_fields(variables: Dict[str, Any], locale: str) -> Dict[str, Any]:
+    pickup_or_delivery = variables.get("pickup_or_delivery", "pickup")
+    return {
+        "order_id": variables.get("order_id", ""),
+        "order_url": _url(variables, "order_url", "order_created"),
+        "delivery_type": _text("pickup" if pickup_or_delivery.lower() == "pickup" else "delivery", locale),
+        "eta": variables.get("eta", ""),
+    }
+
+
+def _order_status_fields(variables: Dict[str, Any], locale: str) -> Dict[str, Any]:
+    return {
+        "order_id": variables.get("order_id", ""),
+        "status": variables.get("status", "").title(),
+        "eta": variables.get("eta", ""),
+    }
+
+
+def _order_delivered_fields(variables: Dict[str, Any], locale: str) -> Dict[str, Any]:
+    return {
+        "order_id": variables.get("order_id", ""),
+        "rating_url": _url(variables, "rating_url", "order_delivered"),
+    }
+
+
+def _password_reset_fields(variables: Dict[str, Any], locale: str) -> Dict[str, Any]:
+    return {"reset_url": _url(variables, "reset_url", "password_reset")}
+
+
+# template -> function computing the layout's fields from the send_email variables
+FIELDS: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    "verify_email": _verify_email_fields,
+    "order_created": _order_created_fields,
+    "order_status": _order_status_fields,
+    "order_delivered": _order_delivered_fields,
+    "password_reset": _password_reset_fields,
+}
+
+_formatter = string.Formatter()
+
+
+class CompiledTemplate:
+    """a layout with its localized text resolved: the static HTML is pre-joined into
+    runs between the fields, so a render is one fields call and one join."""
+
+    def __init__(self, template: str, locale: str):
+        self.template = template
+        self.locale = locale
+        self._fields = FIELDS[template]
+        self._parts: List[str] = []
+        self._slots: List[Tuple[int, str]] = []
+        self._add(LAYOUTS[template])
+
+    def _add(self, source: str) -> None:
+        for literal, field_name, _, _ in _formatter.parse(source):
+            if literal:
+                if self._parts and (not self._slots or self._slots[-1][0] != len(self._parts) - 1):
+                    self._parts[-1] += literal
+                else:
+                    self._parts.append(literal)
+            if field_name is None:
+                continue
+            if field_name.startswith("text."):
+                # localized text may hold fields of its own ("Order #{order_id} Confirmed!")
+                self._add(_text(field_name[len("text."):], self.locale))
+            else:
+                self._slots.append((len(self._parts), field_name))
+                self._parts.append("")
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        values = self._fields(variables, self.locale)
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            parts[index] = str(values[name])
+        return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str, locale: str) -> CompiledTemplate:
+    """compile a template for a locale once; raises KeyError for an unknown template."""
+    return CompiledTemplate(template, locale)
+
+
 def render_template(template: str, variables: Dict[str, Any], locale: str = "en") -> str:
     """render HTML template with variables, UTM parameters, and locale support."""
-    # add UTM params to all URLs in variables
-    enhanced_vars = variables.copy()
-    for key, value in variables.items():
-        if isinstance(value, str) and key.endswith('_url'):
-            enhanced_vars[key] = add_utm_parameters(value, template)
+    if template not in LAYOUTS:
+        return "<p>Email notification</p>"
+    return compile_template(template, locale).render(variables)
+
+
+def build_email(
+    template: str,
+    to: str,
+    variables: Dict[str, Any],
+    user_id: Optional[int] = None,
+    locale: str = "en"
+) -> Dict[str, Any]:
+    """
+    Validate and render a template email without sending it.
     
-    # helper function to get localized text
-    def get_text(key: str) -> str:
-        texts = {
-            "hello": {"en": "Hello", "ru": "Привет", "kz": "Сәлем"},
-            "verify_email_desc": {"en": "Please verify your email address to complete your account setup.", "ru": "Пожалуйста, подтвердите свой email для завершения настройки аккаунта.", "kz": "Тіркелгіні орнатуды аяқтау үшін электрондық поштаңызды растаңыз."},
-            "verification_code": {"en": "Your verification code", "ru": "Ваш код подтверждения", "kz": "Сіздің растау кодыңыз"},
-            "verify_email_btn": {"en": "Verify Email", "ru": "Подтвердить Email", "kz": "Email растау"},
-            "button_not_work": {"en": "If the button doesn't work, copy and paste this link", "ru": "Если кнопка не работает, скопируйте и вставьте эту ссылку", "kz": "Егер түйме жұмыс істемесе, осы сілтемені көшіріп жапсырыңыз"},
-            "order_confirmed": {"en": "Order #{order_id} Confirmed!", "ru": "Заказ №{order_id} подтвержден!", "kz": "Тапсырыс №{order_id} расталды!"},
-            "thank_you_order": {"en": "Thank you for your order. We're preparing it now.", "ru": "Спасибо за ваш заказ. Мы готовим его сейчас.", "kz": "Тапсырысыңыз үшін рахмет. Біз оны дайындап жатырмыз."},
-            "type": {"en": "Type", "ru": "Тип", "kz": "Түрі"},
-            "estimated_time": {"en": "Estimated time", "ru": "Предполагаемое время", "kz": "Болжалды уақыт"},
-            "view_order": {"en": "View Order", "ru": "Посмотреть заказ", "kz": "Тапсырысты көру"},
-            "pickup": {"en": "Pickup", "ru": "Самовывоз", "kz": "Өзіңіз алу"},
-            "delivery": {"en": "Delivery", "ru": "Доставка", "kz": "Жеткізу"},
-            "order_update": {"en": "Order #{order_id} Update", "ru": "Обновление заказа №{order_id}", "kz": "Тапсырыс №{order_id} жаңартылуы"},
-            "status_updated": {"en": "Your order status has been updated to", "ru": "Статус вашего заказа обновлен до", "kz": "Тапсырысыңыздың мәртебесі жаңартылды"},
-            "order_delivered_msg": {"en": "Order #{order_id} Delivered!", "ru": "Заказ №{order_id} доставлен!", "kz": "Тапсырыс №{order_id} жеткізілді!"},
-            "delivered_thanks": {"en": "Your order has been successfully delivered. Thank you for choosing us!", "ru": "Ваш заказ успешно доставлен. Спасибо, что выбрали нас!", "kz": "Тапсырысыңыз сәтті жеткізілді. Бізді таңдағаныңыз үшін рахмет!"},
-            "rate_experience": {"en": "How was your experience?", "ru": "Как вам понравился наш сервис?", "kz": "Біздің қызмет қалай ұнады?"},
-            "rate_order": {"en": "Rate Your Order", "ru": "Оценить заказ", "kz": "Тапсырысты бағалау"},
-            "password_reset_msg": {"en": "Password Reset Request", "ru": "Запрос на сброс пароля", "kz": "Құпия сөзді қалпына келтіру сұрауы"},
-            "reset_desc": {"en": "You requested to reset your password. Click the button below to create a new password:", "ru": "Вы запросили сброс пароля. Нажмите кнопку ниже, чтобы создать новый пароль:", "kz": "Сіз құпия сөзді қалпына келтіруді сұрадыңыз. Жаңа құпия сөз жасау үшін төмендегі түймені басыңыз:"},
-            "reset_password": {"en": "Reset Password", "ru": "Сбросить пароль", "kz": "Құпия сөзді қалпына келтіру"},
-            "ignore_if_not_requested": {"en": "If you didn't request this, please ignore this email.", "ru": "Если вы не запрашивали это, пожалуйста, проигнорируйте это письмо.", "kz": "Егер сіз мұны сұрамаған болсаңыз, бұл хатты елемеңіз."}
-        }
-        return texts.get(key, {}).get(locale, texts.get(key, {}).get("en", ""))
+    Returns {"status": "ok", "params": {...}} with the Resend message params
+    (to, subject, html, tags; no "from"), or an error result like send_email's.
+    """
+    # check template
+    if template not in TEMPLATES:
+        return {"status": "error", "reason": "invalid_template", "template": template}
     
-    if template == "verify_email":
-        user_name = enhanced_vars.get("user_name", "User")
-        verify_url = enhanced_vars.get("verify_url", "#")
-        otp = enhanced_vars.get("otp", "")
-        
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>{get_text('hello')} {user_name}!</h2>
-            <p>{get_text('verify_email_desc')}</p>
-            {f'<p>{get_text("verification_code")}: <strong>{otp}</strong></p>' if otp else ''}
-            <p><a href="{verify_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{get_text('verify_email_btn')}</a></p>
-            <p>{get_text('button_not_work')}: <a href="{verify_url}">{verify_url}</a></p>
-        </div>
-        """
-        
-    elif template == "order_created":
-        order_id = enhanced_vars.get("order_id", "")
-        order_url = enhanced_vars.get("order_url", "#")
-        pickup_or_delivery = enhanced_vars.get("pickup_or_delivery", "pickup")
-        eta = enhanced_vars.get("eta", "")
-        
-        # localize pickup/delivery type
-        delivery_type_localized = get_text("pickup") if pickup_or_delivery.lower() == "pickup" else get_text("delivery")
-        
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>{get_text('order_confirmed').format(order_id=order_id)}</h2>
-            <p>{get_text('thank_you_order')}</p>
-            <p><strong>{get_text('type')}:</strong> {delivery_type_localized}</p>
-            <p><strong>{get_text('estimated_time')}:</strong> {eta}</p>
-            <p><a href="{order_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{get_text('view_order')}</a></p>
-        </div>
-        """
-        
-    elif template == "order_status":
-        order_id = enhanced_vars.get("order_id", "")
-        status = enhanced_vars.get("status", "")
-        eta = enhanced_vars.get("eta", "")
-        
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>{get_text('order_update').format(order_id=order_id)}</h2>
-            <p>{get_text('status_updated')}: <strong>{status.title()}</strong></p>
-            <p><strong>{get_text('estimated_time')}:</strong> {eta}</p>
-        </div>
-        """
-        
-    elif template == "order_delivered":
-        order_id = enhanced_vars.get("order_id", "")
-        rating_url = enhanced_vars.get("rating_url", "#")
-        
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>{get_text('order_delivered_msg').format(order_id=order_id)}</h2>
-            <p>{get_text('delivered_thanks')}</p>
-            <p>{get_text('rate_experience')}</p>
-            <p><a href="{rating_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{get_text('rate_order')}</a></p>
-        </div>
-        """
-        
-    elif template == "password_reset":
-        reset_url = enhanced_vars.get("reset_url", "#")
-        
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>{get_text('password_reset_msg')}</h2>
-            <p>{get_text('reset_desc')}</p>
-            <p><a href="{reset_url}" style="background: #007cba; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">{get_text('reset_password')}</a></p>
-            <p>{get_text('ignore_if_not_requested')}</p>
-            <p>{get_text('button_not_work')}: <a href="{reset_url}">{reset_url}</a></p>
-        </div>
-        """
-    else:
-        html = "<p>Email notification</p>"
+    # check required variables
+    required_vars = TEMPLATES[template]["required_vars"]
+    missing_vars = [var for var in required_vars if var not in variables]
+    if missing_vars:
+        return {"status": "error", "reason": "missing_variables", "missing": missing_vars}
+    
+    params = {
+        "to": [to],
+        "subject": select_subject(template, variables, locale),
+        "html": render_template(template, variables, locale),
+        "tags": [{"name": "category", "value": template}]
+    }
     
-    return html
+    # add user_id tag if provided
+    if user_id:
+        params["tags"].append({"name": "user_id", "value": str(user_id)})
+    return {"status": "ok", "params": params}
 
 
 def send_email(
@@ -230,7 +351,10 @@ def send_email(
     locale: str = "en"
 ) -> Dict[str, Any]:
     """
-    Send transactional email using Resend API.
+    Send transactional email using Resend API, inline (one HTTP call).
+    
+    Request handlers should use app.services.email.queue.enqueue_email instead,
+    which batches sends off the request path.
     
     Args:
         template: Email template name (verify_email, order_created, etc.)
@@ -243,40 +367,24 @@ def send_email(
     Returns:
         Dict with result including message_id from Resend
     """
+    resend = _resend.get()
     if resend is None:
         return {"status": "skipped", "reason": "resend_not_installed"}
     if not os.getenv("RESEND_API_KEY"):
         return {"status": "skipped", "reason": "resend_not_configured"}
     
-    # check template
-    if template not in TEMPLATES:
-        return {"status": "error", "reason": "invalid_template", "template": template}
-    
-    # check required variables
-    required_vars = TEMPLATES[template]["required_vars"]
-    missing_vars = [var for var in required_vars if var not in variables]
-    if missing_vars:
-        return {"status": "error", "reason": "missing_variables", "missing": missing_vars}
+    built = build_email(template, to, variables, user_id=user_id, locale=locale)
+    if built["status"] != "ok":
+        return built
     
     try:
         resend.api_key = os.environ["RESEND_API_KEY"]
         
-        subject = select_subject(template, variables, locale)
-        html = render_template(template, variables, locale)
+        params = {"from": f"{FROM_NAME} <{FROM_EMAIL}>", **built["params"]}
+        subject = params["subject"]
         
-        params = {
-            "from": f"{FROM_NAME} <{FROM_EMAIL}>",
-            "to": [to],
-            "subject": subject,
-            "html": html,
-            "tags": [{"name": "category", "value": template}]
-        }
-        
-        # add user_id tag if provided
-        if user_id:
-            params["tags"].append({"name": "user_id", "value": str(user_id)})
-        
-        result = resend.Emails.send(params)
+        with integration_call("resend", "send_email"):
+            result = resend.Emails.send(params)
         
         # extract message_id for idempotency tracking
         message_id = result.get("id") if isinstance(result, dict) else None
@@ -303,6 +411,7 @@ def send_html(to: str, subject: str, html: str, tags: Optional[Dict[str, str]] =
     """Send an email via Resend if configured; otherwise, no-op.
     Compatibility function matching resend_client.py interface.
     """
+    resend = _resend.get()
     if resend is None:
         return {"status": "skipped", "reason": "resend_not_installed"}
     if not os.getenv("RESEND_API_KEY") or not FROM_EMAIL:
@@ -320,7 +429,8 @@ def send_html(to: str, subject: str, html: str, tags: Optional[Dict[str, str]] =
         if tags:
             params["tags"] = [{"name": k, "value": str(v)} for k, v in tags.items()]
         
-        result = resend.Emails.send(params)
+        with integration_call("resend", "send_email"):
+            result = resend.Emails.send(params)
         
         # return consistent format like send_email
         message_id = result.get("id") if isinstance(result, dict) else None
@@ -336,7 +446,7 @@ def send_html(to: str, subject: str, html: str, tags: Optional[Dict[str, str]] =
 
 def health_check() -> Dict[str, str]:
     """check email sender config and health."""
-    if resend is None:
+    if not _resend.installed():
         return {"status": "unavailable", "reason": "resend_not_installed"}
     
     api_key = os.getenv("RESEND_API_KEY")
@@ -0,0 +1,252 @@
+"""
+Daily email engagement rollup and raw event retention.
+
+email_daily_stats holds one row per (UTC day, template, event type) with:
+- events:        all events of that type (every open of a re-opened email)
+- unique_emails: events that were the first of their type for their email, so
+                 "opened" unique_emails / "delivered" events is the open rate
+
+The rollup is maintained by the webhook ingestor (app.services.email.events): each
+bulk INSERT into email_events adds the rows it actually inserted to the rollup in the
+same transaction, so redeliveries are never counted twice. The template is the
+"category" tag send_email / the email queue put on every message.
+
+email_events is pruned by the "email-retention" thread: events older than
+EMAIL_EVENTS_RETENTION_DAYS are deleted in batches every
+EMAIL_EVENTS_PRUNE_INTERVAL_SEC. They are already counted in the rollup (the
+migration creating it rolled up the events stored before); only the first-of-type
+check loses history, so an email re-opened after the retention window counts as a
+unique open again.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Date, and_, case, exists, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_TEMPLATE = "unknown"
+
+# event type -> report key
+EVENT_KEYS = {
+    "email.sent": "sent",
+    "email.delivered": "delivered",
+    "email.delivery_delayed": "delayed",
+    "email.opened": "opened",
+    "email.clicked": "clicked",
+    "email.bounced": "bounced",
+    "email.complained": "complained",
+}
+
+
+def _aggregate(db: Session, *conditions) -> List[Dict[str, Any]]:
+    """rollup rows for the email_events matching conditions."""
+    event = models.EmailEvent
+    prior = aliased(models.EmailEvent)
+    first_of_type = ~exists().where(prior.email_id == event.email_id, prior.type == event.type, prior.id < event.id)
+    day = func.date(event.created_at, type_=Date)
+    template = func.coalesce(event.meta["tags"]["category"].as_string(), UNKNOWN_TEMPLATE)
+    rows = (
+        db.query(
+            day,
+            template,
+            event.type,
+            func.count(event.id),
+            func.sum(case((and_(event.email_id.is_not(None), first_of_type), 1), else_=0)),
+        )
+        .filter(event.type.is_not(None), *conditions)
+        .group_by(day, template, event.type)
+        .all()
+    )
+    # sorted: concurrent upserts then lock rollup rows in the same order
+    return sorted(
+        (
+            {"day": d, "template": t[:64], "event_type": e, "events": int(n), "unique_emails": int(u or 0)}
+            for d, t, e, n, u in rows
+        ),
+        key=lambda row: (row["day"], row["template"], row["event_type"]),
+    )
+
+
+def add_to_rollup(db: Session, event_ids: List[int]) -> int:
+    """count freshly inserted email_events into the rollup (caller commits); returns rollup rows touched."""
+    if not event_ids:
+        return 0
+    rows = _aggregate(db, models.EmailEvent.id.in_(event_ids))
+    if not rows:
+        return 0
+    stats = models.EmailDailyStats
+    now = datetime.utcnow()
+    stmt = pg_insert(stats).values([{**row, "updated_at": now} for row in rows])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "template", "event_type"],
+        set_={
+            "events": stats.events + stmt.excluded.events,
+            "unique_emails": stats.unique_emails + stmt.excluded.unique_emails,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def retention_cutoff() -> Optional[datetime]:
+    """raw events before this are pruned (None: kept forever)."""
+    if settings.EMAIL_EVENTS_RETENTION_DAYS <= 0:
+        return None
+    return datetime.utcnow() - timedelta(days=settings.EMAIL_EVENTS_RETENTION_DAYS)
+
+
+def rebuild_rollup(db: Session, start: date, end: date) -> int:
+    """re-roll [start, end] from the raw events (e.g. after deleting events); returns rows written.
+
+    Raises ValueError when part of the range was already pruned from email_events.
+    """
+    cutoff = retention_cutoff()
+    if cutoff is not None and start <= cutoff.date():
+        raise ValueError(f"Raw events before {cutoff.date() + timedelta(days=1)} are pruned; cannot rebuild")
+    stats = models.EmailDailyStats
+    db.query(stats).filter(stats.day >= start, stats.day <= end).delete(synchronize_session=False)
+    lower = datetime(start.year, start.month, start.day)
+    upper = datetime(end.year, end.month, end.day) + timedelta(days=1)
+    rows = _aggregate(db, models.EmailEvent.created_at >= lower, models.EmailEvent.created_at < upper)
+    if rows:
+        now = datetime.utcnow()
+        db.execute(pg_insert(stats).values([{**row, "updated_at": now} for row in rows]))
+    db.commit()
+    return len(rows)
+
+
+def _rate(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _with_rates(counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    events = {key: counts.get(key, {}).get("events", 0) for key in EVENT_KEYS.values()}
+    unique = {key: counts.get(key, {}).get("unique_emails", 0) for key in EVENT_KEYS.values()}
+    return {
+        "events": events,
+        "unique_emails": unique,
+        "rates": {
+            "delivery_rate": _rate(unique["delivered"], unique["sent"]),
+            "open_rate": _rate(unique["opened"], unique["delivered"]),
+            "click_rate": _rate(unique["clicked"], unique["delivered"]),
+            "click_to_open_rate": _rate(unique["clicked"], unique["opened"]),
+            "bounce_rate": _rate(unique["bounced"], unique["sent"]),
+            "complaint_rate": _rate(unique["complained"], unique["delivered"]),
+        },
+    }
+
+
+def engagement_report(db: Session, start: date, end: date, template: Optional[str] = None, by_day: bool = False) -> Dict[str, Any]:
+    """per-template engagement for event days in [start, end], from the rollup only."""
+    stats = models.EmailDailyStats
+    query = select(stats.day, stats.template, stats.event_type, stats.events, stats.unique_emails).where(
+        stats.day >= start, stats.day <= end
+    )
+    if template:
+        query = query.where(stats.template == template)
+
+    totals: Dict[str, Dict[str, int]] = {}
+    templates: Dict[str, Dict[str, Dict[str, int]]] = {}
+    days: Dict[date, Dict[str, Dict[str, int]]] = {}
+    for day, tmpl, event_type, events, unique in db.execute(query):
+        key = EVENT_KEYS.get(event_type)
+        if key is None:
+            continue
+        for bucket in (totals, templates.setdefault(tmpl, {}), days.setdefault(day, {}) if by_day else {}):
+            entry = bucket.setdefault(key, {"events": 0, "unique_emails": 0})
+            entry["events"] += events
+            entry["unique_emails"] += unique
+
+    report = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "template": template,
+        "total": _with_rates(totals),
+        "templates": {tmpl: _with_rates(counts) for tmpl, counts in sorted(templates.items())},
+    }
+    if by_day:
+        report["days"] = [{"day": d.isoformat(), **_with_rates(counts)} for d, counts in sorted(days.items())]
+    return report
+
+
+def prune_events(db: Session, before: datetime, batch_size: int = 5000) -> int:
+    """delete email_events created before `before` in batches (short locks); returns rows deleted."""
+    event = models.EmailEvent
+    deleted = 0
+    while True:
+        ids = (
+            select(event.id)
+            .where(event.created_at < before)
+            .order_by(event.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        count = db.query(event).filter(event.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class EmailEventRetention:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run_at: Optional[datetime] = None
+        self.pruned = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        """start the pruning thread (called from the startup hook)."""
+        with self._lock:
+            if settings.EMAIL_EVENTS_RETENTION_DAYS <= 0 or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="email-retention", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Failed to prune email events")
+            time.sleep(settings.EMAIL_EVENTS_PRUNE_INTERVAL_SEC)
+
+    def run_once(self) -> int:
+        cutoff = retention_cutoff()
+        if cutoff is None:
+            return 0
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            deleted = prune_events(db, cutoff)
+        self.last_run_at = datetime.utcnow()
+        self.pruned += deleted
+        if deleted:
+            logger.info(f"Pruned {deleted} email events before {cutoff:%Y-%m-%d %H:%M} in {time.perf_counter() - started:.1f}s")
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "retention_days": settings.EMAIL_EVENTS_RETENTION_DAYS,
+            "last_run_at": self.last_run_at,
+            "pruned": self.pruned,
+            "errors": self.errors,
+        }
+
+
+# global instance
+email_event_retention = EmailEventRetention()
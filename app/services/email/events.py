@@ -0,0 +1,260 @@
+"""
+Buffered ingestion of Resend webhook events into email_events.
+
+POST /webhooks/resend verifies the Svix signature and hands the event to
+email_event_ingestor.offer(); the row is written later by the "email-events"
+thread in bulk:
+
+- flushing:     a multi-row INSERT ... ON CONFLICT (svix_id) DO NOTHING per
+                EMAIL_EVENTS_BATCH_SIZE buffered events, or when the oldest has waited
+                EMAIL_EVENTS_FLUSH_MS; the thread owns its sessions, and the inserted
+                rows are added to email_daily_stats in the same transaction
+- idempotency:  svix_id is the svix-id header, which Svix repeats on every redelivery
+                of the same event, so redeliveries are dropped by the conflict clause
+- backpressure: at most EMAIL_EVENTS_BUFFER_MAX events are buffered; offer() refuses
+                more and the route answers 503, so Svix redelivers later instead of the
+                worker growing without bound while the database is slow or down
+- failures:     a failed INSERT puts its rows back in front of the buffer and is
+                retried after EMAIL_EVENTS_RETRY_SEC; when the database rejects the
+                data itself (IntegrityError / DataError) retrying cannot help, so the
+                batch is split in halves until the offending rows are isolated, and
+                those are logged and dropped instead of blocking everything behind them
+- shutdown:     flush() writes whatever is still buffered
+
+An event acknowledged with 200 but not yet flushed is lost if the worker is killed
+outright; a graceful shutdown loses nothing.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import models
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.email.engagement import add_to_rollup
+
+logger = logging.getLogger(__name__)
+
+# event type -> (field of data holding the details, {meta key: detail key})
+_META_FIELDS = {
+    "email.clicked": ("click", {"timestamp": "timestamp", "ip_address": "ipAddress", "user_agent": "userAgent"}),
+    "email.opened": ("open", {"timestamp": "timestamp", "ip_address": "ipAddress", "user_agent": "userAgent"}),
+    "email.bounced": ("bounce", {"reason": "reason", "smtp_code": "smtpCode"}),
+    "email.complained": ("complaint", {"provider": "provider", "timestamp": "timestamp"}),
+    "email.delivery_delayed": ("delay", {"reason": "reason", "attempts": "attempts"}),
+}
+
+
+# column -> max length, to clip free-form values (a click link can be any length)
+_LENGTHS = {
+    column.name: column.type.length
+    for column in models.EmailEvent.__table__.columns
+    if getattr(column.type, "length", None)
+}
+
+
+def _clip(column: str, value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _LENGTHS[column]:
+        return value[:_LENGTHS[column]]
+    return value
+
+
+def _generate_event_id(event: Dict[str, Any]) -> str:
+    """generate a deterministic event ID for idempotency."""
+    event_string = json.dumps(event, sort_keys=True)
+    return hashlib.sha256(event_string.encode()).hexdigest()
+
+
+def _parse_time(value: Optional[str]) -> datetime:
+    """Resend's ISO timestamps as naive UTC, like every other DateTime column."""
+    if not value:
+        return datetime.utcnow()
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def event_row(event: Dict[str, Any], svix_id: Optional[str] = None) -> Dict[str, Any]:
+    """the email_events row for a verified Resend webhook event.
+
+    Raises ValueError for an event without a type, which email_events cannot store.
+    """
+    event_type = event.get("type")
+    if not event_type or not isinstance(event_type, str):
+        raise ValueError("Event has no type")
+    data = event.get("data") or {}
+    to_list = data.get("to") or []
+
+    link = None
+    meta: Dict[str, Any] = {}
+    if event_type in _META_FIELDS:
+        field, keys = _META_FIELDS[event_type]
+        details = data.get(field) or {}
+        meta = {meta_key: details.get(key) for meta_key, key in keys.items()}
+        if event_type == "email.clicked":
+            link = details.get("link")
+
+    # add tags to meta if present
+    tags = data.get("tags") or {}
+    if tags:
+        meta["tags"] = tags
+
+    row = {
+        "svix_id": svix_id or event.get("id") or _generate_event_id(event),
+        "type": event_type,
+        "email_id": data.get("email_id"),
+        "recipient": to_list[0] if to_list else None,
+        "subject": data.get("subject"),
+        "link": link,
+        "meta": meta or None,
+        "created_at": _parse_time(event.get("created_at")),
+    }
+    return {column: _clip(column, value) if column in _LENGTHS else value for column, value in row.items()}
+
+
+class EmailEventIngestor:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._oldest: Optional[float] = None  # monotonic time the oldest buffered event arrived
+        self._retry_at = 0.0
+        self._flush_lock = threading.Lock()  # one INSERT at a time: the thread vs. shutdown flush()
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def offer(self, row: Dict[str, Any]) -> bool:
+        """buffer an event row; False when the buffer is full (the caller should answer 503)."""
+        with self._cond:
+            if len(self._buffer) >= settings.EMAIL_EVENTS_BUFFER_MAX:
+                self.rejected += 1
+                return False
+            self._ensure_started()
+            self._buffer.append(row)
+            self.received += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._buffer) == 1 or len(self._buffer) >= settings.EMAIL_EVENTS_BATCH_SIZE:
+                self._cond.notify()  # start the flush timer, or flush a full batch now
+        return True
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="email-events", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._buffer and now >= self._retry_at:
+                        due = self._oldest + settings.EMAIL_EVENTS_FLUSH_MS / 1000
+                        if len(self._buffer) >= settings.EMAIL_EVENTS_BATCH_SIZE or now >= due:
+                            break
+                        self._cond.wait(max(due, self._retry_at) - now)
+                    elif self._buffer:
+                        self._cond.wait(self._retry_at - now)
+                    else:
+                        self._cond.wait()
+            self._flush_batch()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            count = min(len(self._buffer), settings.EMAIL_EVENTS_BATCH_SIZE)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._oldest = time.monotonic() if self._buffer else None
+            return batch
+
+    def _flush_batch(self) -> bool:
+        """insert one batch; False (rows back in the buffer) if the INSERT failed."""
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return True
+            try:
+                self._insert_or_split(batch)
+            except Exception:
+                self.errors += 1
+                logger.exception(f"Failed to insert {len(batch)} email events, retrying")
+                with self._cond:
+                    self._buffer.extendleft(reversed(batch))
+                    self._oldest = time.monotonic()
+                    self._retry_at = time.monotonic() + settings.EMAIL_EVENTS_RETRY_SEC
+                return False
+            return True
+
+    def _insert_or_split(self, batch: List[Dict[str, Any]]) -> None:
+        """insert a batch, bisecting it to drop the rows the database rejects outright.
+
+        Halves already committed are inserted again if a later half fails to
+        connect and the whole batch is retried; the conflict clause skips them.
+        """
+        try:
+            self._insert(batch)
+        except (IntegrityError, DataError):
+            if len(batch) == 1:
+                self.dropped += 1
+                logger.exception(f"Dropping email event {batch[0].get('svix_id')} ({batch[0].get('type')}): rejected by the database")
+                return
+            middle = len(batch) // 2
+            self._insert_or_split(batch[:middle])
+            self._insert_or_split(batch[middle:])
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            stmt = pg_insert(models.EmailEvent).values(batch).on_conflict_do_nothing(
+                index_elements=["svix_id"]
+            ).returning(models.EmailEvent.id)
+            event_ids = list(db.execute(stmt).scalars())
+            # only the rows actually inserted: a redelivered event is not counted twice
+            add_to_rollup(db, event_ids)
+            db.commit()
+        inserted = len(event_ids)
+        self.flushes += 1
+        self.inserted += inserted
+        self.duplicates += len(batch) - inserted
+        logger.debug(f"Inserted {inserted}/{len(batch)} email events in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def flush(self) -> None:
+        """write everything still buffered now (shutdown hook)."""
+        while True:
+            with self._cond:
+                if not self._buffer:
+                    return
+            if not self._flush_batch():
+                logger.error(f"Dropping {len(self._buffer)} buffered email events on shutdown")
+                return
+
+    def stats(self) -> dict:
+        with self._cond:
+            buffered = len(self._buffer)
+        return {
+            "buffered": buffered,
+            "received": self.received,
+            "rejected": self.rejected,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+
+# global instance
+email_event_ingestor = EmailEventIngestor()
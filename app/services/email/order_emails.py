@@ -1,15 +1,14 @@
 from typing import Optional
-from app.services.email.email_sender import send_email
+from app.services.email.queue import enqueue_email
 
 
 def send_order_created(to: str, order, user_id: Optional[int] = None, pickup_or_delivery: str = "pickup", eta: str = "30 minutes", locale: str = "en"):
-    """send order created email using new template system."""
+    """queue the order created email (sent in a batch by the email queue)."""
     try:
         # build order URL (assuming frontend has order detail page)
         order_url = f"https://ium.app/orders/{order.id}"
         
-        # use new email sender with order_created template
-        result = send_email(
+        result = enqueue_email(
             template="order_created",
             to=to,
             variables={
@@ -19,7 +18,8 @@ def send_order_created(to: str, order, user_id: Optional[int] = None, pickup_or_
                 "eta": eta
             },
             user_id=user_id,
-            locale=locale
+            locale=locale,
+            idempotency_key=f"order_created:{order.id}",
         )
         return result
     except Exception:
@@ -28,9 +28,9 @@ def send_order_created(to: str, order, user_id: Optional[int] = None, pickup_or_
 
 
 def send_order_status(to: str, order, status: str, eta: str = "15 minutes", user_id: Optional[int] = None, locale: str = "en"):
-    """send order status update email."""
+    """queue the order status update email."""
     try:
-        result = send_email(
+        result = enqueue_email(
             template="order_status",
             to=to,
             variables={
@@ -39,7 +39,8 @@ def send_order_status(to: str, order, status: str, eta: str = "15 minutes", user
                 "eta": eta
             },
             user_id=user_id,
-            locale=locale
+            locale=locale,
+            idempotency_key=f"order_status:{order.id}:{status}",
         )
         return result
     except Exception:
@@ -47,12 +48,12 @@ def send_order_status(to: str, order, status: str, eta: str = "15 minutes", user
 
 
 def send_order_delivered(to: str, order, user_id: Optional[int] = None, locale: str = "en"):
-    """send order delivered email with rating request."""
+    """queue the order delivered email with rating request."""
     try:
         # build rating URL (assuming frontend has rating page)
         rating_url = f"https://ium.app/orders/{order.id}/rate"
         
-        result = send_email(
+        result = enqueue_email(
             template="order_delivered",
             to=to,
             variables={
@@ -60,7 +61,8 @@ def send_order_delivered(to: str, order, user_id: Optional[int] = None, locale:
                 "rating_url": rating_url
             },
             user_id=user_id,
-            locale=locale
+            locale=locale,
+            idempotency_key=f"order_delivered:{order.id}",
         )
         return result
     except Exception:
@@ -0,0 +1,346 @@
+"""
+Queued, batched transactional email.
+
+Request handlers call enqueue_email() (or the send_order_* helpers), which renders
+the template and inserts an email_outbox row; nothing is sent on the request path.
+The "email-queue" thread in each worker (started on startup, woken by enqueues):
+
+- batching:     waits EMAIL_BATCH_LINGER_MS after a wake so concurrent enqueues join,
+                then claims up to EMAIL_BATCH_SIZE (at most 100) due rows with
+                FOR UPDATE SKIP LOCKED and sends them in one Resend batch call, at most
+                EMAIL_RATE_LIMIT_PER_SEC calls/sec across all workers (Resend limits
+                the team, so the bucket is shared through rate_limit_buckets)
+- idempotency:  enqueue_email(idempotency_key=...) inserts at most one row per key; a
+                claimed batch gets a batch_key, sent as Resend's Idempotency-Key and
+                kept across retries, so a call that timed out after Resend accepted it
+                does not deliver the batch twice (Resend remembers keys for 24 hours)
+- retries:      429, 5xx and network errors put the batch back (same rows, same key)
+                with exponential backoff and jitter; a batch still "sending" after
+                EMAIL_SEND_LEASE_SEC (its worker died mid-call) is claimed again
+- dead letters: messages Resend rejects (batches use permissive validation, so one bad
+                address does not fail the other 99) and batches out of attempts end up
+                "dead"; admins list and requeue them under /admin/integrations/email
+
+EMAIL_TRANSPORT=fake swaps Resend for FakeTransport, which keeps batches in memory.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
+from app.core.ratelimit import SharedTokenBucket
+from app.db.session import SessionLocal
+from app.services.email.email_sender import FROM_EMAIL, FROM_NAME, build_email
+
+logger = logging.getLogger(__name__)
+
+# Resend's limit for one batch call
+MAX_BATCH_SIZE = 100
+
+
+def _is_retryable(error: Exception) -> bool:
+    code = getattr(error, "code", None)
+    if code is None or not hasattr(error, "error_type"):
+        return True  # network error or timeout before Resend answered
+    if error.error_type == "concurrent_idempotent_requests":
+        return True  # the same batch is still in flight from a worker whose lease ran out
+    try:
+        status = int(code)
+    except (TypeError, ValueError):
+        return False
+    return status == 429 or status >= 500
+
+
+def _align(count: int, response: Any) -> List[Dict[str, Any]]:
+    """per-message results from a permissive batch response: ids for the accepted
+    messages in order, errors by index for the rejected ones."""
+    response = response if isinstance(response, dict) else {}
+    errors = {error.get("index"): error.get("message") for error in response.get("errors") or []}
+    ids = iter(item.get("id") for item in response.get("data") or [])
+    return [{"error": errors[i]} if i in errors else {"id": next(ids, None)} for i in range(count)]
+
+
+class ResendTransport:
+    name = "resend"
+
+    def send_batch(self, messages: List[Dict[str, Any]], idempotency_key: str) -> Dict[str, Any]:
+        """
+        Send up to 100 messages in one call.
+
+        Returns {"status": "sent", "results": [{"id"} or {"error"}, ...]} aligned with
+        messages, {"status": "error", "retryable", "error"} when the call failed as a
+        whole, or {"status": "skipped", "reason"} when Resend is not set up.
+        """
+        resend = integrations.get("resend").get()
+        if resend is None:
+            return {"status": "skipped", "reason": "resend_not_installed"}
+        if not os.getenv("RESEND_API_KEY"):
+            return {"status": "skipped", "reason": "resend_not_configured"}
+        resend.api_key = os.environ["RESEND_API_KEY"]
+        params = [{"from": f"{FROM_NAME} <{FROM_EMAIL}>", **message} for message in messages]
+        try:
+            with integration_call("resend", "send_batch"):
+                response = resend.Batch.send(params, {"idempotency_key": idempotency_key, "batch_validation": "permissive"})
+        except Exception as e:
+            return {"status": "error", "retryable": _is_retryable(e), "error": str(e)}
+        return {"status": "sent", "results": _align(len(messages), response)}
+
+
+class FakeTransport:
+    """in-memory transport for tests and local runs: answers like Resend, replays
+    answers per idempotency key, and fails or rejects on request."""
+    name = "fake"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches: List[Dict[str, Any]] = []  # {"idempotency_key", "messages"} per accepted call
+        self.reject: set = set()  # recipients answered with a validation error
+        self._failures: List[Dict[str, Any]] = []
+        self._responses: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+
+    def fail_next(self, count: int = 1, retryable: bool = True, error: str = "fake transport failure") -> None:
+        """make the next count calls fail as a whole."""
+        with self._lock:
+            self._failures.extend({"status": "error", "retryable": retryable, "error": error} for _ in range(count))
+
+    def send_batch(self, messages: List[Dict[str, Any]], idempotency_key: str) -> Dict[str, Any]:
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+            if idempotency_key in self._responses:
+                return self._responses[idempotency_key]
+            results = []
+            for message in messages:
+                if message["to"][0] in self.reject:
+                    results.append({"error": f"Invalid `to` field: {message['to'][0]}"})
+                else:
+                    self._next_id += 1
+                    results.append({"id": f"fake-{self._next_id}"})
+            self.batches.append({"idempotency_key": idempotency_key, "messages": messages})
+            response = {"status": "sent", "results": results}
+            self._responses[idempotency_key] = response
+            return response
+
+    def sent(self) -> List[Dict[str, Any]]:
+        """every accepted message, in send order."""
+        with self._lock:
+            return [message for batch in self.batches for message in batch["messages"]]
+
+
+def get_transport():
+    return FakeTransport() if settings.EMAIL_TRANSPORT == "fake" else ResendTransport()
+
+
+def enqueue_email(
+    template: str,
+    to: str,
+    variables: Dict[str, Any],
+    *,
+    user_id: Optional[int] = None,
+    locale: str = "en",
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Render a template email and queue it for the batch sender.
+
+    Returns {"status": "queued", "id"}, {"status": "duplicate"} when idempotency_key
+    was queued before, or build_email's error result (unknown template, missing
+    variables).
+    """
+    built = build_email(template, to, variables, user_id=user_id, locale=locale)
+    if built["status"] != "ok":
+        return built
+    params = built["params"]
+    with SessionLocal() as db:
+        stmt = pg_insert(models.EmailOutbox).values(
+            idempotency_key=idempotency_key,
+            template=template,
+            to_email=to,
+            subject=params["subject"],
+            html=params["html"],
+            tags=params["tags"],
+            user_id=user_id,
+        ).on_conflict_do_nothing(index_elements=["idempotency_key"]).returning(models.EmailOutbox.id)
+        email_id = db.execute(stmt).scalar()
+        db.commit()
+    if email_id is None:
+        return {"status": "duplicate", "idempotency_key": idempotency_key}
+    email_queue.wake()
+    return {"status": "queued", "id": email_id, "template": template, "recipient": to}
+
+
+def requeue_dead(db: Session, ids: Optional[List[int]] = None) -> int:
+    """queue dead letters again (all, or the given ids) under a fresh batch key."""
+    query = db.query(models.EmailOutbox).filter(models.EmailOutbox.status == "dead")
+    if ids:
+        query = query.filter(models.EmailOutbox.id.in_(ids))
+    count = query.update(
+        {"status": "pending", "attempts": 0, "batch_key": None, "error": None, "next_attempt_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+    if count:
+        email_queue.wake()
+    return count
+
+
+class EmailQueue:
+    def __init__(self, transport=None):
+        self.transport = transport or get_transport()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._limiter: Optional[SharedTokenBucket] = None
+        self.batches_sent = 0
+        self.sent = 0
+        self.rejected = 0
+        self.retried = 0
+        self.dead = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        """start the sender thread (called from the startup hook)."""
+        with self._lock:
+            if not settings.EMAIL_QUEUE_WORKER_ENABLED or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="email-queue", daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        """send what is due now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                while self.run_once():
+                    pass
+            except Exception:
+                self.errors += 1
+                logger.exception("Email queue failed")
+            if self._wake.wait(settings.EMAIL_QUEUE_POLL_SEC):
+                # let the requests enqueueing right now join the batch
+                time.sleep(settings.EMAIL_BATCH_LINGER_MS / 1000)
+            self._wake.clear()
+
+    def run_once(self) -> bool:
+        """claim and send one batch; False when nothing was due."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+        batch_key, ids, messages = claimed
+        if self._limiter is None or self._limiter.rate != settings.EMAIL_RATE_LIMIT_PER_SEC:
+            self._limiter = SharedTokenBucket("resend", settings.EMAIL_RATE_LIMIT_PER_SEC)
+        self._limiter.acquire()
+        started = time.perf_counter()
+        result = self.transport.send_batch(messages, batch_key)
+        self._record(ids, result)
+        logger.info(f"Email batch {batch_key}: {len(ids)} messages, {result.get('status')} in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def _claim(self) -> Optional[Tuple[str, List[int], List[Dict[str, Any]]]]:
+        model = models.EmailOutbox
+        now = datetime.utcnow()
+        size = max(1, min(settings.EMAIL_BATCH_SIZE, MAX_BATCH_SIZE))
+        # pending rows whose (retry) time has come, and "sending" rows whose lease ran out
+        due = and_(model.status.in_(("pending", "sending")), model.next_attempt_at <= now)
+        with SessionLocal() as db:
+            first = db.query(model).filter(due).order_by(model.next_attempt_at, model.id).with_for_update(skip_locked=True).first()
+            if first is None:
+                return None
+            if first.batch_key:
+                # a retry: the same messages under the same idempotency key
+                rows = db.query(model).filter(
+                    model.batch_key == first.batch_key, model.status.in_(("pending", "sending"))
+                ).with_for_update(skip_locked=True).all()
+                batch_key = first.batch_key
+            else:
+                rows = [first] + db.query(model).filter(
+                    due, model.batch_key.is_(None), model.id != first.id
+                ).order_by(model.id).limit(size - 1).with_for_update(skip_locked=True).all()
+                batch_key = uuid4().hex
+            rows.sort(key=lambda row: row.id)
+            lease_until = now + timedelta(seconds=settings.EMAIL_SEND_LEASE_SEC)
+            messages = []
+            for row in rows:
+                row.batch_key = batch_key
+                row.status = "sending"
+                row.attempts += 1
+                row.next_attempt_at = lease_until
+                message = {"to": [row.to_email], "subject": row.subject, "html": row.html}
+                if row.tags:
+                    message["tags"] = row.tags
+                messages.append(message)
+            ids = [row.id for row in rows]
+            db.commit()
+        return batch_key, ids, messages
+
+    def _record(self, ids: List[int], result: Dict[str, Any]) -> None:
+        model = models.EmailOutbox
+        now = datetime.utcnow()
+        status = result.get("status")
+        with SessionLocal() as db:
+            rows = db.query(model).filter(model.id.in_(ids), model.status == "sending").order_by(model.id).with_for_update().all()
+            if status == "sent":
+                self.batches_sent += 1
+                outcomes = dict(zip(ids, result["results"]))
+                for row in rows:
+                    outcome = outcomes[row.id]
+                    if outcome.get("error"):
+                        row.status, row.error = "dead", outcome["error"]
+                        self.rejected += 1
+                    else:
+                        row.status, row.message_id, row.sent_at, row.error = "sent", outcome.get("id"), now, None
+                        self.sent += 1
+            elif status == "skipped":
+                # Resend is not set up on this deployment: drop, as inline sends always did
+                for row in rows:
+                    row.status, row.error = "skipped", result.get("reason")
+                self.skipped += len(rows)
+            else:
+                error = result.get("error") or result.get("reason")
+                attempts = max((row.attempts for row in rows), default=0)
+                if result.get("retryable") and attempts < settings.EMAIL_MAX_ATTEMPTS:
+                    delay = settings.EMAIL_RETRY_BACKOFF_SEC * 2 ** (attempts - 1)
+                    retry_at = now + timedelta(seconds=delay + random.uniform(0, delay))
+                    for row in rows:
+                        row.status, row.error, row.next_attempt_at = "pending", error, retry_at
+                    self.retried += 1
+                    logger.warning(f"Email batch of {len(rows)} failed (attempt {attempts}), retrying at {retry_at}: {error}")
+                else:
+                    for row in rows:
+                        row.status, row.error = "dead", error
+                    self.dead += len(rows)
+                    logger.error(f"Email batch of {len(rows)} dead-lettered after {attempts} attempts: {error}")
+            db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "transport": self.transport.name,
+            "batches_sent": self.batches_sent,
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "dead": self.dead,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+
+# global instance
+email_queue = EmailQueue()
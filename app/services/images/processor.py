@@ -2,13 +2,35 @@ import io
 import os
 import uuid
 from pathlib import Path
-from typing import Optional, Tuple
-from PIL import Image
+from typing import TYPE_CHECKING, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 import logging
+import threading
+
+from app.core.integrations import integrations
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+
+def _load_pillow():
+    from PIL import Image
+    return Image
+
+
+_pillow = integrations.register("pillow", "PIL", _load_pillow)
+
+
+def _pil_image():
+    """PIL.Image, imported on the first upload."""
+    Image = _pillow.get()
+    if Image is None:
+        raise HTTPException(status_code=500, detail="Image processing is unavailable")
+    return Image
+
+
 class ImageProcessor:
     """service for processing and converting images to webp format."""
     
@@ -61,7 +83,7 @@ class ImageProcessor:
                 detail=f"File too large. Maximum size: {self.MAX_FILE_SIZE // (1024*1024)}MB"
             )
     
-    def resize_image_if_needed(self, image: Image.Image) -> Image.Image:
+    def resize_image_if_needed(self, image: "Image.Image") -> "Image.Image":
         """Resize image if it exceeds maximum dimensions.
         
         Args:
@@ -81,9 +103,9 @@ class ImageProcessor:
         new_height = int(height * ratio)
         
         logger.info(f"Resizing image from {width}x{height} to {new_width}x{new_height}")
-        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        return image.resize((new_width, new_height), _pil_image().Resampling.LANCZOS)
     
-    def convert_to_webp(self, image: Image.Image) -> Image.Image:
+    def convert_to_webp(self, image: "Image.Image") -> "Image.Image":
         """Convert image to webp format.
         
         Args:
@@ -95,7 +117,7 @@ class ImageProcessor:
         # convert RGBA to RGB if necessary (webp doesn't support transparency well)
         if image.mode in ('RGBA', 'LA', 'P'):
             # create white background
-            background = Image.new('RGB', image.size, (255, 255, 255))
+            background = _pil_image().new('RGB', image.size, (255, 255, 255))
             if image.mode == 'P':
                 image = image.convert('RGBA')
             background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
@@ -148,7 +170,7 @@ class ImageProcessor:
                 )
             
             # open and process image
-            image = Image.open(io.BytesIO(content))
+            image = _pil_image().open(io.BytesIO(content))
             
             try:
                 # resize if needed
@@ -217,5 +239,15 @@ class ImageProcessor:
             return False
 
 
-# global instance
-image_processor = ImageProcessor()
\ No newline at end of file
+# global instance, created on first use
+_image_processor: Optional[ImageProcessor] = None
+_image_processor_lock = threading.Lock()
+
+
+def get_image_processor() -> ImageProcessor:
+    global _image_processor
+    if _image_processor is None:
+        with _image_processor_lock:
+            if _image_processor is None:
+                _image_processor = ImageProcessor()
+    return _image_processor
\ No newline at end of file
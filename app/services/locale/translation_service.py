@@ -7,18 +7,22 @@ categories, and modification types when admins input data in Russian.
 import os
 import logging
 import json
+import threading
 from typing import Dict, Optional, List
 
-# Graceful handling of Gemini API imports
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    genai = None
-    GEMINI_AVAILABLE = False
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
 
 logger = logging.getLogger(__name__)
 
+
+def _load_gemini():
+    import google.generativeai as genai  # type: ignore
+    return genai
+
+
+_gemini = integrations.register("gemini", "google.generativeai", _load_gemini)
+
 class GeminiTranslationService:
     """Service for translating text using Google Gemini AI."""
     
@@ -29,19 +33,20 @@ class GeminiTranslationService:
     
     def _initialize_client(self):
         """Initialize Gemini client if API key is available."""
-        if not GEMINI_AVAILABLE:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.warning("GEMINI_API_KEY not found. Translation service disabled.")
+            return
+        # the SDK is only imported once a key is configured
+        genai = _gemini.get()
+        if genai is None:
             logger.warning("Google Generative AI library not installed. Translation service disabled.")
-            self.model = None
             return
         
         try:
-            api_key = os.getenv("GEMINI_API_KEY")
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                logger.info("Gemini translation service initialized successfully")
-            else:
-                logger.warning("GEMINI_API_KEY not found. Translation service disabled.")
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            logger.info("Gemini translation service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {e}")
             self.model = None
@@ -84,7 +89,8 @@ class GeminiTranslationService:
             Text to translate: "{text}"
             """
             
-            response = self.model.generate_content(prompt)
+            with integration_call("gemini", "translate"):
+                response = self.model.generate_content(prompt)
             return response.text.strip().strip('"').strip("'")
             
         except Exception as e:
@@ -132,7 +138,8 @@ class GeminiTranslationService:
             Text to translate: "{text}"
             """
             
-            response = self.model.generate_content(prompt)
+            with integration_call("gemini", "translate_multi"):
+                response = self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             # Try to parse JSON response
@@ -207,9 +214,16 @@ class GeminiTranslationService:
         
         return translations
 
-# Global translation service instance
-gemini_translation_service = GeminiTranslationService()
+# Global translation service instance, created on first use so importing the
+# routers does not load the Gemini SDK
+_translation_service: Optional[GeminiTranslationService] = None
+_translation_service_lock = threading.Lock()
 
 def get_translation_service() -> GeminiTranslationService:
     """Get the global Gemini translation service instance."""
-    return gemini_translation_service
\ No newline at end of file
+    global _translation_service
+    if _translation_service is None:
+        with _translation_service_lock:
+            if _translation_service is None:
+                _translation_service = GeminiTranslationService()
+    return _translation_service
\ No newline at end of file
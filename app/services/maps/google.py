@@ -5,6 +5,8 @@ from functools import lru_cache
 
 import httpx
 
+from app.core.metrics import integration_call
+
 API_KEY = os.getenv("GOOGLE_MAPS_API_KEY_SERVER")
 GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
@@ -99,8 +101,11 @@ def forward_geocode(
         params["bounds"] = bounds
     
     try:
-        r = httpx.get(GEOCODE_URL, params=params, timeout=10.0)
-        result = r.json()
+        with integration_call("google_maps", "geocode") as call:
+            r = httpx.get(GEOCODE_URL, params=params, timeout=10.0)
+            result = r.json()
+            if result.get("status") not in ("OK", "ZERO_RESULTS"):
+                call.failed()
         
         # cache successful results
         if result.get("status") == "OK":
@@ -158,8 +163,11 @@ def reverse_geocode(
         params["location_type"] = location_type
     
     try:
-        r = httpx.get(GEOCODE_URL, params=params, timeout=10.0)
-        result = r.json()
+        with integration_call("google_maps", "reverse_geocode") as call:
+            r = httpx.get(GEOCODE_URL, params=params, timeout=10.0)
+            result = r.json()
+            if result.get("status") not in ("OK", "ZERO_RESULTS"):
+                call.failed()
         
         # cache successful results
         if result.get("status") == "OK":
@@ -0,0 +1,210 @@
+"""
+Push campaigns as resumable background jobs.
+
+POST /admin/push/jobs (and /admin/push/send above PUSH_INLINE_MAX_DEVICES devices)
+stores a PushCampaign row and returns right away; the "push-campaigns" runner
+thread in each worker (app.core.jobs) claims queued campaigns and sends them:
+
+- streaming: the device ids and tokens come from a server-side cursor, ordered by
+             device id, PUSH_CAMPAIGN_CHUNK rows at a time (yield_per); the token list
+             is never fully in memory
+- checkpoint: after every chunk the counters, the last device id and the heartbeat
+             are committed (in a separate session: a commit would close the cursor)
+             and dead tokens are pruned; a resumed campaign starts after last_device_id
+
+Delivery is at-least-once: a chunk that was being sent when the worker died is sent
+again on resume. Cancelling a campaign takes effect at the next checkpoint.
+"""
+import logging
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Query, Session
+
+from app import models
+from app.core.config import settings
+from app.core.jobs import JobRunner
+from app.db.session import SessionLocal
+from app.schemas.admin import AdminPushTargeting
+from app.services.push.device_tokens import prune_dead_tokens
+from app.services.push.fcm_admin import send_batch
+
+logger = logging.getLogger(__name__)
+
+
+def build_target_query(db: Session, targeting: AdminPushTargeting) -> Tuple[Query, str]:
+    """devices with an FCM token matching the targeting, and a description of the targeting.
+
+    max_devices is only described, not applied: inline sends limit the query, the
+    runner limits what is left after a resume. Raises ValueError for invalid targeting.
+    """
+    query = db.query(models.Device).filter(models.Device.fcm_token.is_not(None))
+    targeting_method = f"audience:{targeting.audience}"
+    joined_users = False
+
+    if targeting.audience == "all":
+        pass  # No additional filtering
+
+    elif targeting.audience == "platform":
+        if not targeting.platform:
+            raise ValueError("Platform required for platform targeting")
+        query = query.filter(models.Device.platform == targeting.platform)
+        targeting_method += f",platform:{targeting.platform}"
+
+    elif targeting.audience == "verified_users":
+        # join with users table to filter verified users
+        query = query.join(models.User).filter(
+            or_(
+                models.User.is_email_verified == True,
+                models.User.is_phone_verified == True
+            )
+        )
+        joined_users = True
+        targeting_method += ",verified_only"
+
+    elif targeting.audience == "role":
+        if not targeting.user_role:
+            raise ValueError("User role required for role targeting")
+        query = query.join(models.User).filter(models.User.role == targeting.user_role)
+        joined_users = True
+        targeting_method += f",role:{targeting.user_role}"
+
+    else:
+        raise ValueError(f"Unsupported audience: {targeting.audience}")
+
+    # apply additional filters
+    if targeting.verified_only and targeting.audience != "verified_users":
+        if not joined_users:
+            query = query.join(models.User)
+        query = query.filter(
+            or_(
+                models.User.is_email_verified == True,
+                models.User.is_phone_verified == True
+            )
+        )
+        targeting_method += ",verified_only"
+
+    if targeting.platform and targeting.audience != "platform":
+        query = query.filter(models.Device.platform == targeting.platform)
+        targeting_method += f",platform:{targeting.platform}"
+
+    if targeting.max_devices:
+        targeting_method += f",limit:{targeting.max_devices}"
+
+    return query, targeting_method
+
+
+def count_targets(db: Session, targeting: AdminPushTargeting) -> int:
+    query, _ = build_target_query(db, targeting)
+    total = query.count()
+    return min(total, targeting.max_devices) if targeting.max_devices else total
+
+
+def create_campaign(
+    db: Session,
+    *,
+    title: str,
+    body: str,
+    targeting: AdminPushTargeting,
+    data=None,
+    priority: str = "normal",
+    ttl: Optional[int] = None,
+    created_by: Optional[int] = None,
+) -> models.PushCampaign:
+    """store a queued campaign (total = devices targeted right now) and wake this worker's runner."""
+    _, targeting_method = build_target_query(db, targeting)
+    campaign = models.PushCampaign(
+        title=title,
+        body=body,
+        data=data,
+        priority=priority,
+        ttl=ttl,
+        targeting=targeting.model_dump(),
+        targeting_method=targeting_method,
+        status="queued",
+        total=count_targets(db, targeting),
+        sent=0,
+        failed=0,
+        pruned=0,
+        last_device_id=0,
+        created_by=created_by,
+    )
+    db.add(campaign)
+    db.commit()
+    db.refresh(campaign)
+    logger.info(f"Queued push campaign {campaign.id} for {campaign.total} devices ({targeting_method})")
+    campaign_runner.wake()
+    return campaign
+
+
+class CampaignRunner(JobRunner):
+    model = models.PushCampaign
+    thread_name = "push-campaigns"
+
+    def enabled(self) -> bool:
+        return settings.PUSH_CAMPAIGNS_WORKER_ENABLED
+
+    def poll_sec(self) -> float:
+        return settings.PUSH_CAMPAIGN_POLL_SEC
+
+    def stale_sec(self) -> float:
+        return settings.PUSH_CAMPAIGN_STALE_SEC
+
+    def _execute(self, campaign_id: int) -> None:
+        with SessionLocal() as db:
+            campaign = db.get(models.PushCampaign, campaign_id)
+            targeting = AdminPushTargeting(**campaign.targeting)
+            payload = dict(title=campaign.title, body=campaign.body, data=campaign.data,
+                           priority=campaign.priority, ttl=campaign.ttl)
+            processed = campaign.sent + campaign.failed
+            query, _ = build_target_query(db, targeting)
+            query = query.with_entities(models.Device.id, models.Device.fcm_token).filter(
+                models.Device.id > campaign.last_device_id
+            ).order_by(models.Device.id)
+            if targeting.max_devices:
+                remaining = targeting.max_devices - processed
+                if remaining <= 0:
+                    self._finish(campaign_id, "completed")
+                    return
+                query = query.limit(remaining)
+
+            # server-side cursor: PUSH_CAMPAIGN_CHUNK rows per fetch, held open for the whole campaign
+            result = db.execute(query.statement, execution_options={"yield_per": settings.PUSH_CAMPAIGN_CHUNK})
+            for rows in result.partitions():
+                tokens = [token for _, token in rows if token]
+                last_device_id = rows[-1][0]
+                started = time.perf_counter()
+                outcome = send_batch(tokens=tokens, **payload) if tokens else {"status": "skipped"}
+                if outcome.get("status") == "error" or outcome.get("reason") == "fcm_not_configured":
+                    # nothing checkpointed for this chunk: a resume sends it again
+                    self._finish(campaign_id, "failed", error=outcome.get("error") or outcome.get("reason"))
+                    return
+                sent = outcome.get("success_count", 0)
+                failed = outcome.get("failure_count", 0)
+                if not self._checkpoint(campaign_id, sent, failed, outcome.get("dead_tokens", []), last_device_id):
+                    logger.info(f"Push campaign {campaign_id} was cancelled")
+                    return
+                self.chunks_sent += 1
+                logger.info(
+                    f"Push campaign {campaign_id}: chunk of {len(tokens)} up to device {last_device_id} "
+                    f"({sent} sent, {failed} failed) in {time.perf_counter() - started:.1f}s"
+                )
+        self._finish(campaign_id, "completed")
+
+    def _checkpoint(self, campaign_id: int, sent: int, failed: int, dead_tokens, last_device_id: int) -> bool:
+        """record a sent chunk; False if the campaign was cancelled meanwhile."""
+        with SessionLocal() as db:
+            pruned = prune_dead_tokens(db, dead_tokens) if dead_tokens else 0
+            campaign = self._lock_job(db, campaign_id)
+            campaign.sent += sent
+            campaign.failed += failed
+            campaign.pruned += pruned
+            campaign.last_device_id = last_device_id
+            running = campaign.status == "running"
+            db.commit()
+            return running
+
+
+# global instance
+campaign_runner = CampaignRunner()
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import Row, String, any_, bindparam, case, delete, func, or_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+def prune_dead_tokens(db: Session, tokens: Iterable[str]) -> int:
+    """delete devices whose FCM token was rejected for good, in one statement; returns rows deleted.
+
+    The tokens go in as a single array parameter, so a campaign that found 50k dead
+    tokens still runs one DELETE. Commits on the given session.
+    """
+    tokens = sorted(set(tokens))
+    if not tokens:
+        return 0
+    stmt = delete(models.Device).where(
+        models.Device.fcm_token == any_(bindparam("tokens", tokens, type_=ARRAY(String)))
+    )
+    deleted = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+    db.commit()
+    logger.info(f"Pruned {deleted} devices with dead FCM tokens ({len(tokens)} reported)")
+    return deleted
+
+
+def upsert_devices(db: Session, registrations: Sequence[dict]) -> List[Row]:
+    """register devices by FCM token in one INSERT ... ON CONFLICT (fcm_token) DO UPDATE; commits.
+
+    Each registration has fcm_token, platform, user_id and locale (None keeps the
+    stored user/locale, so an anonymous launch does not log the device out). A
+    device whose platform, user or locale changed gets topics_synced_at cleared.
+    Returns (id, platform, fcm_token, topics_synced_at) per distinct token.
+    """
+    # ON CONFLICT cannot update the same row twice in one statement: the last registration of a token wins
+    by_token = {registration["fcm_token"]: registration for registration in registrations}
+    now = datetime.utcnow()
+    devices = models.Device.__table__
+    stmt = pg_insert(devices).values([
+        {
+            "fcm_token": registration["fcm_token"],
+            "platform": registration["platform"],
+            "user_id": registration.get("user_id"),
+            "locale": registration.get("locale"),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for registration in by_token.values()
+    ])
+    # in SET, devices.* is the stored row and excluded.* the row we tried to insert
+    user_id = func.coalesce(stmt.excluded.user_id, devices.c.user_id)
+    locale = func.coalesce(stmt.excluded.locale, devices.c.locale)
+    changed = or_(
+        devices.c.platform != stmt.excluded.platform,
+        devices.c.user_id.is_distinct_from(user_id),
+        devices.c.locale.is_distinct_from(locale),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_devices_fcm_token",
+        set_={
+            "platform": stmt.excluded.platform,
+            "user_id": user_id,
+            "locale": locale,
+            "updated_at": stmt.excluded.updated_at,
+            "topics_synced_at": case((changed, None), else_=devices.c.topics_synced_at),
+        },
+    ).returning(devices.c.id, devices.c.platform, devices.c.fcm_token, devices.c.topics_synced_at)
+    rows = db.execute(stmt).all()
+    db.commit()
+    return rows
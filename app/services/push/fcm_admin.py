@@ -1,26 +1,42 @@
 import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict, List, Union
 from datetime import datetime, timedelta
 
-try:
-    import firebase_admin  # type: ignore
-    from firebase_admin import credentials, messaging  # type: ignore
-except Exception:  # pragma: no cover
-    firebase_admin = None
-    credentials = None
-    messaging = None
+from app.core.config import settings
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
+from app.core.ratelimit import SharedTokenBucket
 
 logger = logging.getLogger(__name__)
 _initialized = False
 
+# set by _ensure_init() on first use
+firebase_admin = None
+credentials = None
+messaging = None
+
+
+def _load_firebase():
+    import firebase_admin  # type: ignore
+    import firebase_admin.exceptions  # type: ignore
+    from firebase_admin import credentials, messaging  # type: ignore
+    return firebase_admin, credentials, messaging
+
+
+_firebase = integrations.register("firebase_admin", "firebase_admin", _load_firebase)
+
 
 def _ensure_init():
-    global _initialized
+    global _initialized, firebase_admin, credentials, messaging
     if _initialized:
         return
-    if firebase_admin is None or credentials is None:
+    sdk = _firebase.get()
+    if sdk is None:
         return
+    firebase_admin, credentials, messaging = sdk
     try:
         if not firebase_admin._apps:  # type: ignore
             cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -36,7 +52,7 @@ def _ensure_init():
 
 def health_check() -> Dict[str, str]:
     """check FCM integration health and config status."""
-    if firebase_admin is None or credentials is None:
+    if not _firebase.installed():
         return {"status": "unavailable", "reason": "firebase_library_not_installed"}
     
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -97,7 +113,8 @@ def send_to_token(
             android=android_config,
         )
         
-        message_id = messaging.send(msg)
+        with integration_call("fcm", "send"):
+            message_id = messaging.send(msg)
         logger.info(f"FCM message sent successfully: {message_id}")
         return {"status": "sent", "id": message_id, "timestamp": datetime.utcnow().isoformat()}
         
@@ -115,6 +132,58 @@ def send_to_token(
         return {"status": "error", "reason": "send_failed", "error": str(e)}
 
 
+def _rate_limiter() -> SharedTokenBucket:
+    """one budget per Firebase project, shared by every batch in every worker."""
+    project = settings.FCM_PROJECT_ID or "default"
+    return SharedTokenBucket(f"fcm:{project}", settings.FCM_RATE_LIMIT_PER_SEC)
+
+
+def _is_dead_token_error(exc, chunk_failed_invalid: bool) -> bool:
+    """the token will never work again: unregistered, from another project, or malformed.
+
+    INVALID_ARGUMENT is also what FCM returns for a bad payload; when every token in the
+    chunk failed with it the message is at fault, not the tokens.
+    """
+    if isinstance(exc, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return True
+    return isinstance(exc, firebase_admin.exceptions.InvalidArgumentError) and not chunk_failed_invalid
+
+
+def _send_chunk(chunk: List[str], title: str, body: str, data: Dict[str, str], android_config) -> dict:
+    multicast = messaging.MulticastMessage(
+        tokens=chunk,
+        notification=messaging.Notification(title=title, body=body),
+        data=data,
+        android=android_config,
+    )
+    # send_multicast was removed in firebase_admin 7
+    send = getattr(messaging, "send_each_for_multicast", None) or messaging.send_multicast
+    _rate_limiter().acquire(len(chunk))
+    try:
+        with integration_call("fcm", "send_multicast") as call:
+            response = send(multicast)
+            if not getattr(response, "success_count", 0):
+                call.failed()
+    except Exception as e:
+        logger.error(f"FCM multicast of {len(chunk)} tokens failed: {str(e)}")
+        return {"sent": 0, "message_ids": [], "failed": [{"token": t, "error": str(e)} for t in chunk], "dead": []}
+
+    results = list(response.responses or [])
+    invalid = firebase_admin.exceptions.InvalidArgumentError
+    chunk_failed_invalid = bool(results) and all(isinstance(r.exception, invalid) for r in results)
+    message_ids: List[str] = []
+    failed: List[Dict[str, str]] = []
+    dead: List[str] = []
+    for token, res in zip(chunk, results):
+        if res.success:
+            message_ids.append(res.message_id or "")
+            continue
+        failed.append({"token": token, "error": str(res.exception)})
+        if _is_dead_token_error(res.exception, chunk_failed_invalid):
+            dead.append(token)
+    return {"sent": len(message_ids), "message_ids": message_ids, "failed": failed, "dead": dead}
+
+
 def send_batch(
     tokens: List[str],
     title: str,
@@ -127,6 +196,12 @@ def send_batch(
     """
     Send push notifications to multiple FCM tokens in batches.
     
+    Chunks of up to 500 tokens are sent concurrently by FCM_SEND_CONCURRENCY threads,
+    throttled to FCM_RATE_LIMIT_PER_SEC messages per Firebase project across all
+    workers (rate_limit_buckets). Tokens FCM rejected for good (unregistered, other
+    project, malformed) come back in "dead_tokens" so the caller can delete them
+    (see prune_dead_tokens).
+    
     Args:
         tokens: List of FCM registration tokens
         title: Notification title
@@ -137,7 +212,7 @@ def send_batch(
         batch_size: Maximum batch size (FCM limit is 500)
     
     Returns:
-        Dict with overall status, success/failure counts, and detailed results
+        Dict with overall status, success/failure counts, dead tokens and detailed results
     """
     _ensure_init()
     if messaging is None or not _initialized:
@@ -150,10 +225,10 @@ def send_batch(
     # limit batch size to FCM's maximum
     batch_size = min(batch_size, 500)
     total_sent = 0
-    total_failed = 0
     message_ids: List[str] = []
     failed_tokens: List[Dict[str, str]] = []
-    all_results: List[Dict[str, Union[str, bool]]] = []
+    dead_tokens: List[str] = []
+    started = time.perf_counter()
     
     try:
         # build Android config (Android-only)
@@ -161,53 +236,30 @@ def send_batch(
             priority=priority,
             ttl=timedelta(seconds=ttl) if ttl else None,
         )
+        payload = {k: str(v) for k, v in (data or {}).items()}
+        chunks = [tokens[i:i + batch_size] for i in range(0, len(tokens), batch_size)]
         
-        # process tokens in batches
-        for i in range(0, len(tokens), batch_size):
-            batch_tokens = tokens[i:i + batch_size]
-            
-            # create multicast message for this batch
-            multicast = messaging.MulticastMessage(
-                tokens=batch_tokens,
-                notification=messaging.Notification(title=title, body=body),
-                data={k: str(v) for k, v in (data or {}).items()},
-                android=android_config,
-            )
-            
-            try:
-                # send batch
-                response = messaging.send_multicast(multicast)
-                # compute success/failure counts robustly and cap to batch size
-                if hasattr(response, "responses") and response.responses is not None:
-                    succ = sum(1 for r in response.responses if getattr(r, "success", False))
-                else:
-                    succ = min(getattr(response, "success_count", 0), len(batch_tokens))
-                fail = len(batch_tokens) - succ
-                total_sent += succ
-                total_failed += fail
-                
-                # collect individual results
-                for j, res in enumerate(response.responses):
-                    if res.success:
-                        message_ids.append(getattr(res, "message_id", None) or "")
-                    else:
-                        err = str(getattr(res, "exception", "unknown error"))
-                        if hasattr(messaging, "UnregisteredError") and isinstance(getattr(res, "exception", None), messaging.UnregisteredError):
-                            logger.warning(f"Unregistered token in batch: {batch_tokens[j][:20]}...")
-                        failed_tokens.append({"token": batch_tokens[j], "error": err})
-                
-                logger.info(f"Batch {i//batch_size + 1} sent: {response.success_count}/{len(batch_tokens)}")
-                
-            except Exception as e:
-                logger.error(f"Batch {i//batch_size + 1} failed: {str(e)}")
-                total_failed += len(batch_tokens)
-                for token in batch_tokens:
-                    failed_tokens.append({
-                        "token": token,
-                        "error": str(e)
-                    })
+        if len(chunks) == 1:
+            # a single user's devices: no pool to spin up
+            results = [_send_chunk(chunks[0], title, body, payload, android_config)]
+        else:
+            # every chunk fans out to one HTTP request per token inside the SDK, so keep this small
+            workers = max(1, min(settings.FCM_SEND_CONCURRENCY, len(chunks)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fcm-send") as executor:
+                futures = [executor.submit(_send_chunk, chunk, title, body, payload, android_config) for chunk in chunks]
+                results = [future.result() for future in as_completed(futures)]
+        for result in results:
+            total_sent += result["sent"]
+            message_ids.extend(result["message_ids"])
+            failed_tokens.extend(result["failed"])
+            dead_tokens.extend(result["dead"])
         
-        logger.info(f"Batch send completed: {total_sent} sent, {total_failed} failed")
+        total_failed = len(tokens) - total_sent
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Batch send completed: {total_sent} sent, {total_failed} failed, {len(dead_tokens)} dead tokens, "
+            f"{len(chunks)} chunks in {elapsed:.1f}s"
+        )
         status = "sent" if total_failed == 0 else ("partial" if total_sent > 0 else "failed")
         return {
             "status": status,
@@ -215,6 +267,8 @@ def send_batch(
             "failure_count": total_failed,
             "message_ids": [mid for mid in message_ids if mid],
             "failed_tokens": failed_tokens,
+            "dead_tokens": dead_tokens,
+            "duration_ms": round(elapsed * 1000, 1),
             "timestamp": datetime.utcnow().isoformat(),
         }
         
@@ -270,7 +324,8 @@ def send_to_topic(
             android=android_config,
         )
         
-        message_id = messaging.send(msg)
+        with integration_call("fcm", "send"):
+            message_id = messaging.send(msg)
         logger.info(f"FCM topic message sent successfully to '{topic}': {message_id}")
         return {"status": "sent", "id": message_id, "topic": topic, "timestamp": datetime.utcnow().isoformat()}
         
@@ -299,18 +354,21 @@ def subscribe_to_topic(tokens: List[str], topic: str) -> Dict[str, Union[str, in
         return {"status": "success", "success_count": 0, "failure_count": 0}
     
     try:
-        response = messaging.subscribe_to_topic(tokens, topic)
+        with integration_call("fcm", "subscribe_topic"):
+            response = messaging.subscribe_to_topic(tokens, topic)
         # determine status
         succ = getattr(response, "success_count", 0)
         fail = getattr(response, "failure_count", 0)
         status = "success" if fail == 0 else ("partial" if succ > 0 else "failed")
         logger.info(f"Topic subscription to '{topic}': {succ}/{len(tokens)} successful")
         
+        errors = getattr(response, "errors", None) or []
         return {
             "status": status,
             "success_count": succ,
             "failure_count": fail,
-            "errors": [str(error.reason) for error in getattr(response, "errors", [])] if getattr(response, "errors", None) else []
+            "errors": [str(error.reason) for error in errors],
+            "failed_tokens": [{"token": tokens[error.index], "error": str(error.reason)} for error in errors],
         }
         
     except Exception as e:
@@ -338,7 +396,8 @@ def unsubscribe_from_topic(tokens: List[str], topic: str) -> Dict[str, Union[str
         return {"status": "success", "unsubscribed": 0, "failed": 0}
     
     try:
-        response = messaging.unsubscribe_from_topic(tokens, topic)
+        with integration_call("fcm", "unsubscribe_topic"):
+            response = messaging.unsubscribe_from_topic(tokens, topic)
         logger.info(f"Topic unsubscription from '{topic}': {response.success_count}/{len(tokens)} successful")
         
         return {
@@ -348,7 +407,8 @@ def unsubscribe_from_topic(tokens: List[str], topic: str) -> Dict[str, Union[str
             "failed": response.failure_count,
             "total": len(tokens),
             "timestamp": datetime.utcnow().isoformat(),
-            "errors": [str(error.reason) for error in response.errors] if response.errors else []
+            "errors": [str(error.reason) for error in response.errors] if response.errors else [],
+            "failed_tokens": [{"token": tokens[error.index], "error": str(error.reason)} for error in response.errors or []],
         }
         
     except Exception as e:
@@ -0,0 +1,190 @@
+"""
+Coalesced order push notifications.
+
+Order endpoints (creation, admin and courier status updates) call
+notify_order_status() / order_notifier.notify() instead of sending to FCM. The
+notifier keeps the latest message per order for PUSH_COALESCE_WINDOW_SEC after
+the first update, so NEW -> COOKING -> ON_WAY clicked through in a second turns
+into one "on the way" notification. The "push-notify" thread then:
+
+- loads the tokens of every user with a due notification in one query
+- sends each order's message to all of its user's devices in one multicast call
+- skips a message identical to the last one sent for that order (COOKING ->
+  ON_WAY -> COOKING within the window sends nothing new)
+- prunes tokens FCM rejected for good
+
+The state is per worker process: two updates to the same order handled by
+different workers are not coalesced with each other. Pending notifications are
+flushed on shutdown.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app import models
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.push.device_tokens import prune_dead_tokens
+from app.services.push.fcm_admin import send_batch
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {
+    "NEW": "принят",
+    "COOKING": "готовится",
+    "ON_WAY": "в пути",
+    "DELIVERED": "доставлен",
+    "CANCELLED": "отменен"
+}
+
+
+@dataclass
+class _Pending:
+    user_id: int
+    title: str
+    body: str
+    data: Dict[str, str] = field(default_factory=dict)
+    due: float = 0.0
+    updates: int = 1
+
+
+class OrderNotifier:
+    def __init__(self, sent_memory: int = 10000):
+        self._cond = threading.Condition()
+        self._pending: Dict[int, _Pending] = {}
+        # order id -> body of the last notification sent for it; the push-notify thread
+        # and flush() on the shutdown thread both send, so it is only touched under _cond
+        self._last_sent: "OrderedDict[int, str]" = OrderedDict()
+        self._sent_memory = sent_memory
+        self._thread: Optional[threading.Thread] = None
+        self.notified = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.sent = 0
+        self.fcm_calls = 0
+        self.errors = 0
+
+    def notify(self, order_id: int, user_id: Optional[int], title: str, body: str, data: Optional[Dict[str, str]] = None) -> None:
+        """queue a notification for the order's user; replaces one still waiting for the same order."""
+        if user_id is None:
+            return
+        with self._cond:
+            self._ensure_started()
+            self.notified += 1
+            pending = self._pending.get(order_id)
+            if pending is not None:
+                # keep the original due time: a stream of updates still goes out after one window
+                pending.title, pending.body, pending.data = title, body, dict(data or {})
+                pending.updates += 1
+                self.coalesced += 1
+                return
+            self._pending[order_id] = _Pending(
+                user_id=user_id, title=title, body=body, data=dict(data or {}),
+                due=time.monotonic() + settings.PUSH_COALESCE_WINDOW_SEC,
+            )
+            self._cond.notify()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="push-notify", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = [order_id for order_id, pending in self._pending.items() if pending.due <= now]
+                    if due:
+                        batch = {order_id: self._pending.pop(order_id) for order_id in due}
+                        break
+                    timeout = min(p.due for p in self._pending.values()) - now if self._pending else None
+                    self._cond.wait(timeout)
+            try:
+                self._send(batch)
+            except Exception:
+                self.errors += 1
+                logger.exception("Failed to send order notifications")
+
+    def flush(self) -> None:
+        """send everything still pending now (shutdown hook)."""
+        with self._cond:
+            batch, self._pending = self._pending, {}
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: Dict[int, _Pending]) -> None:
+        user_ids = {pending.user_id for pending in batch.values()}
+        tokens_by_user: Dict[int, List[str]] = defaultdict(list)
+        with SessionLocal() as db:
+            rows = db.query(models.Device.user_id, models.Device.fcm_token).filter(
+                models.Device.user_id.in_(user_ids), models.Device.fcm_token.is_not(None)
+            ).all()
+        for user_id, token in rows:
+            tokens_by_user[user_id].append(token)
+
+        dead_tokens: List[str] = []
+        for order_id, pending in batch.items():
+            with self._cond:
+                duplicate = self._last_sent.get(order_id) == pending.body
+                if duplicate:
+                    self.duplicates += 1
+            if duplicate:
+                continue
+            tokens = tokens_by_user.get(pending.user_id)
+            if not tokens:
+                continue
+            result = send_batch(tokens=tokens, title=pending.title, body=pending.body, data=pending.data)
+            self.fcm_calls += 1
+            if result.get("status") in ("sent", "partial"):
+                self.sent += 1
+                self._remember(order_id, pending.body)
+            dead_tokens.extend(result.get("dead_tokens", []))
+            if pending.updates > 1:
+                logger.debug(f"Order {order_id}: {pending.updates} updates sent as one notification")
+        if dead_tokens:
+            with SessionLocal() as db:
+                prune_dead_tokens(db, dead_tokens)
+
+    def _remember(self, order_id: int, body: str) -> None:
+        with self._cond:
+            self._last_sent[order_id] = body
+            self._last_sent.move_to_end(order_id)
+            while len(self._last_sent) > self._sent_memory:
+                self._last_sent.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "notified": self.notified,
+            "coalesced": self.coalesced,
+            "duplicates": self.duplicates,
+            "sent": self.sent,
+            "fcm_calls": self.fcm_calls,
+            "errors": self.errors,
+        }
+
+
+def notify_order_status(order: models.Order, status: str) -> None:
+    """queue the "order status changed" push for the order's customer."""
+    order_notifier.notify(
+        order.id,
+        order.user_id,
+        title="Статус заказа изменен",
+        body=f"Заказ #{order.number} {STATUS_TEXT.get(status, status)}",
+        data={
+            "order_id": str(order.id),
+            "order_number": order.number,
+            "status": status,
+            "type": "order_status_update"
+        },
+    )
+
+
+# global instance
+order_notifier = OrderNotifier()
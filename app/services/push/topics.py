@@ -0,0 +1,183 @@
+"""
+FCM topic subscriptions for the admin push audiences.
+
+Every device is subscribed to one topic per attribute admin targeting selects on,
+so "all android devices" or "all couriers" is a single send_to_topic call instead
+of a multicast over every token:
+
+- all                  every device
+- platform-<platform>  android|ios|web
+- role-<role>          devices of a signed-in user
+- locale-<locale>      when the app sent one at registration
+
+Device.topics records what the token is subscribed to. Registration, role changes
+and user deletion clear Device.topics_synced_at, and a background task subscribes
+and unsubscribes the difference: grouped by topic, TOPIC_BATCH tokens per FCM call
+(the API limit). Tokens FCM does not know are deleted like dead send tokens.
+
+/admin/push/send only switches to topic delivery when no matching device is waiting
+for a sync, so devices registered before subscriptions existed (backfill with
+POST /admin/push/topics/sync) or whose sync failed are never skipped.
+"""
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.admin import AdminPushTargeting
+from app.services.push.campaigns import build_target_query
+from app.services.push.device_tokens import prune_dead_tokens
+from app.services.push.fcm_admin import subscribe_to_topic, unsubscribe_from_topic
+
+logger = logging.getLogger(__name__)
+
+# instance-id API limit per batchAdd/batchRemove call
+TOPIC_BATCH = 1000
+
+# per-token topic errors that mean the token itself is gone or malformed
+DEAD_TOKEN_REASONS = {"NOT_FOUND", "INVALID_ARGUMENT"}
+
+_INVALID_TOPIC_CHARS = re.compile(r"[^a-zA-Z0-9\-_.~%]")
+
+
+def topic_name(kind: str, value: Optional[str] = None) -> str:
+    name = kind if value is None else f"{kind}-{value}"
+    return settings.FCM_TOPIC_PREFIX + _INVALID_TOPIC_CHARS.sub("_", name.lower())
+
+
+def normalize_locale(locale: Optional[str]) -> Optional[str]:
+    """'ru-RU' / 'kz_KZ' / 'EN' -> 'ru' / 'kz' / 'en'."""
+    if not locale:
+        return None
+    return locale.strip().lower().replace("_", "-").split("-")[0][:8] or None
+
+
+def desired_topics(device: models.Device, role: Optional[str]) -> List[str]:
+    topics = {topic_name("all"), topic_name("platform", device.platform)}
+    if role:
+        topics.add(topic_name("role", role))
+    if device.locale:
+        topics.add(topic_name("locale", device.locale))
+    return sorted(topics)
+
+
+def mark_user_devices_stale(db: Session, user_id: int) -> List[int]:
+    """flag a user's devices for a sync (role changed, user deleted); returns their ids. Does not commit."""
+    device_ids = [device_id for (device_id,) in db.query(models.Device.id).filter(models.Device.user_id == user_id)]
+    if device_ids:
+        db.execute(
+            update(models.Device).where(models.Device.id.in_(device_ids)).values(topics_synced_at=None),
+            execution_options={"synchronize_session": False},
+        )
+    return device_ids
+
+
+def sync_device_topics(db: Session, devices: Iterable[models.Device]) -> dict:
+    """subscribe/unsubscribe the devices so their topics match desired_topics; commits."""
+    devices = [device for device in devices if device.fcm_token]
+    user_ids = {device.user_id for device in devices if device.user_id}
+    roles = dict(db.query(models.User.id, models.User.role).filter(models.User.id.in_(user_ids))) if user_ids else {}
+
+    plan = []
+    subscribe: Dict[str, List[str]] = defaultdict(list)
+    unsubscribe: Dict[str, List[str]] = defaultdict(list)
+    for device in devices:
+        want = set(desired_topics(device, roles.get(device.user_id)))
+        have = set(device.topics or [])
+        plan.append((device, want, have))
+        for topic in want - have:
+            subscribe[topic].append(device.fcm_token)
+        for topic in have - want:
+            unsubscribe[topic].append(device.fcm_token)
+
+    failed: Dict[str, Set[str]] = defaultdict(set)  # token -> topics whose change did not go through
+    dead: Set[str] = set()
+    calls = 0
+    for changes, call in ((subscribe, subscribe_to_topic), (unsubscribe, unsubscribe_from_topic)):
+        for topic, tokens in changes.items():
+            for i in range(0, len(tokens), TOPIC_BATCH):
+                chunk = tokens[i:i + TOPIC_BATCH]
+                result = call(chunk, topic)
+                calls += 1
+                if result.get("status") in ("skipped", "error"):
+                    for token in chunk:
+                        failed[token].add(topic)
+                    continue
+                for failure in result.get("failed_tokens", []):
+                    failed[failure["token"]].add(topic)
+                    if failure.get("error") in DEAD_TOKEN_REASONS:
+                        dead.add(failure["token"])
+
+    now = datetime.utcnow()
+    synced = 0
+    for device, want, have in plan:
+        not_changed = failed.get(device.fcm_token, set())
+        # wanted topics that were already there or went through, plus removals that failed
+        device.topics = sorted({t for t in want if t in have or t not in not_changed} | ((have - want) & not_changed))
+        if not not_changed:
+            device.topics_synced_at = now
+            synced += 1
+    db.commit()
+
+    pruned = prune_dead_tokens(db, dead) if dead else 0
+    stats = {"devices": len(plan), "synced": synced, "calls": calls, "pruned": pruned}
+    if calls:
+        logger.info(f"Synced FCM topics: {stats}")
+    return stats
+
+
+def sync_devices(device_ids: List[int]) -> dict:
+    """background-task entry point: sync the given devices in a session of its own."""
+    with SessionLocal() as db:
+        devices = db.query(models.Device).filter(models.Device.id.in_(device_ids)).all()
+        return sync_device_topics(db, devices)
+
+
+def sync_pending_devices(batch_size: int = TOPIC_BATCH) -> dict:
+    """sync every device still flagged for a sync (backfill), batch_size devices at a time."""
+    totals = {"devices": 0, "synced": 0, "calls": 0, "pruned": 0}
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            devices = db.query(models.Device).filter(
+                models.Device.topics_synced_at.is_(None),
+                models.Device.fcm_token.is_not(None),
+                models.Device.id > last_id,
+            ).order_by(models.Device.id).limit(batch_size).all()
+            if not devices:
+                break
+            last_id = devices[-1].id
+            stats = sync_device_topics(db, devices)
+            for key in totals:
+                totals[key] += stats[key]
+    logger.info(f"FCM topic backfill finished: {totals}")
+    return totals
+
+
+def topic_for_targeting(db: Session, targeting: AdminPushTargeting) -> Optional[str]:
+    """the topic that reaches exactly this audience, or None to send per token."""
+    if not settings.PUSH_TOPIC_FANOUT or targeting.max_devices or targeting.verified_only:
+        return None
+    if targeting.audience == "all":
+        topic = topic_name("platform", targeting.platform) if targeting.platform else topic_name("all")
+    elif targeting.audience == "platform" and targeting.platform:
+        topic = topic_name("platform", targeting.platform)
+    elif targeting.audience == "role" and targeting.user_role and not targeting.platform:
+        topic = topic_name("role", targeting.user_role)
+    else:
+        return None
+
+    # every matching device must be subscribed, otherwise the topic misses some of them
+    query, _ = build_target_query(db, targeting)
+    pending = query.with_entities(models.Device.id).filter(models.Device.topics_synced_at.is_(None)).limit(1).first()
+    if pending is not None:
+        logger.info(f"Not using topic {topic}: devices are waiting for a topic sync")
+        return None
+    return topic
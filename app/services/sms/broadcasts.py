@@ -0,0 +1,182 @@
+"""
+SMS broadcasts as resumable background jobs.
+
+POST /admin/push/send-sms stores an SmsBroadcast row and returns right away; the
+"sms-broadcasts" runner thread in each worker (app.core.jobs) claims it and sends:
+
+- recipients: phone-verified users, SMS_BROADCAST_CHUNK at a time by keyset on
+              user id (a fresh query per chunk: at Twilio rates a broadcast runs
+              for hours, too long to hold a cursor open)
+- sending:    SMS_SEND_CONCURRENCY threads share one token bucket of
+              SMS_RATE_LIMIT_PER_SEC, the messages/sec Twilio allows the account
+              or sender (extra requests are queued by Twilio or rejected with 429);
+              the bucket lives in rate_limit_buckets, so broadcasts running on
+              several workers at once still add up to that rate
+- retries:    throttling (429 / 20429), 5xx and network errors are retried up to
+              SMS_MAX_ATTEMPTS times with exponential backoff and jitter; other
+              errors (invalid or unreachable number) fail the recipient at once
+- checkpoint: each chunk's per-recipient rows are bulk-inserted together with the
+              counters and last_user_id in one transaction, so a resumed broadcast
+              starts after last_user_id and never records a recipient twice
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.core.jobs import JobRunner
+from app.core.ratelimit import SharedTokenBucket
+from app.db.session import SessionLocal
+from app.services.sms.twilio_sender import send_sms
+
+logger = logging.getLogger(__name__)
+
+# send_sms reasons that fail every recipient the same way: stop the broadcast instead
+CONFIG_ERRORS = {"sms_not_configured", "missing_from_number"}
+
+# Twilio error codes worth retrying: 20429 too many requests, 20500/20503 internal/unavailable
+RETRYABLE_TWILIO_CODES = {20429, 20500, 20503}
+
+
+def recipients_query(db: Session, audience: str = "all"):
+    """phone-verified users, the only audience supported so far."""
+    if audience != "all":
+        raise ValueError(f"Unsupported audience: {audience}")
+    return db.query(models.User).filter(
+        models.User.phone.is_not(None),
+        models.User.is_phone_verified.is_(True),
+    )
+
+
+def create_broadcast(db: Session, *, message: str, audience: str = "all", created_by: Optional[int] = None) -> models.SmsBroadcast:
+    """store a queued broadcast (total = recipients right now) and wake this worker's runner."""
+    broadcast = models.SmsBroadcast(
+        message=message,
+        audience=audience,
+        status="queued",
+        total=recipients_query(db, audience).count(),
+        sent=0,
+        failed=0,
+        last_user_id=0,
+        created_by=created_by,
+    )
+    db.add(broadcast)
+    db.commit()
+    db.refresh(broadcast)
+    logger.info(f"Queued SMS broadcast {broadcast.id} for {broadcast.total} recipients")
+    broadcast_runner.wake()
+    return broadcast
+
+
+def is_retryable(result: dict) -> bool:
+    if result.get("reason") == "send_failed":
+        return True  # network error or timeout before Twilio answered
+    http_status = result.get("http_status") or 0
+    return http_status == 429 or http_status >= 500 or result.get("code") in RETRYABLE_TWILIO_CODES
+
+
+def deliver(phone: str, message: str, limiter: SharedTokenBucket) -> dict:
+    """send one SMS with retries; returns the last send_sms result plus "attempts"."""
+    attempt = 0
+    while True:
+        attempt += 1
+        limiter.acquire()
+        result = send_sms(phone, message)
+        if result.get("status") == "sent" or attempt >= settings.SMS_MAX_ATTEMPTS or not is_retryable(result):
+            return {**result, "attempts": attempt}
+        delay = settings.SMS_RETRY_BACKOFF_SEC * 2 ** (attempt - 1)
+        time.sleep(delay + random.uniform(0, delay))
+
+
+class BroadcastRunner(JobRunner):
+    model = models.SmsBroadcast
+    thread_name = "sms-broadcasts"
+
+    def __init__(self):
+        super().__init__()
+        self.limiter: Optional[SharedTokenBucket] = None
+
+    def enabled(self) -> bool:
+        return settings.SMS_BROADCASTS_WORKER_ENABLED
+
+    def poll_sec(self) -> float:
+        return settings.SMS_BROADCAST_POLL_SEC
+
+    def stale_sec(self) -> float:
+        return settings.SMS_BROADCAST_STALE_SEC
+
+    def _execute(self, broadcast_id: int) -> None:
+        with SessionLocal() as db:
+            broadcast = db.get(models.SmsBroadcast, broadcast_id)
+            message, audience, last_user_id = broadcast.message, broadcast.audience, broadcast.last_user_id
+        if self.limiter is None or self.limiter.rate != settings.SMS_RATE_LIMIT_PER_SEC:
+            self.limiter = SharedTokenBucket("twilio_sms", settings.SMS_RATE_LIMIT_PER_SEC)
+
+        with ThreadPoolExecutor(max_workers=max(1, settings.SMS_SEND_CONCURRENCY), thread_name_prefix="sms-send") as executor:
+            while True:
+                with SessionLocal() as db:
+                    recipients = recipients_query(db, audience).with_entities(
+                        models.User.id, models.User.phone
+                    ).filter(models.User.id > last_user_id).order_by(models.User.id).limit(settings.SMS_BROADCAST_CHUNK).all()
+                if not recipients:
+                    break
+                started = time.perf_counter()
+                futures = [executor.submit(deliver, r.phone, message, self.limiter) for r in recipients]
+                # a chunk can take minutes at low rate limits; keep the heartbeat fresh meanwhile
+                while wait(futures, timeout=self.stale_sec() / 3).not_done:
+                    self._touch(broadcast_id)
+                results = [future.result() for future in futures]
+                config_error = next((r for r in results if r.get("reason") in CONFIG_ERRORS), None)
+                if config_error is not None:
+                    # nothing checkpointed for this chunk: a resume sends it again
+                    self._finish(broadcast_id, "failed", error=config_error["reason"])
+                    return
+                last_user_id = recipients[-1].id
+                if not self._checkpoint(broadcast_id, recipients, results, last_user_id):
+                    logger.info(f"SMS broadcast {broadcast_id} was cancelled")
+                    return
+                self.chunks_sent += 1
+                logger.info(
+                    f"SMS broadcast {broadcast_id}: {len(recipients)} recipients up to user {last_user_id} "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+        self._finish(broadcast_id, "completed")
+
+    def _checkpoint(self, broadcast_id: int, recipients, results: List[dict], last_user_id: int) -> bool:
+        """record a sent chunk; False if the broadcast was cancelled meanwhile."""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "broadcast_id": broadcast_id,
+                "user_id": recipient.id,
+                "phone": recipient.phone,
+                "status": "sent" if result.get("status") == "sent" else "failed",
+                "attempts": result["attempts"],
+                "sid": result.get("sid"),
+                "error": None if result.get("status") == "sent" else (result.get("error") or result.get("reason")),
+                "created_at": now,
+            }
+            for recipient, result in zip(recipients, results)
+        ]
+        sent = sum(1 for row in rows if row["status"] == "sent")
+        with SessionLocal() as db:
+            broadcast = self._lock_job(db, broadcast_id)
+            # one multi-row INSERT for the chunk, committed with the cursor
+            db.execute(insert(models.SmsBroadcastRecipient), rows)
+            broadcast.sent += sent
+            broadcast.failed += len(rows) - sent
+            broadcast.last_user_id = last_user_id
+            running = broadcast.status == "running"
+            db.commit()
+            return running
+
+
+# global instance
+broadcast_runner = BroadcastRunner()
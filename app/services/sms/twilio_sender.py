@@ -1,25 +1,35 @@
 import os
-from typing import Optional, Dict
+from typing import Dict
 
-try:
+from app.core.config import settings
+from app.core.integrations import integrations
+from app.core.metrics import integration_call
+
+_initialized = False
+_client = None
+
+# set by _ensure_init() on first use
+Client = None
+TwilioRestException = None
+
+
+def _load_twilio():
     from twilio.rest import Client  # type: ignore
     from twilio.base.exceptions import TwilioRestException  # type: ignore
-except Exception:  # pragma: no cover
-    Client = None
-    TwilioRestException = None
+    return Client, TwilioRestException
 
-from app.core.config import settings
 
-_initialized = False
-_client: Optional[Client] = None
+_twilio = integrations.register("twilio", "twilio", _load_twilio)
 
 
 def _ensure_init():
-    global _initialized, _client
+    global _initialized, _client, Client, TwilioRestException
     if _initialized:
         return
-    if Client is None:
+    sdk = _twilio.get()
+    if sdk is None:
         return
+    Client, TwilioRestException = sdk
     try:
         account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         auth_token = os.getenv("TWILIO_AUTH_TOKEN")
@@ -35,7 +45,7 @@ def _ensure_init():
 
 def health_check() -> Dict[str, str]:
     """check SMS integration health and config status."""
-    if Client is None:
+    if not _twilio.installed():
         return {"status": "unavailable", "reason": "twilio_library_not_installed"}
     
     account_sid = settings.TWILIO_ACCOUNT_SID
@@ -78,10 +88,11 @@ def start_verification(to_number: str, channel: str = "sms") -> Dict[str, str]:
         return {"status": "error", "reason": "missing_verify_service_sid"}
     
     try:
-        verification = _client.verify.v2.services(verify_service_sid).verifications.create(
-            to=to_number,
-            channel=channel
-        )
+        with integration_call("twilio", "verify_start"):
+            verification = _client.verify.v2.services(verify_service_sid).verifications.create(
+                to=to_number,
+                channel=channel
+            )
         return {"status": "sent", "sid": verification.sid, "status_twilio": verification.status}
     except TwilioRestException as e:
         return {"status": "error", "reason": "twilio_api_error", "error": str(e)}
@@ -107,10 +118,11 @@ def check_verification(to_number: str, code: str) -> Dict[str, str]:
         return {"status": "error", "reason": "missing_verify_service_sid"}
     
     try:
-        verification_check = _client.verify.v2.services(verify_service_sid).verification_checks.create(
-            to=to_number,
-            code=code
-        )
+        with integration_call("twilio", "verify_check"):
+            verification_check = _client.verify.v2.services(verify_service_sid).verification_checks.create(
+                to=to_number,
+                code=code
+            )
         return {
             "status": "checked", 
             "sid": verification_check.sid,
@@ -134,13 +146,15 @@ def send_sms(to_number: str, body: str) -> Dict[str, str]:
         return {"status": "error", "reason": "missing_from_number"}
     
     try:
-        message = _client.messages.create(
-            body=body,
-            from_=from_number,
-            to=to_number
-        )
+        with integration_call("twilio", "send_sms"):
+            message = _client.messages.create(
+                body=body,
+                from_=from_number,
+                to=to_number
+            )
         return {"status": "sent", "sid": message.sid}
     except TwilioRestException as e:
-        return {"status": "error", "reason": "twilio_api_error", "error": str(e)}
+        # http_status/code let callers tell throttling (429, 20429) and outages from bad numbers
+        return {"status": "error", "reason": "twilio_api_error", "error": str(e), "http_status": e.status, "code": e.code}
     except Exception as e:
         return {"status": "error", "reason": "send_failed", "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for transactional email rendering.
+
+Renders the order_created template (subject + HTML) in a loop and prints renders
+per second for two cases:
+
+- distinct: a new order URL every render (order confirmations, cold UTM cache)
+- repeated: the same variables every render (batch campaigns sending one link)
+
+    python scripts/bench_email_render.py --iterations 200000 --locale ru
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.email.email_sender import render_template, select_subject  # noqa: E402
+
+
+def _variables(order_id: int) -> dict:
+    return {
+        "order_id": order_id,
+        "order_url": f"https://ium.app/orders/{order_id}",
+        "pickup_or_delivery": "delivery",
+        "eta": "30 minutes",
+    }
+
+
+def run(iterations: int, locale: str, distinct: bool) -> float:
+    variables = [_variables(i) for i in range(iterations)] if distinct else [_variables(1)] * iterations
+    # compile the template outside the measured loop
+    render_template("order_created", variables[0], locale)
+    started = time.perf_counter()
+    for v in variables:
+        select_subject("order_created", v, locale)
+        render_template("order_created", v, locale)
+    return iterations / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--locale", default="en")
+    args = parser.parse_args()
+
+    for name, distinct in (("distinct", True), ("repeated", False)):
+        rate = run(args.iterations, args.locale, distinct)
+        print(f"order_created [{name}, {args.locale}]: {rate:,.0f} renders/sec")
+
+
+if __name__ == "__main__":
+    main()
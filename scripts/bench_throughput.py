@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for hot read endpoints.
+
+Opens N concurrent keep-alive connections against a running server and hammers a
+set of endpoints for a fixed duration, then prints requests/sec (total and per
+worker) and latency percentiles. Run it once against a build before the async
+database stack and once after, with the same --workers and DB pool settings:
+
+    uvicorn app.main:app --workers 1 --port 8000 &
+    python scripts/bench_throughput.py --url http://localhost:8000 --concurrency 500 \
+        --duration 30 --workers 1 --token "$USER_JWT"
+
+Without --token only the public menu endpoints are exercised.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+import httpx
+
+
+PUBLIC_PATHS = ["/api/v1/menu/categories", "/api/v1/menu/items"]
+AUTH_PATHS = ["/api/v1/cart/", "/api/v1/orders/mine?page=1&page_size=20"]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _worker(client: httpx.AsyncClient, paths: List[str], deadline: float, latencies: List[float], errors: List[int], offset: int) -> None:
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors[0] += 1
+                continue
+        except httpx.HTTPError:
+            errors[0] += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url: str, concurrency: int, duration: float, token: Optional[str], prefix: str) -> dict:
+    paths = [p.replace("/api/v1", prefix, 1) for p in PUBLIC_PATHS + (AUTH_PATHS if token else [])]
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors = [0]
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30.0) as client:
+        # warm up pools and caches so the measured window is steady state
+        await asyncio.gather(*[client.get(p) for p in paths], return_exceptions=True)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            _worker(client, paths, deadline, latencies, errors, n) for n in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "elapsed": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefix", default="/api/v1", help="API prefix the routers are mounted under")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers serving --url (for per-worker numbers)")
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"), help="bearer token for cart/orders endpoints")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, args.token, args.prefix))
+    print(f"concurrency:        {args.concurrency}")
+    print(f"requests:           {result['requests']} ({result['errors']} errors) in {result['elapsed']:.1f}s")
+    print(f"throughput:         {result['rps']:.1f} req/s")
+    print(f"per worker:         {result['rps'] / max(1, args.workers):.1f} req/s")
+    print(f"latency p50/p95/p99: {result['p50_ms']:.1f} / {result['p95_ms']:.1f} / {result['p99_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Tests run against a real Postgres: the services rely on ON CONFLICT, FOR UPDATE SKIP
+LOCKED and JSON operators, which nothing else emulates. Point TEST_DATABASE_URL at a
+scratch database:
+
+    TEST_DATABASE_URL=postgresql+psycopg://postgres@localhost/ium_test python -m pytest -q
+
+Every table is created at the start of the run and dropped at the end; tests using
+the `db` fixture are skipped when TEST_DATABASE_URL is not set.
+"""
+import os
+
+import pytest
+
+# before app.core.config is imported: no SQL echo, strict query budgets
+os.environ.setdefault("APP_ENV", "test")
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # read by settings.DATABASE_URL when app.db.session builds its engines
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app import models  # noqa: F401  (registers every table)
+    from app.db.base import Base
+    from app.db.session import engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(database):
+    from sqlalchemy import text
+
+    from app.db.base import Base
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+    tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+    with database.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from app import models
+from app.db.session import SessionLocal
+from app.services.analytics.sketches import DailyUserSketches
+
+
+def test_rollups_are_built_from_the_primary_not_a_lagging_reader(db):
+    user = models.User(full_name="Ann", password_hash="x", role="user")
+    db.add(user)
+    db.commit()
+    day = (datetime.utcnow() - timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # a reader whose snapshot predates the orders stands in for a lagging replica
+    with SessionLocal() as stale:
+        stale.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        assert stale.query(models.Order).count() == 0
+
+        for n in range(2):
+            db.add(models.Order(
+                number=f"S-{n}", user_id=user.id, pickup_or_delivery="pickup", status="DELIVERED",
+                subtotal=10, total=10, created_at=day + timedelta(hours=n + 1),
+            ))
+        db.commit()
+
+        sketch = DailyUserSketches().range(stale, day, day + timedelta(days=1) - timedelta(microseconds=1))
+
+    assert sketch.orders_count == 2
+    assert sketch.user_counts.tolist() == [2]
+    stored = db.query(models.OrderDailyStats).filter(models.OrderDailyStats.day == day.date()).one()
+    assert (stored.orders_count, stored.distinct_users) == (2, 1)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.services.push.device_tokens import upsert_devices
+
+
+@pytest.fixture
+def users(db):
+    users = [models.User(full_name=name, password_hash="x", role="user") for name in ("Ann", "Bob")]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _device(db, token):
+    db.expire_all()
+    return db.query(models.Device).filter(models.Device.fcm_token == token).one()
+
+
+def test_registers_new_devices_in_one_statement(db, users):
+    rows = upsert_devices(db, [
+        {"fcm_token": "t1", "platform": "ios", "user_id": users[0].id, "locale": "en"},
+        {"fcm_token": "t2", "platform": "android", "user_id": None, "locale": "ru"},
+        {"fcm_token": "t1", "platform": "ios", "user_id": users[0].id, "locale": "kz"},  # last one wins
+    ])
+    assert sorted(row.fcm_token for row in rows) == ["t1", "t2"]
+    assert db.query(models.Device).count() == 2
+    assert _device(db, "t1").locale == "kz"
+
+
+def test_reregistration_updates_in_place(db, users):
+    (first,) = upsert_devices(db, [{"fcm_token": "t1", "platform": "ios", "user_id": users[0].id, "locale": "en"}])
+    db.query(models.Device).update({"topics_synced_at": datetime(2026, 10, 1)})
+    db.commit()
+
+    # an anonymous launch keeps the stored user and locale, and the topic sync
+    (again,) = upsert_devices(db, [{"fcm_token": "t1", "platform": "ios", "user_id": None, "locale": None}])
+    device = _device(db, "t1")
+    assert again.id == first.id
+    assert (device.user_id, device.locale, device.topics_synced_at) == (users[0].id, "en", datetime(2026, 10, 1))
+    assert again.topics_synced_at == datetime(2026, 10, 1)
+
+    # a different user on the same phone must have its topics synced again
+    (switched,) = upsert_devices(db, [{"fcm_token": "t1", "platform": "ios", "user_id": users[1].id, "locale": None}])
+    device = _device(db, "t1")
+    assert switched.id == first.id and switched.topics_synced_at is None
+    assert (device.user_id, device.locale, device.topics_synced_at) == (users[1].id, "en", None)
+    assert db.query(models.Device).count() == 1
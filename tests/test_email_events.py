@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import models
+from app.services.email import events
+from app.services.email.events import EmailEventIngestor, event_row
+
+
+def _event(event_type="email.opened", email_id="em_1", **data):
+    return {
+        "type": event_type,
+        "created_at": "2026-10-01T12:00:00.000Z",
+        "data": {"email_id": email_id, "to": ["ann@example.com"], "subject": "Hi", "tags": {"category": "order_created"}, **data},
+    }
+
+
+@pytest.fixture
+def ingestor(monkeypatch):
+    ingestor = EmailEventIngestor()
+    # flush explicitly instead of from the background thread
+    monkeypatch.setattr(ingestor, "_ensure_started", lambda: None)
+    return ingestor
+
+
+def test_event_row_clips_to_column_lengths():
+    row = event_row(_event("email.clicked", click={"link": "https://ium.app/?q=" + "x" * 5000}), svix_id="msg_1")
+    assert len(row["link"]) == 1024
+    assert row["created_at"] == datetime(2026, 10, 1, 12, 0)
+
+
+def test_event_row_without_type_is_rejected():
+    with pytest.raises(ValueError):
+        event_row({"data": {}}, svix_id="msg_1")
+
+
+def test_redelivered_events_are_stored_once(db, ingestor):
+    for svix_id in ("msg_1", "msg_2", "msg_1"):
+        assert ingestor.offer(event_row(_event(email_id=svix_id), svix_id=svix_id))
+    ingestor.flush()
+
+    assert db.query(models.EmailEvent).count() == 2
+    assert (ingestor.inserted, ingestor.duplicates) == (2, 1)
+    rollup = db.query(models.EmailDailyStats).one()
+    assert (rollup.template, rollup.event_type, rollup.events, rollup.unique_emails) == ("order_created", "email.opened", 2, 2)
+
+
+def test_failed_insert_is_put_back_in_order(db, ingestor, monkeypatch):
+    for svix_id in ("msg_1", "msg_2"):
+        ingestor.offer(event_row(_event(), svix_id=svix_id))
+
+    def unavailable():
+        raise OperationalError("connect", None, Exception("connection refused"))
+
+    monkeypatch.setattr(events, "SessionLocal", unavailable)
+    ingestor.flush()
+    assert ingestor.errors == 1
+    assert [row["svix_id"] for row in ingestor._buffer] == ["msg_1", "msg_2"]
+
+    monkeypatch.undo()
+    ingestor.flush()
+    assert ingestor.stats()["buffered"] == 0
+    assert db.query(models.EmailEvent).count() == 2
+
+
+def test_rejected_row_does_not_block_the_batch(db, ingestor):
+    rows = [event_row(_event(), svix_id=f"msg_{i}") for i in range(5)]
+    rows[3]["type"] = None  # NOT NULL violation: fails the multi-row INSERT every time
+    for row in rows:
+        ingestor.offer(row)
+    ingestor.flush()
+
+    assert ingestor.stats()["buffered"] == 0
+    assert ingestor.dropped == 1
+    stored = {svix_id for (svix_id,) in db.query(models.EmailEvent.svix_id)}
+    assert stored == {"msg_0", "msg_1", "msg_2", "msg_4"}
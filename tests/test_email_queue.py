@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.core.config import settings
+from app.services.email.queue import EmailQueue, FakeTransport, enqueue_email, requeue_dead
+
+
+@pytest.fixture
+def queue(db, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RATE_LIMIT_PER_SEC", 0)
+    monkeypatch.setattr(settings, "EMAIL_BATCH_SIZE", 100)
+    return EmailQueue(FakeTransport())
+
+
+def _enqueue(to: str, order_id: int = 1, key=None):
+    variables = {"order_id": order_id, "order_url": f"https://ium.app/orders/{order_id}", "pickup_or_delivery": "delivery", "eta": "30 minutes"}
+    return enqueue_email("order_created", to, variables, idempotency_key=key)
+
+
+def _rows(db):
+    db.expire_all()
+    return db.query(models.EmailOutbox).order_by(models.EmailOutbox.id).all()
+
+
+def test_batches_hold_at_most_100_messages(db, queue):
+    for i in range(150):
+        _enqueue(f"user{i}@example.com", order_id=i)
+
+    assert queue.run_once() and queue.run_once()
+    assert not queue.run_once()
+    assert [len(batch["messages"]) for batch in queue.transport.batches] == [100, 50]
+    assert {row.status for row in _rows(db)} == {"sent"}
+    assert len({row.message_id for row in _rows(db)}) == 150
+
+
+def test_idempotency_key_queues_once(db, queue):
+    assert _enqueue("ann@example.com", key="order_created:1")["status"] == "queued"
+    assert _enqueue("ann@example.com", key="order_created:1")["status"] == "duplicate"
+    assert len(_rows(db)) == 1
+
+
+def test_batch_accepted_before_a_worker_died_is_not_sent_twice(db, queue):
+    _enqueue("ann@example.com")
+    _enqueue("bob@example.com")
+    # a worker claims the batch and Resend accepts it, then the worker dies before recording it
+    batch_key, ids, messages = queue._claim()
+    first = queue.transport.send_batch(messages, batch_key)
+    db.query(models.EmailOutbox).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+    # the lease ran out: another worker retries under the same key and Resend replays its answer
+    assert queue.run_once()
+    assert len(queue.transport.batches) == 1
+    rows = _rows(db)
+    assert [row.batch_key for row in rows] == [batch_key, batch_key]
+    assert [row.message_id for row in rows] == [result["id"] for result in first["results"]]
+    assert [row.attempts for row in rows] == [2, 2]
+
+
+def test_retryable_failure_backs_off_then_retries_the_same_batch(db, queue):
+    _enqueue("ann@example.com")
+    queue.transport.fail_next(retryable=True, error="429 rate limited")
+
+    before = datetime.utcnow()
+    assert queue.run_once()
+    row = _rows(db)[0]
+    delay = settings.EMAIL_RETRY_BACKOFF_SEC
+    assert (row.status, row.attempts, row.error) == ("pending", 1, "429 rate limited")
+    assert before + timedelta(seconds=delay) <= row.next_attempt_at <= datetime.utcnow() + timedelta(seconds=2 * delay)
+    assert not queue.run_once()  # not due yet
+
+    batch_key = row.batch_key
+    db.query(models.EmailOutbox).update({"next_attempt_at": datetime.utcnow()})
+    db.commit()
+    assert queue.run_once()
+    row = _rows(db)[0]
+    assert (row.status, row.attempts, row.batch_key) == ("sent", 2, batch_key)
+    assert queue.transport.batches[0]["idempotency_key"] == batch_key
+
+
+def test_non_retryable_failure_is_dead_lettered(db, queue):
+    _enqueue("ann@example.com")
+    queue.transport.fail_next(retryable=False, error="403 domain not verified")
+    assert queue.run_once()
+    assert [(row.status, row.error) for row in _rows(db)] == [("dead", "403 domain not verified")]
+
+
+def test_rejected_message_is_dead_lettered_alone(db, queue):
+    for to in ("ann@example.com", "not-an-address", "bob@example.com"):
+        _enqueue(to)
+    queue.transport.reject.add("not-an-address")
+
+    assert queue.run_once()
+    assert len(queue.transport.batches) == 1
+    statuses = [(row.to_email, row.status) for row in _rows(db)]
+    assert statuses == [("ann@example.com", "sent"), ("not-an-address", "dead"), ("bob@example.com", "sent")]
+    assert "not-an-address" in _rows(db)[1].error
+
+
+def test_requeue_dead_sends_again_under_a_new_key(db, queue):
+    _enqueue("ann@example.com")
+    queue.transport.reject.add("ann@example.com")
+    queue.run_once()
+    dead = _rows(db)[0]
+    assert dead.status == "dead"
+    dead_key = dead.batch_key
+
+    queue.transport.reject.clear()
+    assert requeue_dead(db, [dead.id]) == 1
+    row = _rows(db)[0]
+    assert (row.status, row.attempts, row.batch_key, row.error) == ("pending", 0, None, None)
+
+    assert queue.run_once()
+    row = _rows(db)[0]
+    assert row.status == "sent" and row.batch_key != dead_key
+    assert [batch["idempotency_key"] for batch in queue.transport.batches] == [dead_key, row.batch_key]
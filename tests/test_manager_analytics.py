@@ -0,0 +1,27 @@
+from app import models
+from app.api.v1.routers.manager import analytics_summary
+
+
+def test_summary_totals_and_status_breakdown_in_one_statement(db):
+    users = [models.User(full_name=name, password_hash="x", role="user") for name in ("Ann", "Bob")]
+    db.add_all(users)
+    db.flush()
+    for n, (user, status, total) in enumerate([(users[0], "NEW", 10), (users[0], "DELIVERED", 30), (users[1], "DELIVERED", 20), (None, "NEW", 40)]):
+        db.add(models.Order(
+            number=f"A-{n}", user_id=user.id if user else None, pickup_or_delivery="pickup", status=status, subtotal=total, total=total
+        ))
+    db.commit()
+
+    summary = analytics_summary.__wrapped__(from_=None, to=None, db=db, _=None)
+    assert summary == {
+        "total_orders": 4,
+        "total_revenue": 100.0,
+        "avg_order_value": 25.0,
+        "unique_customers": 2,
+        "status_breakdown": {"NEW": 2, "DELIVERED": 2},
+    }
+
+
+def test_summary_of_no_orders(db):
+    summary = analytics_summary.__wrapped__(from_="2020-01-01", to="2020-01-02", db=db, _=None)
+    assert (summary["total_orders"], summary["total_revenue"], summary["status_breakdown"]) == (0, 0.0, {})
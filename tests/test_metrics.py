@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import metrics
+from app.core.config import settings
+
+
+def test_pool_gauges_follow_the_engine_across_dispose(monkeypatch):
+    monkeypatch.setattr(metrics, "_pools", {})
+    engine = create_engine("postgresql+psycopg://localhost/unused", poolclass=QueuePool, pool_size=3)
+    metrics.track_pool("test_pool", engine)
+    old_pool = engine.pool
+
+    engine.dispose()
+    engine.pool._pool.maxsize = 7  # only the replacement pool reports 7
+    metrics._collect_pools()
+
+    assert engine.pool is not old_pool
+    assert metrics.DB_POOL_SIZE.value("test_pool") == 7
+
+
+@pytest.mark.parametrize("env, token, authorization, status", [
+    ("dev", None, None, None),
+    ("prod", None, None, 403),
+    ("prod", None, "Bearer anything", 403),
+    ("prod", "s3cret", None, 401),
+    ("prod", "s3cret", "Bearer s3cret", None),
+    ("dev", "s3cret", None, 401),
+])
+def test_metrics_need_a_token_outside_dev(monkeypatch, env, token, authorization, status):
+    from app.main import metrics as metrics_endpoint
+
+    monkeypatch.setattr(settings, "APP_ENV", env)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", token)
+    if status is None:
+        assert metrics_endpoint(authorization=authorization).status_code == 200
+    else:
+        with pytest.raises(HTTPException) as exc:
+            metrics_endpoint(authorization=authorization)
+        assert exc.value.status_code == status
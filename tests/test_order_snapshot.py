@@ -0,0 +1,92 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import models
+from app.services.analytics.order_snapshot import CATEGORICAL_COLUMNS, OrderSnapshot
+
+Row = namedtuple("Row", ["id", "created_at", "updated_at", "total", "user_id", *CATEGORICAL_COLUMNS.values()])
+
+
+def _order(order_id: int, **values) -> models.Order:
+    return models.Order(
+        id=order_id, number=f"A-{order_id}", pickup_or_delivery="delivery", subtotal=10, total=10, **values
+    )
+
+
+def test_utm_source_dictionary_grows_past_int16():
+    snapshot = OrderSnapshot()
+    now = datetime(2026, 10, 1)
+    rows = [Row(i, now, now, 10, None, "delivery", "cod", "NEW", f"source-{i}") for i in range(1, 40001)]
+    cols = snapshot._encode_rows(rows)
+    assert cols.codes["utm_source"].dtype == np.int32
+    assert snapshot.view().dictionaries["utm_source"].values[int(cols.codes["utm_source"][-1])] == "source-40000"
+
+
+def test_order_committed_out_of_id_order_is_picked_up(db):
+    db.add_all([_order(1), _order(3)])
+    db.commit()
+    snapshot = OrderSnapshot()
+    assert snapshot.refresh(db) == 2
+
+    # order 2 took its id before order 3 but committed after the refresh
+    db.add(_order(2, utm_source="instagram"))
+    db.commit()
+    snapshot.refresh(db)
+    view = snapshot.view()
+    assert view.cols.ids.tolist() == [1, 2, 3]
+    assert view.totals(view.mask(utm_source="instagram"))["orders_count"] == 1
+
+
+def test_late_status_change_is_picked_up(db):
+    db.add_all([_order(1), _order(2)])
+    db.commit()
+    snapshot = OrderSnapshot()
+    snapshot.refresh(db)
+
+    # a change stamped before the watermark but committed after the refresh
+    db.query(models.Order).filter(models.Order.id == 1).update(
+        {"status": "DELIVERED", "updated_at": snapshot.max_updated_at - timedelta(seconds=5)}
+    )
+    db.commit()
+    snapshot.refresh(db)
+    view = snapshot.view()
+    assert view.totals(view.mask(status="DELIVERED"))["orders_count"] == 1
+
+
+def test_edits_to_loaded_orders_patch_every_column(db):
+    db.add_all([models.User(id=7, full_name="Ann", password_hash="x", role="user"), _order(1), _order(2)])
+    db.commit()
+    snapshot = OrderSnapshot()
+    snapshot.refresh(db)
+
+    moved = datetime(2026, 1, 5, 12)
+    db.query(models.Order).filter(models.Order.id == 1).update(
+        {"total": 42.5, "user_id": 7, "created_at": moved, "updated_at": datetime.utcnow()}
+    )
+    db.commit()
+    snapshot.refresh(db)
+    view = snapshot.view()
+    edited = view.totals(view.mask(moved, moved))
+    assert (edited["orders_count"], edited["revenue"], edited["unique_customers"]) == (1, 42.5, 1)
+    assert view.totals()["revenue"] == 52.5
+
+
+def test_requests_queued_behind_a_refresh_do_not_repeat_it(db, monkeypatch):
+    db.add(_order(1))
+    db.commit()
+    snapshot = OrderSnapshot(refresh_interval=30)
+    snapshot.ensure_fresh(db)
+    snapshot.mark_stale()
+
+    runs = []
+    select = snapshot._select
+    monkeypatch.setattr(snapshot, "_select", lambda session: runs.append(1) or select(session))
+    # the first waiter refreshes; the next one finds a fresh snapshot once it holds the lock
+    snapshot.refresh(db, max_age=30)
+    assert runs
+    runs.clear()
+    assert snapshot.refresh(db, max_age=30) == 0 and not runs
+    snapshot.refresh(db)
+    assert runs
@@ -0,0 +1,38 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, issue_profile_token, profile_store
+
+
+def _client(monkeypatch, tmp_path) -> TestClient:
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_profile_token_is_single_use(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    token = issue_profile_token(1, 60)
+
+    first = client.get("/ping", headers={"X-Profile-Token": token})
+    assert first.status_code == 200
+    profile_id = first.headers["x-profile-id"]
+    assert profile_store.get(profile_id)["requested_by"] == 1
+
+    replayed = client.get("/ping", headers={"X-Profile-Token": token})
+    assert replayed.status_code == 200
+    assert "x-profile-id" not in replayed.headers
+    assert [p["id"] for p in profile_store.list()] == [profile_id]
+
+
+def test_invalid_token_is_ignored(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    response = client.get("/ping", headers={"X-Profile-Token": "not-a-token"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
@@ -0,0 +1,45 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.instrumentation import QueryStatsMiddleware, query_budget
+from app.db.session import get_db
+
+
+def _client(monkeypatch, strict: bool) -> TestClient:
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGET_STRICT", strict)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/two", dependencies=[query_budget(2)])
+    def two(db=Depends(get_db)):
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+        return {"ok": True}
+
+    @app.get("/three", dependencies=[query_budget(2)])
+    def three(db=Depends(get_db)):
+        for n in range(3):
+            db.execute(text(f"SELECT {n}"))
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_within_budget_passes(database, monkeypatch):
+    response = _client(monkeypatch, strict=True).get("/two")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+
+
+def test_over_budget_fails_in_strict_mode(database, monkeypatch):
+    response = _client(monkeypatch, strict=True).get("/three")
+    assert response.status_code == 500
+    assert "ran 3 SQL statements, budget is 2" in response.json()["detail"]
+
+
+def test_over_budget_only_warns_otherwise(database, monkeypatch, caplog):
+    response = _client(monkeypatch, strict=False).get("/three")
+    assert response.status_code == 200
+    assert "budget is 2" in caplog.text
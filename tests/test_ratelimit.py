@@ -0,0 +1,48 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.core.ratelimit import SharedTokenBucket, TokenBucket
+
+
+def test_workers_share_one_budget(database):
+    # two workers, each with its own bucket object: 30 calls at 20/sec, one second's burst
+    workers = [SharedTokenBucket("test", 20), SharedTokenBucket("test", 20)]
+
+    def run(bucket):
+        for _ in range(15):
+            bucket.acquire()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=run, args=(bucket,)) for bucket in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    # the 10 calls past the burst need 0.5s at 20/sec; per-worker buckets would need none
+    assert 0.45 <= elapsed < 2
+
+
+def test_large_requests_are_charged_in_full():
+    # 10/sec with 25-unit requests (like 500-token FCM chunks under a lower limit):
+    # the first 10 units are the burst, the remaining 40 take 4s, not 2 x 1s
+    bucket = TokenBucket(10)
+    slept = []
+    with patch("app.core.ratelimit.time.sleep", slept.append):
+        bucket.acquire(25)
+        bucket.acquire(25)
+    assert slept[0] == pytest.approx(1.5, abs=0.05)
+    assert slept[1] == pytest.approx(4.0, abs=0.05)
+
+
+def test_shared_large_requests_are_charged_in_full(database):
+    bucket = SharedTokenBucket("test_large", 10)
+    slept = []
+    with patch("app.core.ratelimit.time.sleep", slept.append):
+        bucket.acquire(25)
+        bucket.acquire(25)
+    assert slept[0] == pytest.approx(1.5, abs=0.05)
+    assert slept[1] == pytest.approx(4.0, abs=0.05)
@@ -0,0 +1,77 @@
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import models
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.session import STICKY_COOKIE, ReadYourWritesMiddleware, _request_sticky, read_router
+from app.services.cache.result_cache import ResultCache
+
+
+def _app(monkeypatch, picks):
+    monkeypatch.setattr(read_router, "replicas", [object()])
+    monkeypatch.setattr(read_router, "pick", lambda user_id=None, sticky=False: picks.append(sticky))
+    monkeypatch.setattr(read_router, "_is_sticky", lambda user_id: False)  # another worker: nothing in memory
+
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.post("/write")
+    def write(request: Request):
+        request.state.db_wrote_user_id = 7  # what the after_commit hook records
+        return {}
+
+    @app.post("/commit")
+    def commit(db=Depends(db_session.get_db)):
+        db.add(models.Category(name="Soups"))
+        db.commit()
+        return {}
+
+    @app.get("/read")
+    def read(request: Request):
+        user_id = db_session._request_user_id(request)
+        read_router.pick(user_id, _request_sticky(request, user_id))
+        return {}
+
+    return app
+
+
+def test_write_response_carries_sticky_cookie(monkeypatch):
+    picks = []
+    client = TestClient(_app(monkeypatch, picks), base_url="https://testserver")
+    auth = {"Authorization": f"Bearer {create_access_token('7')}"}
+
+    assert STICKY_COOKIE not in client.get("/read", headers=auth).cookies
+    response = client.post("/write", headers=auth)
+    assert "httponly" in response.headers["set-cookie"].lower()
+
+    client.get("/read", headers=auth)
+    client.get("/read", headers={"Authorization": f"Bearer {create_access_token('8')}"})
+    assert picks == [False, True, False]
+
+
+def test_committed_write_sets_sticky_cookie(db, monkeypatch):
+    client = TestClient(_app(monkeypatch, []), base_url="https://testserver")
+    response = client.post("/commit", headers={"Authorization": f"Bearer {create_access_token('7')}"})
+    assert STICKY_COOKIE in response.cookies
+    assert STICKY_COOKIE not in client.post("/commit").cookies  # anonymous writes don't stick
+
+
+def test_tampered_cookie_is_ignored(monkeypatch):
+    picks = []
+    client = TestClient(_app(monkeypatch, picks), base_url="https://testserver")
+    client.cookies.set(STICKY_COOKIE, "not.a.token")
+    client.get("/read", headers={"Authorization": f"Bearer {create_access_token('7')}"})
+    assert picks == [False]
+
+
+def test_results_right_after_invalidation_are_not_cached():
+    cache = ResultCache(ttl=60, settle=60)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_compute("k", compute) == 1
+    assert cache.get_or_compute("k", compute) == 1
+    cache.invalidate()
+    assert cache.get_or_compute("k", compute) == 2
+    assert cache.get_or_compute("k", compute) == 3
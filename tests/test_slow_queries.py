@@ -0,0 +1,19 @@
+import pytest
+
+from app.db.slow_queries import _is_select
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT 1", True),
+    ("  (SELECT id FROM orders) UNION (SELECT id FROM orders)", True),
+    ("WITH recent AS (SELECT id FROM orders) SELECT * FROM recent", True),
+    ("WITH created_rows AS (SELECT inserted_at FROM orders) SELECT 1", True),
+    ("WITH moved AS (\nDELETE FROM orders RETURNING *\n) SELECT 1", False),
+    ("WITH new_row AS (INSERT INTO t (a) VALUES (1) RETURNING a) SELECT a FROM new_row", False),
+    ("with x as (update t set a = 1 returning a)select a from x", False),
+    ("WITH x AS (SELECT 1)\nINSERT INTO t SELECT * FROM x", False),
+    ("INSERT INTO t VALUES (1)", False),
+    ("", False),
+])
+def test_only_read_only_statements_are_analyzed(statement, expected):
+    assert _is_select(statement) is expected
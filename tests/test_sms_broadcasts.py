@@ -0,0 +1,41 @@
+import threading
+import time
+
+from app import models
+from app.core.config import settings
+from app.services.sms import broadcasts
+from app.services.sms.broadcasts import BroadcastRunner
+
+
+def test_broadcasts_on_two_workers_share_the_account_rate(db, monkeypatch):
+    monkeypatch.setattr(settings, "SMS_RATE_LIMIT_PER_SEC", 20)
+    monkeypatch.setattr(settings, "SMS_SEND_CONCURRENCY", 4)
+    sent = []
+    monkeypatch.setattr(broadcasts, "send_sms", lambda phone, message: sent.append(phone) or {"status": "sent", "sid": "SM1"})
+
+    db.add_all(
+        models.User(full_name=f"User {i}", password_hash="x", role="user", phone=f"+7700000{i:04d}", is_phone_verified=True)
+        for i in range(15)
+    )
+    jobs = [models.SmsBroadcast(message=f"Hello {n}", audience="all", status="queued", total=15, sent=0, failed=0, last_user_id=0) for n in range(2)]
+    db.add_all(jobs)
+    db.commit()
+
+    # two workers, each claiming one of the broadcasts
+    workers = [BroadcastRunner(), BroadcastRunner()]
+    claimed = [worker._claim() for worker in workers]
+    assert sorted(claimed) == sorted(job.id for job in jobs)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker._execute, args=(job_id,)) for worker, job_id in zip(workers, claimed)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    assert len(sent) == 30
+    # 10 messages past the one-second burst need 0.5s at 20/sec across both workers
+    assert elapsed >= 0.45
+    db.expire_all()
+    assert [(job.status, job.sent) for job in db.query(models.SmsBroadcast).order_by(models.SmsBroadcast.id)] == [("completed", 15)] * 2